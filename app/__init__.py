@@ -26,6 +26,30 @@ def create_app(env_name="default"):
     migrate.init_app(app, db)
     CORS(app)
 
+    # Pair score cache and its profile-version hooks
+    from app.services.score_cache import init_score_cache
+    init_score_cache(app)
+
+    # Match list cache (memory or a local SQLite file shared by workers)
+    from app.services.match_cache import init_match_cache
+    init_match_cache(app)
+
+    # Stored match lists kept current as profiles are saved
+    from app.services.score_store import init_score_store
+    init_score_store(app)
+
+    # Per-request SQL query counts and N+1 detection
+    from app.services.query_stats import init_query_stats
+    init_query_stats(app)
+
+    # Prometheus /metrics endpoint and request latency histograms
+    from app.services.metrics import init_metrics
+    init_metrics(app)
+
+    # Keyset pagination result sets
+    from app.services.pagination import init_pagination
+    init_pagination(app)
+
     # Register blueprints
     from app.routes.users import users_bp
     from app.routes.matches import matches_bp
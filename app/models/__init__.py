@@ -7,6 +7,7 @@ from app.models.religion import ReligiousProfile
 from app.models.background import BackgroundPreferences
 from app.models.lifestyle import LifestylePreferences
 from app.models.matchmaker import Matchmaker, Applicant
+from app.models.match_score import MatchScore
 
 # This helps ensure all models are properly loaded and tables are created
 __all__ = [
@@ -15,5 +16,6 @@ __all__ = [
     'BackgroundPreferences',
     'LifestylePreferences',
     'Matchmaker',
-    'Applicant'
+    'Applicant',
+    'MatchScore'
 ] 
\ No newline at end of file
@@ -11,4 +11,7 @@ class BackgroundPreferences(db.Model):
     partner_background = db.Column(db.String)
     min_partner_height = db.Column(db.String)
     max_partner_age = db.Column(db.Integer)
-    photo_url = db.Column(db.String)
\ No newline at end of file
+    photo_url = db.Column(db.String)
+
+    # Derived at write time for the match engine (see services.profile_features)
+    min_partner_height_inches = db.Column(db.Integer)
@@ -0,0 +1,21 @@
+from app import db
+from datetime import datetime
+
+class MatchScore(db.Model):
+    """Materialized directional match score: user_a's preferences applied to user_b"""
+    __tablename__ = 'match_scores'
+    __table_args__ = (
+        db.UniqueConstraint('user_a_id', 'user_b_id', name='uq_match_scores_pair'),
+        # Top-K for one user
+        db.Index('ix_match_scores_user_a_score', 'user_a_id', 'score'),
+        # All pairs above a score
+        db.Index('ix_match_scores_score', 'score'),
+        # Column recomputation when user_b changes
+        db.Index('ix_match_scores_user_b', 'user_b_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_a_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_b_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,11 +1,12 @@
 from app import db
+from app.models.types import StringArray
 
 class ReligiousProfile(db.Model):
     __tablename__ = 'religious_profile'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
-    cultural_background = db.Column(db.ARRAY(db.String))
-    languages = db.Column(db.ARRAY(db.String))
+    cultural_background = db.Column(StringArray())
+    languages = db.Column(StringArray())
     shabbat_observance = db.Column(db.String)
     kosher_observance = db.Column(db.String)
     jewish_learning = db.Column(db.String)
@@ -15,3 +16,10 @@ class ReligiousProfile(db.Model):
     male_partner_preference = db.Column(db.String)
     prayer_habits = db.Column(db.String)
     religious_growth = db.Column(db.String)
+
+    # Derived at write time for the match engine (see services.profile_features)
+    shabbat_rank = db.Column(db.SmallInteger)
+    kosher_rank = db.Column(db.SmallInteger)
+    learning_rank = db.Column(db.SmallInteger)
+    attendance_rank = db.Column(db.SmallInteger)
+    prayer_rank = db.Column(db.SmallInteger)
@@ -0,0 +1,42 @@
+"""
+Column types that work on every database the app runs against.
+
+Production uses PostgreSQL; tests, profiling and benchmarks can run on
+SQLite, which has no array type.
+"""
+
+from sqlalchemy import JSON, String
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+class StringArray(TypeDecorator):
+    """A list of strings: native ARRAY on PostgreSQL, a JSON array elsewhere
+
+    Values read back as Python lists (or None) on every database.
+    """
+
+    impl = JSON
+    cache_ok = True
+
+    def __init__(self, item_type=String):
+        super().__init__()
+        self.item_type = item_type
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.ARRAY(self.item_type))
+        return dialect.type_descriptor(JSON(none_as_null=True))
+
+    def process_bind_param(self, value, dialect):
+        # Tuples and sets bind like lists, as they would to ARRAY. Anything
+        # else is rejected: list('English') would store single letters.
+        if value is None or isinstance(value, list):
+            return value
+        if isinstance(value, (tuple, set, frozenset)):
+            return list(value)
+        raise TypeError(f"{type(self).__name__} expects a list of strings, got {type(value).__name__}")
+
+    def process_result_value(self, value, dialect):
+        if value is not None and not isinstance(value, list):
+            value = list(value)
+        return value
@@ -2,6 +2,11 @@ from app import db
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Candidate selection filters by gender plus age/height dealbreakers
+        db.Index('ix_users_gender_dob', 'gender', 'dob'),
+        db.Index('ix_users_gender_height_inches', 'gender', 'height_inches'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     email = db.Column(db.String, unique=True)
@@ -15,6 +20,12 @@ class User(db.Model):
     education_level = db.Column(db.String)
     schools = db.Column(db.String)
 
+    # Derived at write time for the match engine (see services.profile_features)
+    height_inches = db.Column(db.Integer)
+    dob_ordinal = db.Column(db.Integer)
+    # Bumped whenever the user or one of their profiles is saved (see services.score_cache)
+    profile_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
     religious_profile = db.relationship('ReligiousProfile', uselist=False, backref='user')
     background = db.relationship('BackgroundPreferences', uselist=False, backref='user')
     lifestyle = db.relationship('LifestylePreferences', uselist=False, backref='user')
\ No newline at end of file
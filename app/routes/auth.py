@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from app.models.matchmaker import Matchmaker, Applicant
 from app.models.user import User
 from app import db
@@ -63,7 +63,7 @@ def login():
             'id': matchmaker.id,
             'email': matchmaker.email,
             'exp': datetime.utcnow() + timedelta(days=1)
-        }, app.config['SECRET_KEY'], algorithm="HS256")
+        }, current_app.config['SECRET_KEY'], algorithm="HS256")
         
         return jsonify({
             'message': 'Login successful',
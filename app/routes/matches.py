@@ -1,17 +1,34 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
 from app.models.user import User
 from app.models.matchmaker import Matchmaker, Applicant
 from app.services.match_engine import (
     get_matches_for_user, 
     get_all_top_matches,
-    get_matchmaker_matches
+    get_matchmaker_matches,
+    get_pair_compatibility,
+    iter_all_top_matches,
+    iter_matchmaker_matches
 )
+from app.services.match_vectors import parse_weights
+from app.services.metrics import stage_timer
+from app.services.pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.pairing import get_pairing_suggestions, PAIRING_METHODS
+from app.services.score_store import (
+    get_stored_matches_for_user,
+    get_stored_top_matches,
+    get_stored_matchmaker_matches,
+    iter_stored_top_matches,
+    iter_stored_matchmaker_matches
+)
+from app.services.streaming import ndjson_lines
 from functools import wraps
 import jwt
 #from app import app
 
 matches_bp = Blueprint('matches', __name__)
 
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -23,7 +40,7 @@ def token_required(f):
             return jsonify({'message': 'Token is missing'}), 401
         
         try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
+            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
             current_user = Matchmaker.query.filter_by(id=data['id']).first()
         except:
             return jsonify({'message': 'Token is invalid'}), 401
@@ -32,6 +49,70 @@ def token_required(f):
     
     return decorated
 
+def use_score_store(weights=None):
+    """Whether match lists are served from the match_scores table
+
+    Stored scores are one-directional under the default weights, so
+    reciprocal and reweighted rankings are always computed live.
+    """
+    return current_app.config.get('MATCH_SCORE_STORE', False) \
+        and not wants_reciprocal() and weights is None
+
+def wants_details():
+    """Whether compatibility details were requested (?details=0 skips them)"""
+    return request.args.get('details', 'true').lower() not in ('0', 'false', 'no')
+
+def wants_reciprocal():
+    """Whether matches should be ranked by both directions (?reciprocal=1)"""
+    return request.args.get('reciprocal', 'false').lower() in ('1', 'true', 'yes')
+
+def requested_weights():
+    """Field weight overrides from ?weights=field:weight,... (raises ValueError if invalid)"""
+    return parse_weights(request.args.get('weights'))
+
+def wants_stream():
+    """Whether records should be streamed as NDJSON (Accept: application/x-ndjson or ?stream=1)"""
+    if request.args.get('stream', 'false').lower() in ('1', 'true', 'yes'):
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+def match_list_response(name, scope, compute, kind, key='matches', iterate=None):
+    """JSON response with the full list, or one keyset page when ?page_size= or ?cursor= is given
+
+    Pages are ordered by (score desc, pair id) and cut from a result set
+    computed once per endpoint, scope and query parameters. When `iterate`
+    is given and a stream is requested, records are written as NDJSON in
+    the order they are produced (not sorted by score), without building
+    the list.
+    """
+    if iterate is not None and wants_stream():
+        json_dumps = current_app.json.dumps
+        return Response(stream_with_context(ndjson_lines(iterate(), json_dumps)),
+                        mimetype=NDJSON_MIMETYPE)
+    
+    cursor = request.args.get('cursor')
+    page_size = request.args.get('page_size', type=int)
+    if cursor is None and page_size is None:
+        records = compute()
+        with stage_timer('serialization'):
+            return jsonify({key: records, 'count': len(records)})
+    
+    page_size = min(max(page_size or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+    params = {k: v for k, v in request.args.items() if k not in ('cursor', 'page_size')}
+    params['scope'] = scope
+    params['store'] = bool(current_app.config.get('MATCH_SCORE_STORE', False))
+    try:
+        records, next_cursor = paginate(name, params, compute, kind, cursor, page_size)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    with stage_timer('serialization'):
+        return jsonify({
+            key: records,
+            'count': len(records),
+            'next_cursor': next_cursor
+        })
+
 @matches_bp.route('/user/<int:user_id>/matches', methods=['GET'])
 @token_required
 def get_user_matches(current_user, user_id):
@@ -46,42 +127,105 @@ def get_user_matches(current_user, user_id):
         return jsonify({'message': 'User not found or not authorized'}), 404
     
     limit = request.args.get('limit', 10, type=int)
-    matches = get_matches_for_user(user_id, limit=limit)
+    try:
+        weights = requested_weights()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    return jsonify({
-        'matches': matches,
-        'count': len(matches)
-    })
+    def compute():
+        if use_score_store(weights):
+            return get_stored_matches_for_user(user_id, limit=limit, include_details=wants_details())
+        return get_matches_for_user(user_id, limit=limit, include_details=wants_details(),
+                                    reciprocal=wants_reciprocal(), weights=weights)
+    
+    return match_list_response('user', user_id, compute, 'user')
 
 @matches_bp.route('/matches/all', methods=['GET'])
 @token_required
 def get_all_matches(current_user):
     """Get all top matches in the system"""
     # Only system admins can see all matches
-    if current_user.email != app.config.get('ADMIN_EMAIL'):
+    if current_user.email != current_app.config.get('ADMIN_EMAIL'):
         return jsonify({'message': 'Not authorized'}), 403
     
     limit = request.args.get('limit_per_match', 5, type=int)
     min_score = request.args.get('min_score', 50, type=int)
+    try:
+        weights = requested_weights()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    matches = get_all_top_matches(limit_per_match=limit, min_score=min_score)
+    def compute():
+        if use_score_store(weights):
+            return get_stored_top_matches(limit_per_match=limit, min_score=min_score,
+                                          include_details=wants_details())
+        return get_all_top_matches(limit_per_match=limit, min_score=min_score,
+                                   include_details=wants_details(),
+                                   reciprocal=wants_reciprocal(), weights=weights)
     
-    return jsonify({
-        'matches': matches,
-        'count': len(matches)
-    })
+    def iterate():
+        if use_score_store(weights):
+            return iter_stored_top_matches(limit_per_match=limit, min_score=min_score,
+                                           include_details=wants_details())
+        return iter_all_top_matches(limit_per_match=limit, min_score=min_score,
+                                    include_details=wants_details(),
+                                    reciprocal=wants_reciprocal(), weights=weights)
+    
+    return match_list_response('all', None, compute, 'pair', iterate=iterate)
+
+@matches_bp.route('/matches/pairings', methods=['GET'])
+@token_required
+def get_pairings(current_user):
+    """Suggest one introduction per person across all men and women"""
+    # Only system admins can see all matches
+    if current_user.email != current_app.config.get('ADMIN_EMAIL'):
+        return jsonify({'message': 'Not authorized'}), 403
+    
+    method = request.args.get('method', 'assignment')
+    if method not in PAIRING_METHODS:
+        return jsonify({'message': f"method must be one of: {', '.join(PAIRING_METHODS)}"}), 400
+    min_score = request.args.get('min_score', 50, type=int)
+    exclude_same_matchmaker = request.args.get('exclude_same_matchmaker', 'true').lower() \
+        not in ('0', 'false', 'no')
+    try:
+        weights = requested_weights()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    def compute():
+        return get_pairing_suggestions(method=method, min_score=min_score,
+                                       exclude_same_matchmaker=exclude_same_matchmaker,
+                                       include_details=wants_details(), weights=weights)
+    
+    return match_list_response('pairings', None, compute, 'pair', key='pairings')
 
 @matches_bp.route('/matchmaker/matches', methods=['GET'])
 @token_required
 def get_matches_for_matchmaker(current_user):
     """Get matches for all applicants of a matchmaker"""
     limit = request.args.get('limit', 100, type=int)
-    matches = get_matchmaker_matches(current_user.id, limit=limit)
-    print(matches)
-    return jsonify({
-        'matches': matches,
-        'count': len(matches)
-    })
+    try:
+        weights = requested_weights()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    def compute():
+        if use_score_store(weights):
+            return get_stored_matchmaker_matches(current_user.id, limit=limit,
+                                                 include_details=wants_details())
+        return get_matchmaker_matches(current_user.id, limit=limit,
+                                      include_details=wants_details(),
+                                      reciprocal=wants_reciprocal(), weights=weights)
+    
+    def iterate():
+        if use_score_store(weights):
+            return iter_stored_matchmaker_matches(current_user.id, limit=limit,
+                                                  include_details=wants_details())
+        return iter_matchmaker_matches(current_user.id, limit=limit,
+                                       include_details=wants_details(),
+                                       reciprocal=wants_reciprocal(), weights=weights)
+    
+    return match_list_response('matchmaker', current_user.id, compute, 'applicant', iterate=iterate)
 
 @matches_bp.route('/matches/compatibility/<int:user_a_id>/<int:user_b_id>', methods=['GET'])
 @token_required
@@ -101,26 +245,20 @@ def get_match_compatibility(current_user, user_a_id, user_b_id):
     if not (applicant_a or applicant_b):
         return jsonify({'message': 'Not authorized to view this match'}), 403
     
-    user_a = User.query.get(user_a_id)
-    user_b = User.query.get(user_b_id)
-    
-    if not user_a or not user_b:
+    pair = get_pair_compatibility(user_a_id, user_b_id)
+    if not pair:
         return jsonify({'message': 'One or both users not found'}), 404
     
-    from app.services.match_engine import score_match, get_compatibility_details
-    
-    score = score_match(user_a, user_b)
-    compatibility = get_compatibility_details(user_a, user_b)
-    
     return jsonify({
         'user_a': {
-            'id': user_a.id,
-            'name': user_a.name
+            'id': pair['user_a'].id,
+            'name': pair['user_a'].name
         },
         'user_b': {
-            'id': user_b.id,
-            'name': user_b.name
+            'id': pair['user_b'].id,
+            'name': pair['user_b'].name
         },
-        'score': score,
-        'compatibility': compatibility
+        'score': pair['score'],
+        'reciprocal': pair['reciprocal'],
+        'compatibility': pair['compatibility']
     })
@@ -1,9 +1,10 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 from app.models.user import User
 from app.models.religion import ReligiousProfile
 from app.models.background import BackgroundPreferences
 from app.models.lifestyle import LifestylePreferences
 from app.models.matchmaker import Matchmaker, Applicant
+from app.services.profile_features import update_derived_fields
 from app import db
 from functools import wraps
 import jwt
@@ -23,7 +24,7 @@ def token_required(f):
             return jsonify({'message': 'Token is missing'}), 401
         
         try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
+            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
             current_user = Matchmaker.query.filter_by(id=data['id']).first()
         except:
             return jsonify({'message': 'Token is invalid'}), 401
@@ -109,6 +110,9 @@ def create_user(current_user):
         )
         db.session.add(lifestyle)
         
+        # Numeric columns the match engine reads instead of parsing strings
+        update_derived_fields(user, religious_profile, background)
+        
         # Link user to matchmaker
         applicant = Applicant(
             user_id=user.id,
@@ -118,6 +122,10 @@ def create_user(current_user):
         
         db.session.commit()
         
+        # Score the new user once and fold them into stored scores and cached match lists
+        from app.services.incremental import add_new_users
+        add_new_users([user.id])
+        
         return jsonify({
             'message': 'User created successfully',
             'user_id': user.id
@@ -138,7 +146,7 @@ def get_user(current_user, user_id):
     ).first()
     
     # Allow admin to see all users
-    is_admin = current_user.email == app.config.get('ADMIN_EMAIL')
+    is_admin = current_user.email == current_app.config.get('ADMIN_EMAIL')
     
     if not (applicant or is_admin):
         return jsonify({'message': 'User not found or not authorized'}), 404
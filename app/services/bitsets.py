@@ -0,0 +1,105 @@
+"""
+Integer bitmask encoding for multi-valued profile fields.
+
+cultural_background, languages, relationship_traits and ranked_priorities
+draw from small closed vocabularies, so a list of values becomes an integer
+with one bit per vocabulary entry and Jaccard similarity is
+popcount(a & b) / popcount(a | b). Values outside the registered vocabulary
+get the next free bit on first sight, so encoding never loses information.
+"""
+
+import numpy as np
+
+# Registered vocabularies (same values the importers and test data produce)
+VOCABULARIES = {
+    "cultural_background": [
+        "Ashkenazi", "Ashkenazi - Mix", "Sephardic - Persian",
+        "Sephardic - Syrian, Lebanese, Egyptian",
+        "Sephardic - Moroccan, Algerian, Tunisian (French)",
+        "Sephardic - Moroccan, Algerian, Tunisian (Israeli)",
+        "Sephardic - Bukharin", "Sephardic - Israeli Mix", "Other"
+    ],
+    "languages": ["Arabic", "English", "French", "Hebrew", "Persian", "Russian", "Spanish", "Other"],
+    "relationship_traits": [
+        "Personal space", "Mutual consideration/respect", "Simplicity", "Peacefulness",
+        "Accepting imperfections", "Trying new things", "Routine", "Communication"
+    ],
+    "ranked_priorities": [
+        "Family", "Partner Satisfaction", "Self-Satisfaction", "Career", "Religion", "Friends"
+    ]
+}
+
+WORD_BITS = 64
+
+# Bits set in every byte value, for NumPy versions without bitwise_count
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+class Vocabulary:
+    """Value -> bit position for one multi-valued field"""
+
+    def __init__(self, values=()):
+        self.bits = {}
+        for value in values:
+            self.bit(value)
+
+    def __len__(self):
+        return len(self.bits)
+
+    def bit(self, value):
+        """Bit position of a value, assigning the next free bit to new values"""
+        return self.bits.setdefault(value, len(self.bits))
+
+    def encode(self, values):
+        """Integer bitmask of a list of values (0 for missing or empty)"""
+        mask = 0
+        for value in values or ():
+            mask |= 1 << self.bit(value)
+        return mask
+
+_vocabularies = {field: Vocabulary(values) for field, values in VOCABULARIES.items()}
+
+def register_vocabulary(field, values):
+    """Register (or extend) the vocabulary of a multi-valued field"""
+    vocabulary = _vocabularies.setdefault(field, Vocabulary())
+    for value in values:
+        vocabulary.bit(value)
+    return vocabulary
+
+def get_vocabulary(field):
+    return _vocabularies.setdefault(field, Vocabulary())
+
+def encode_mask(field, values):
+    """Integer bitmask of a list of values for a registered field"""
+    return get_vocabulary(field).encode(values)
+
+def jaccard_mask(mask_a, mask_b):
+    """Jaccard similarity of two bitmasks, 0.5 when either side is empty (like array_compatibility)"""
+    if not mask_a or not mask_b:
+        return 0.5
+    return (mask_a & mask_b).bit_count() / (mask_a | mask_b).bit_count()
+
+def encode_masks(field, rows):
+    """Bitmasks of many value lists as a uint64 array of shape (len(rows), words)"""
+    masks = [encode_mask(field, values) for values in rows]
+    words = max(1, -(-len(get_vocabulary(field)) // WORD_BITS))
+    encoded = np.zeros((len(masks), words), dtype=np.uint64)
+    for word in range(words):
+        shift = word * WORD_BITS
+        encoded[:, word] = [(mask >> shift) & 0xFFFFFFFFFFFFFFFF for mask in masks]
+    return encoded
+
+def popcount(words):
+    """Set bits per uint64 element"""
+    words = np.asarray(words, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    as_bytes = np.ascontiguousarray(words).view(np.uint8).reshape(words.shape + (8,))
+    return _BYTE_POPCOUNT[as_bytes].sum(axis=-1)
+
+def jaccard_masks(masks_a, masks_b):
+    """Vectorized jaccard_mask over broadcastable (..., words) uint64 arrays"""
+    intersection = popcount(masks_a & masks_b).sum(axis=-1)
+    union = popcount(masks_a | masks_b).sum(axis=-1)
+    present = np.any(masks_a != 0, axis=-1) & np.any(masks_b != 0, axis=-1)
+    jaccard = np.divide(intersection, union, out=np.full(union.shape, 0.5), where=union > 0)
+    return np.where(present, jaccard, 0.5)
@@ -0,0 +1,126 @@
+"""
+Blocking index for min_score queries.
+
+Candidates are bucketed by gender and their observance ranks. Every other
+component of a score is at most 1, and the rank components depend only
+on the two ranks, so each pair of buckets has a best achievable score. A
+min_score query skips every bucket whose best score cannot reach the
+threshold; the buckets it does visit are scored as usual, so results are
+identical to a full scan.
+
+Gender alone is about half the default weight and equality fields never
+score below 0.5, so no opposite-gender pair scores under ~61. Buckets only
+fall away at thresholds near the best matches' scores: above about 90
+under the default weights, from about 80 when observance weighs more. When
+the index would still visit most pairs, groups() hands back the full scan.
+
+The bound holds in both directions (the rank components are symmetric),
+so it applies to reciprocal rankings as well.
+"""
+
+import numpy as np
+
+# Rank fields the index buckets on, besides gender: all of match_vectors.RANK_FIELDS,
+# so the bound is exact on every rank component
+BLOCKING_FIELDS = ("shabbat_observance", "kosher_observance", "jewish_learning",
+                   "synagogue_attendance", "prayer_habits")
+
+# Score points added to a bound before comparing it with min_score. Scores
+# are rounded to one decimal (up to 0.05 up) and reweighted totals are
+# summed in float32.
+BOUND_SLACK = 0.05 + 0.01
+
+# Above this share of rows x candidates pairs still visited, scan everything:
+# scoring many smaller blocks costs more than the pairs it saves
+MAX_VISITED_FRACTION = 0.85
+
+def rank_similarities(field):
+    """Similarity of every (rank_a, rank_b) pair as a matrix indexed by rank + 1 (-1 is missing)"""
+    from app.services.match_vectors import RANK_FIELDS
+
+    ranking = RANK_FIELDS[field][1]
+    max_diff = max(ranking.values()) - min(ranking.values())
+    ranks = np.arange(-1, max(ranking.values()) + 1)
+    if max_diff == 0:
+        similarity = np.ones((len(ranks), len(ranks)))
+    else:
+        similarity = 1 - np.abs(ranks[:, None] - ranks[None, :]) / max_diff
+    # Missing or unknown ranks score the neutral 0.5 against anything
+    similarity[0, :] = 0.5
+    similarity[:, 0] = 0.5
+    return similarity
+
+class BlockingIndex:
+    """Candidate rows of a ProfilePool bucketed by gender and BLOCKING_FIELDS ranks"""
+
+    def __init__(self, pool, candidates):
+        self.pool = pool
+        self.candidates = np.asarray(candidates, dtype=np.int64)
+        self.similarities = {field: rank_similarities(field) for field in BLOCKING_FIELDS}
+
+        # Bucket keys, and the bucket of each position in `candidates`
+        keys = self.keys(self.candidates)
+        if len(keys):
+            self.bucket_keys, bucket_of = np.unique(keys, axis=0, return_inverse=True)
+            self.bucket_of = bucket_of.ravel()
+        else:
+            self.bucket_keys = keys
+            self.bucket_of = np.zeros(0, dtype=np.int64)
+        self.bucket_sizes = np.bincount(self.bucket_of, minlength=len(self.bucket_keys))
+
+    def __len__(self):
+        return len(self.bucket_keys)
+
+    def keys(self, rows):
+        """(gender, ranks...) of pool rows, one row per key"""
+        return np.stack([self.pool.gender[rows].astype(np.int64)]
+                        + [self.pool.ranks[field][rows].astype(np.int64) for field in BLOCKING_FIELDS],
+                        axis=1)
+
+    def bounds(self, row_keys, weights=None):
+        """Highest score each row key can reach against each bucket, shape (row keys, buckets)
+
+        Same-gender buckets are 0.
+        """
+        from app.services.match_vectors import SCORE_FIELDS, weight_vector
+
+        vector = weight_vector(weights).astype(np.float64)
+        row_keys = np.asarray(row_keys, dtype=np.int64).reshape(-1, len(BLOCKING_FIELDS) + 1)
+        # Every component is at most 1, except the rank fields in the key
+        shortfall = np.zeros((len(row_keys), len(self.bucket_keys)))
+        for i, field in enumerate(BLOCKING_FIELDS, start=1):
+            similarity = self.similarities[field][row_keys[:, i, None] + 1,
+                                                  self.bucket_keys[None, :, i] + 1]
+            shortfall += vector[SCORE_FIELDS.index(field)] * (1 - similarity)
+        best = (1 - shortfall / vector.sum()) * 100
+        best[row_keys[:, 0, None] == self.bucket_keys[None, :, 0]] = 0
+        return best
+
+    def best_score(self, row_key, bucket_key, weights=None):
+        """Highest score any row with row_key can reach against a bucket (0 for same gender)"""
+        bucket = np.flatnonzero((self.bucket_keys == np.asarray(bucket_key)).all(axis=1))[0]
+        return float(self.bounds([row_key], weights)[0, bucket])
+
+    def groups(self, rows, min_score, weights=None):
+        """(rows, candidates) pairs covering every pair of rows x candidates that can reach min_score
+
+        Rows that keep the same buckets share one candidate list, in
+        candidate order. When more than MAX_VISITED_FRACTION of the pairs
+        would be visited anyway, the one group is (rows, candidates).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows) or not len(self.candidates):
+            return [(rows, self.candidates)]
+        row_keys, row_key_of = np.unique(self.keys(rows), axis=0, return_inverse=True)
+        keep = self.bounds(row_keys, weights) + BOUND_SLACK >= min_score
+
+        visited = np.bincount(row_key_of.ravel(), minlength=len(row_keys)) @ (keep @ self.bucket_sizes)
+        if visited > MAX_VISITED_FRACTION * len(rows) * len(self.candidates):
+            return [(rows, self.candidates)]
+
+        patterns, pattern_of = np.unique(keep, axis=0, return_inverse=True)
+        pattern_of_row = pattern_of.ravel()[row_key_of.ravel()]
+        return [
+            (rows[pattern_of_row == group], self.candidates[pattern[self.bucket_of]])
+            for group, pattern in enumerate(patterns)
+        ]
@@ -0,0 +1,127 @@
+"""
+Incremental matching for newly added users.
+
+A commit that adds users no longer invalidates every cached match list.
+Instead each new user is scored once against the users whose lists are
+cached, and merged into every list where they rank, giving the list
+find_matches_for_user would now compute. With MATCH_SCORE_STORE the stored
+lists they enter are rebuilt in the same call.
+Importing N users therefore costs N pool scorings rather than a full
+recompute the next time lists are read.
+"""
+
+import json
+
+import numpy as np
+from flask import current_app
+
+from app.services.match_engine import candidate_gender, get_compatibility_details
+from app.services.profile_loader import load_users
+
+def add_new_users(user_ids):
+    """Fold committed new users into the score store and the cached match lists
+
+    Call after the commit that added them (users.create_user, importers).
+    """
+    from app.services.match_cache import take_pending_new_users
+
+    user_ids = set(user_ids)
+    take_pending_new_users(user_ids)
+    if not user_ids:
+        return
+    if current_app.config.get("MATCH_SCORE_STORE"):
+        from app.services.score_store import update_user_scores
+        update_user_scores(user_ids)
+    merge_new_users(user_ids)
+
+def _cached_lists(match_cache):
+    """Cached get_matches_for_user lists as (key, owner id, options, matches)"""
+    lists = []
+    for key, matches in match_cache.entries():
+        name, owner_id, options = json.loads(key)
+        if name == "matches":
+            lists.append((key, owner_id, options, matches))
+    return lists
+
+def _ranking_key(options):
+    return json.dumps([options["reciprocal"], options["weights"]], sort_keys=True)
+
+def merge_new_users(user_ids):
+    """Merge new users into every cached match list where they rank
+
+    Lists are ordered by score, ties by user id as load_users returns
+    candidates, so the merged list equals a fresh computation. Returns the
+    number of lists that changed.
+    """
+    from app.services import match_cache as cache
+    from app.services.match_vectors import (
+        ProfilePool,
+        candidate_columns,
+        dealbreaker_mask,
+        pair_reciprocal_scores
+    )
+
+    if cache.match_cache is None or not user_ids:
+        return 0
+    lists = _cached_lists(cache.match_cache)
+    new_users = load_users(user_ids, scoring_only=True)
+    if not lists or not new_users:
+        return 0
+
+    new_ids = {u.id for u in new_users}
+    owners = load_users({owner_id for _, owner_id, _, _ in lists} - new_ids, scoring_only=True)
+    pool = ProfilePool(owners + new_users)
+    new_rows = np.arange(len(owners), len(pool))
+    dobs, heights = candidate_columns(new_users)
+
+    # One owners x new users matrix per ranking (reciprocal, weights)
+    rankings = {}
+    for _, _, options, _ in lists:
+        rankings.setdefault(_ranking_key(options), (options["reciprocal"], options["weights"]))
+    owner_rows = np.arange(len(owners))
+    scores = {
+        ranking: pool.ranking_scores(owner_rows[:, None], new_rows[None, :], reciprocal, weights)
+        for ranking, (reciprocal, weights) in rankings.items()
+    }
+
+    changed = 0
+    for key, owner_id, options, matches in lists:
+        owner_row = pool.index.get(owner_id)
+        if owner_row is None or owner_row >= len(owners):
+            continue
+        owner = owners[owner_row]
+        row_scores = scores[_ranking_key(options)][owner_row]
+
+        # Same candidate pool and hard preferences as find_matches_for_user
+        listed = {match["user_id"] for match in matches}
+        keep = np.array([u.gender == candidate_gender(owner.gender) and u.id not in listed
+                         for u in new_users], dtype=bool)
+        if options["hard_preferences"]:
+            keep &= dealbreaker_mask(owner, dobs, heights)
+        keep &= row_scores > 0
+        if not keep.any():
+            continue
+
+        columns = np.flatnonzero(keep)
+        records = []
+        for column in columns.tolist():
+            match_user = new_users[column]
+            record = {"user_id": match_user.id, "name": match_user.name,
+                      "score": float(row_scores[column])}
+            if options["include_details"]:
+                record["compatibility"] = get_compatibility_details(owner, match_user)
+            records.append(record)
+        if options["reciprocal"]:
+            directions = pair_reciprocal_scores(pool, np.full(len(columns), owner_row),
+                                                new_rows[columns], options["weights"])
+            for record, direction in zip(records, directions):
+                record["forward_score"] = direction["forward"]
+                record["reverse_score"] = direction["reverse"]
+
+        merged = sorted(matches + records, key=lambda m: (-m["score"], m["user_id"]))
+        merged = merged[:options["limit"]]
+        if [m["user_id"] for m in merged] == [m["user_id"] for m in matches]:
+            continue
+        cache.match_cache.replace(key, merged, [owner_id] + [m["user_id"] for m in merged])
+        changed += 1
+    return changed
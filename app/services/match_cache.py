@@ -0,0 +1,306 @@
+"""
+Shared cache for get_matches_for_user results.
+
+Backends:
+- "memory": per-process dict, for a single worker or tests
+- "sqlite": a local SQLite file every worker on the host reads and writes,
+  no external service needed
+
+Entries expire after MATCH_CACHE_TTL seconds. Each entry remembers the
+population epoch it was computed in; the epoch is bumped when users are
+deleted, which invalidates every list at once. Users that are added are
+merged into the cached lists where they rank (incremental.add_new_users,
+or lazily on the next cached read in the committing process). When a
+user's profile is saved, the lists of that user and lists containing that
+user are dropped. A profile edit that would move someone into another
+user's list only shows up there once that entry expires.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+MATCH_CACHE_BACKENDS = ("none", "memory", "sqlite")
+
+# Default entry lifetime in seconds
+DEFAULT_TTL = 300
+
+class MemoryMatchCache:
+    """In-process backend, bounded by entry count"""
+
+    def __init__(self, max_entries=10_000):
+        self.max_entries = max_entries
+        self.epoch = 0
+        self._entries = OrderedDict()  # key -> (payload, expires_at, epoch, user_ids)
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, expires_at, epoch, _ = entry
+            if expires_at < time.time() or epoch != self.epoch:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return json.loads(payload)
+
+    def set(self, key, value, ttl, user_ids):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (json.dumps(value), time.time() + ttl, self.epoch, set(user_ids))
+            for user_id in user_ids:
+                self._keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for user_id in entry[3]:
+            keys = self._keys_by_user.get(user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_user[user_id]
+
+    def entries(self):
+        """(key, value) of every live entry"""
+        now = time.time()
+        with self._lock:
+            items = [(key, entry[0]) for key, entry in self._entries.items()
+                     if entry[1] >= now and entry[2] == self.epoch]
+        return [(key, json.loads(payload)) for key, payload in items]
+
+    def replace(self, key, value, user_ids):
+        """Overwrite a live entry's value, keeping its expiry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] != self.epoch:
+                return
+            self._remove(key)
+            self._entries[key] = (json.dumps(value), entry[1], entry[2], set(user_ids))
+            for user_id in user_ids:
+                self._keys_by_user.setdefault(user_id, set()).add(key)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def bump_epoch(self):
+        with self._lock:
+            self.epoch += 1
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+class SQLiteMatchCache:
+    """File-backed backend shared by all processes on the host"""
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS entries ("
+        " key TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL, epoch INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_entries_expires_at ON entries (expires_at)",
+        "CREATE TABLE IF NOT EXISTS entry_users (key TEXT NOT NULL, user_id INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_entry_users_user_id ON entry_users (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_entry_users_key ON entry_users (key)",
+        "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO meta (name, value) VALUES ('epoch', 0)"
+    ]
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self):
+        """One connection per thread and process (connections must not cross a fork)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _epoch(self, conn):
+        return conn.execute("SELECT value FROM meta WHERE name = 'epoch'").fetchone()[0]
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT payload FROM entries, meta"
+            " WHERE key = ? AND expires_at >= ? AND meta.name = 'epoch' AND entries.epoch = meta.value",
+            (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl, user_ids):
+        now = time.time()
+        with self._connection() as conn:
+            self._delete_keys(conn, "SELECT key FROM entries WHERE expires_at < ?", (now,))
+            self._delete_keys(conn, "SELECT ?", (key,))
+            conn.execute("INSERT INTO entries (key, payload, expires_at, epoch) VALUES (?, ?, ?, ?)",
+                         (key, json.dumps(value), now + ttl, self._epoch(conn)))
+            conn.executemany("INSERT INTO entry_users (key, user_id) VALUES (?, ?)",
+                             [(key, user_id) for user_id in set(user_ids)])
+
+    def _delete_keys(self, conn, key_query, params):
+        conn.execute(f"DELETE FROM entry_users WHERE key IN ({key_query})", params)
+        conn.execute(f"DELETE FROM entries WHERE key IN ({key_query})", params)
+
+    def entries(self):
+        """(key, value) of every live entry"""
+        rows = self._connection().execute(
+            "SELECT key, payload FROM entries, meta"
+            " WHERE expires_at >= ? AND meta.name = 'epoch' AND entries.epoch = meta.value",
+            (time.time(),)
+        ).fetchall()
+        return [(key, json.loads(payload)) for key, payload in rows]
+
+    def replace(self, key, value, user_ids):
+        """Overwrite a live entry's value, keeping its expiry"""
+        with self._connection() as conn:
+            updated = conn.execute("UPDATE entries SET payload = ? WHERE key = ?",
+                                   (json.dumps(value), key)).rowcount
+            if updated:
+                conn.execute("DELETE FROM entry_users WHERE key = ?", (key,))
+                conn.executemany("INSERT INTO entry_users (key, user_id) VALUES (?, ?)",
+                                 [(key, user_id) for user_id in set(user_ids)])
+
+    def invalidate_user(self, user_id):
+        with self._connection() as conn:
+            keys = [row[0] for row in conn.execute(
+                "SELECT DISTINCT key FROM entry_users WHERE user_id = ?", (user_id,))]
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in keys])
+            conn.executemany("DELETE FROM entry_users WHERE key = ?", [(k,) for k in keys])
+
+    def bump_epoch(self):
+        with self._connection() as conn:
+            conn.execute("UPDATE meta SET value = value + 1 WHERE name = 'epoch'")
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM entry_users")
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM entry_users")
+
+# Active backend and TTL, set by init_match_cache
+match_cache = None
+match_cache_ttl = DEFAULT_TTL
+
+def make_backend(name, path=None):
+    if name == "memory":
+        return MemoryMatchCache()
+    if name == "sqlite":
+        return SQLiteMatchCache(path)
+    if name == "none":
+        return None
+    raise ValueError(f"Unknown match cache backend: {name}")
+
+def matches_cache_key(user_id, **options):
+    """Cache key for one get_matches_for_user call"""
+    return json.dumps(["matches", user_id, options], sort_keys=True)
+
+def cached_matches(key, compute, user_id):
+    """Return the cached list for key, or compute, store and return it"""
+    if match_cache is None:
+        return compute()
+    if pending_new_users:
+        from app.services.incremental import merge_new_users
+        merge_new_users(take_pending_new_users())
+    matches = match_cache.get(key)
+    if matches is None:
+        matches = compute()
+        match_cache.set(key, matches, match_cache_ttl,
+                        [user_id] + [match["user_id"] for match in matches])
+    return matches
+
+# Callbacks run after a commit that added or deleted users
+population_changed_hooks = []
+
+# Users committed in this process whose rank in the cached lists is not merged in yet
+pending_new_users = set()
+
+def take_pending_new_users(user_ids=None):
+    """Remove and return pending new user ids (all of them, or those in user_ids)"""
+    taken = set(pending_new_users) if user_ids is None else pending_new_users & set(user_ids)
+    pending_new_users.difference_update(taken)
+    return taken
+
+def on_population_changed(hook):
+    """Register a callback fired whenever users are added or deleted"""
+    population_changed_hooks.append(hook)
+    return hook
+
+def invalidate_user(user_id):
+    if match_cache is not None:
+        match_cache.invalidate_user(user_id)
+
+def bump_population_epoch():
+    if match_cache is not None:
+        match_cache.bump_epoch()
+
+def _note_population_change(session, flush_context):
+    from app.models.user import User
+    # Still the pre-flush collections, with ids assigned to new rows
+    if any(isinstance(obj, User) for obj in session.deleted):
+        session.info["population_changed"] = True
+    added = [obj.id for obj in session.new if isinstance(obj, User)]
+    if added:
+        session.info.setdefault("added_users", set()).update(added)
+
+def _bump_after_commit(session):
+    deleted = session.info.pop("population_changed", False)
+    added = session.info.pop("added_users", set())
+    if deleted:
+        pending_new_users.clear()
+        bump_population_epoch()
+    elif added and match_cache is not None:
+        # Cached lists stay valid; the new users are merged in where they rank
+        pending_new_users.update(added)
+    if deleted or added:
+        for hook in population_changed_hooks:
+            hook()
+
+def _discard_population_change(session):
+    session.info.pop("population_changed", None)
+    session.info.pop("added_users", None)
+
+def init_match_cache(app):
+    """Create the configured backend and install its invalidation hooks"""
+    from app.services.score_cache import on_profile_saved, profile_saved_hooks
+
+    global match_cache, match_cache_ttl
+    backend = app.config.get("MATCH_CACHE_BACKEND", "none")
+    path = app.config.get("MATCH_CACHE_PATH") or os.path.join(app.instance_path, "match_cache.sqlite3")
+    match_cache = make_backend(backend, path)
+    match_cache_ttl = app.config.get("MATCH_CACHE_TTL", DEFAULT_TTL)
+
+    if invalidate_user not in profile_saved_hooks:
+        on_profile_saved(invalidate_user)
+    for name, listener in (("after_flush", _note_population_change),
+                           ("after_commit", _bump_after_commit),
+                           ("after_rollback", _discard_population_change)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
@@ -1,10 +1,10 @@
 from app.models.user import User
-from app.models.religion import ReligiousProfile
-from app.models.background import BackgroundPreferences
-from app.models.lifestyle import LifestylePreferences
-from sqlalchemy import desc
-from datetime import datetime
-import math
+from app.services.profile_loader import load_users
+from app.services.metrics import StageClock, record_pool, stage_timer
+from app.services.query_stats import track_queries
+from sqlalchemy import or_
+from datetime import datetime, date
+import numpy as np
 
 # Dictionary to score compatibility for various fields
 COMPATIBILITY_WEIGHTS = {
@@ -170,6 +170,43 @@ def parse_height_to_inches(height_str):
     except:
         return 65  # Default average height if parsing fails
 
+def candidate_gender(gender):
+    """Gender of the candidate pool for a user (men see women, everyone else sees men)"""
+    return "Female" if gender == "Male" else "Male"
+
+def birth_date_cutoff(age):
+    """Latest date of birth of someone who is at least `age` years old today"""
+    today = datetime.today()
+    try:
+        return date(today.year - age, today.month, today.day)
+    except ValueError:
+        return date(today.year - age, 2, 28)  # today is Feb 29
+
+def dealbreaker_criteria(user):
+    """SQL predicates that drop candidates ruled out by the user's hard preferences
+
+    Mirrors the zero cases of age_compatibility (candidate older than
+    max_partner_age) and height_compatibility (candidate shorter than
+    min_partner_height, via the derived height_inches column). Candidates
+    with missing data are kept, as the scorer gives them the neutral 0.5.
+    """
+    criteria = []
+    background = user.background
+    if background is None:
+        return criteria
+    
+    if user.dob is not None and background.max_partner_age is not None:
+        cutoff = birth_date_cutoff(background.max_partner_age + 1)
+        criteria.append(or_(User.dob.is_(None), User.dob > cutoff))
+    
+    if user.height is not None:
+        from app.services.profile_features import background_min_height_inches
+        min_inches = background_min_height_inches(background)
+        if min_inches is not None:
+            criteria.append(or_(User.height_inches.is_(None), User.height_inches >= min_inches))
+    
+    return criteria
+
 def score_match(user_a, user_b):
     """Calculate overall match score between two users (0-100)"""
     
@@ -264,38 +301,140 @@ def score_match(user_a, user_b):
     final_score = (weighted_score / total_weight) * 100
     return round(final_score, 1)
 
-def get_matches_for_user(user_id, limit=10):
-    """Get top matches for a specific user"""
-    user = User.query.get(user_id)
-    if not user:
+def score_match_reciprocal(user_a, user_b):
+    """Score a pair in both directions at once
+
+    Returns {"forward": score_match(user_a, user_b), "reverse": score_match(user_b, user_a),
+    "combined": their mean}; the components both directions share are computed once.
+    """
+    from app.services.match_vectors import reciprocal_scores_for
+    return reciprocal_scores_for(user_a, [user_b])[0]
+
+@track_queries
+def get_matches_for_user(user_id, limit=10, include_details=True, hard_preferences=True,
+                         reciprocal=False, weights=None):
+    """Get top matches for a specific user
+
+    Compatibility details are only built for the returned matches; pass
+    include_details=False to skip them entirely. With hard_preferences the
+    user's max partner age and min partner height filter candidates in SQL.
+    With reciprocal=True matches are ranked by the combined score of both
+    directions and carry forward_score and reverse_score as well. `weights`
+    ({field: weight}) overrides COMPATIBILITY_WEIGHTS for this ranking.
+    Results come from the match list cache when one is configured.
+    """
+    from app.services.match_cache import cached_matches, matches_cache_key
+
+    key = matches_cache_key(user_id, limit=limit, include_details=include_details,
+                            hard_preferences=hard_preferences, reciprocal=reciprocal,
+                            weights=weights)
+    return cached_matches(
+        key,
+        lambda: find_matches_for_user(user_id, limit, include_details, hard_preferences,
+                                      reciprocal, weights),
+        user_id
+    )
+
+def find_matches_for_user(user_id, limit=10, include_details=True, hard_preferences=True,
+                          reciprocal=False, weights=None):
+    """Compute get_matches_for_user's result, bypassing the match list cache
+
+    The user is scored against the worker's encoded population
+    (population.population_pool), so only the user and the returned
+    matches are loaded as objects.
+    """
+    from app.services.match_vectors import iter_scores, pair_reciprocal_scores
+    from app.services.population import population_pool
+    from app.services.ranking import top_k
+
+    pool = population_pool()
+    row = pool.index.get(user_id) if pool is not None else None
+    if row is None:
         return []
     
-    # Get users of opposite gender
-    if user.gender == "Male":
-        potential_matches = User.query.filter_by(gender="Female").all()
-    else:
-        potential_matches = User.query.filter_by(gender="Male").all()
+    # Users of opposite gender, minus those the user's hard preferences rule out
+    candidates = pool.gender_rows(candidate_gender(pool.gender_of(row)))
+    candidates = candidates[candidates != row]
+    if hard_preferences:
+        candidates = candidates[pool.dealbreaker_mask(row, candidates)]
+    
+    # Score the whole pool in one vectorized pass and keep the top N non-zero matches
+    record_pool("user", len(candidates) + 1, len(candidates))
+    with stage_timer("scoring"):
+        top_matches = top_k(iter_scores(pool, row, candidates, limit, reciprocal=reciprocal,
+                                        weights=weights), limit)
+    
+    match_ids = pool.ids[[match_row for match_row, _ in top_matches]].tolist()
+    users = {u.id: u for u in load_users([user_id] + match_ids, scoring_only=True)}
+    user = users.get(user_id)
+    if user is None:
+        return []
     
-    # Calculate match scores
     matches = []
-    for potential_match in potential_matches:
-        if potential_match.id == user_id:
-            continue
-        
-        match_score = score_match(user, potential_match)
-        if match_score > 0:  # Only include non-zero matches
-            matches.append({
-                "user_id": potential_match.id,
-                "name": potential_match.name,
-                "score": match_score,
-                "compatibility": get_compatibility_details(user, potential_match)
-            })
-    
-    # Sort by score in descending order
-    matches.sort(key=lambda x: x["score"], reverse=True)
-    
-    # Return top N matches
-    return matches[:limit]
+    match_rows = []
+    details_clock = StageClock("details")
+    for (match_row, match_score), match_id in zip(top_matches, match_ids):
+        potential_match = users.get(match_id)
+        if potential_match is None:
+            continue  # deleted since the pool was checked
+        match = {
+            "user_id": potential_match.id,
+            "name": potential_match.name,
+            "score": match_score
+        }
+        if include_details:
+            with details_clock:
+                match["compatibility"] = get_compatibility_details(user, potential_match)
+        matches.append(match)
+        match_rows.append(match_row)
+    details_clock.observe()
+    
+    if reciprocal:
+        directions = pair_reciprocal_scores(pool, np.full(len(match_rows), row), match_rows, weights)
+        for match, scores in zip(matches, directions):
+            match["forward_score"] = scores["forward"]
+            match["reverse_score"] = scores["reverse"]
+    
+    return matches
+
+@track_queries
+def get_pair_compatibility(user_a_id, user_b_id):
+    """Get score and compatibility details for one specific pair, None if a user is missing
+
+    Each direction is scored once, through the pair score cache.
+    """
+    from app.services.score_cache import scores_for
+    
+    users = {u.id: u for u in load_users([user_a_id, user_b_id], scoring_only=True)}
+    user_a = users.get(user_a_id)
+    user_b = users.get(user_b_id)
+    if not user_a or not user_b:
+        return None
+    
+    with stage_timer("scoring"):
+        forward = scores_for(user_a, [user_b])
+        reverse = scores_for(user_b, [user_a])
+        score = float(forward[0])
+        reciprocal = {
+            "forward": score,
+            "reverse": float(reverse[0]),
+            # Rounded like match_vectors.ProfilePool.reciprocal_scores
+            "combined": float(np.round((forward + reverse) / 2, 1)[0])
+        }
+    with stage_timer("details"):
+        compatibility = get_compatibility_details(user_a, user_b)
+    
+    return {
+        "user_a": user_a,
+        "user_b": user_b,
+        "score": score,
+        "reciprocal": reciprocal,
+        "compatibility": compatibility
+    }
+
+def compare_values(value_a, value_b):
+    """Two values side by side for a details breakdown, "Not specified" where missing"""
+    return f"{value_a or 'Not specified'} vs {value_b or 'Not specified'}"
 
 def get_compatibility_details(user_a, user_b):
     """Get detailed compatibility breakdown between two users"""
@@ -314,8 +453,8 @@ def get_compatibility_details(user_a, user_b):
                 rank_compatibility(rel_a.synagogue_attendance, rel_b.synagogue_attendance, attendance_ranks)
             ) / 4 * 100),
             "details": {
-                "shabbat": rel_a.shabbat_observance + " vs " + rel_b.shabbat_observance,
-                "kosher": rel_a.kosher_observance + " vs " + rel_b.kosher_observance
+                "shabbat": compare_values(rel_a.shabbat_observance, rel_b.shabbat_observance),
+                "kosher": compare_values(rel_a.kosher_observance, rel_b.kosher_observance)
             }
         }
     
@@ -329,74 +468,189 @@ def get_compatibility_details(user_a, user_b):
     
     return details
 
-def get_all_top_matches(limit_per_match=5, min_score=50):
-    """Get all top matches across the entire system"""
-    users = User.query.all()
-    all_matches = []
+def _with_reciprocal_scores(records, pool, weights=None):
+    """Add forward_score and reverse_score to (record, (row, match_row)) items, yielding the records
+
+    Directional scores are computed one batch of pairs at a time.
+    """
+    from app.services.match_vectors import pair_reciprocal_scores
+    from app.services.streaming import batched
+
+    for batch in batched(records):
+        rows, match_rows = zip(*(pair for _, pair in batch))
+        for (match_record, _), scores in zip(batch, pair_reciprocal_scores(pool, rows, match_rows, weights)):
+            match_record["forward_score"] = scores["forward"]
+            match_record["reverse_score"] = scores["reverse"]
+            yield match_record
+
+@track_queries
+def get_all_top_matches(limit_per_match=5, min_score=50, include_details=True, workers=None,
+                        reciprocal=False, weights=None, hard_preferences=True):
+    """Get all top matches across the entire system
+
+    `workers` > 1 shards scoring over that many processes (None reads the
+    MATCH_WORKERS config in scripts and means 1 inside a request, 0 uses
+    every CPU); results are identical.
+    With reciprocal=True pairs are ranked by their combined score and carry
+    forward_score and reverse_score (user_a's and user_b's preferences).
+    `weights` ({field: weight}) overrides COMPATIBILITY_WEIGHTS. With
+    hard_preferences, as in get_matches_for_user, each user_a's candidates
+    ruled out by their dealbreakers are skipped.
+    """
+    all_matches = list(iter_all_top_matches(limit_per_match, min_score, include_details, workers,
+                                            reciprocal, weights, hard_preferences))
     
-    for user in users:
-        user_matches = get_matches_for_user(user.id, limit=limit_per_match)
-        # Filter by minimum score
-        user_matches = [match for match in user_matches if match["score"] >= min_score]
+    # Sort by score
+    all_matches.sort(key=lambda x: x["score"], reverse=True)
+    return all_matches
+
+def iter_all_top_matches(limit_per_match=5, min_score=50, include_details=True, workers=None,
+                         reciprocal=False, weights=None, hard_preferences=True):
+    """Yield the records of get_all_top_matches one at a time, in user order rather than by score"""
+    from app.services.match_vectors import ProfilePool
+    from app.services.parallel_matching import parallel_top_matches_by_row
+
+    users = load_users(scoring_only=True)
+    if not users:
+        return
+    
+    # Encode everyone once and score men against women and everyone else against men
+    record_pool("all", len(users), len(users))
+    with stage_timer("scoring"):
+        pool = ProfilePool(users)
+        male_rows = [row for row, u in enumerate(users) if u.gender == "Male"]
+        female_rows = [row for row, u in enumerate(users) if u.gender == "Female"]
+        other_rows = [row for row, u in enumerate(users) if u.gender != "Male"]
         
-        for match in user_matches:
-            # Create a bidirectional match record
-            match_record = {
-                "user_a_id": user.id,
-                "user_a_name": user.name,
-                "user_b_id": match["user_id"],
-                "user_b_name": match["name"],
-                "score": match["score"],
-                "compatibility": match.get("compatibility", {})
-            }
-            
-            # Check if this match already exists in reverse
-            exists = False
-            for existing in all_matches:
-                if (existing["user_a_id"] == match_record["user_b_id"] and 
-                    existing["user_b_id"] == match_record["user_a_id"]):
-                    exists = True
-                    break
-            
-            if not exists:
-                all_matches.append(match_record)
+        top_matches = parallel_top_matches_by_row(
+            pool, [(male_rows, female_rows), (other_rows, male_rows)],
+            limit_per_match, min_score, workers, reciprocal, weights, hard_preferences
+        )
+    
+    def records():
+        seen_pairs = set()
+        details_clock = StageClock("details")
+        try:
+            for row, user in enumerate(users):
+                for match_row, score in top_matches.get(row, []):
+                    match_user = users[match_row]
+                    
+                    # Keep only the first direction of each pair
+                    if (match_user.id, user.id) in seen_pairs:
+                        continue
+                    seen_pairs.add((user.id, match_user.id))
+                    
+                    match_record = {
+                        "user_a_id": user.id,
+                        "user_a_name": user.name,
+                        "user_b_id": match_user.id,
+                        "user_b_name": match_user.name,
+                        "score": score
+                    }
+                    if include_details:
+                        with details_clock:
+                            match_record["compatibility"] = get_compatibility_details(user, match_user)
+                    yield match_record, (row, match_row)
+        finally:
+            details_clock.observe()
+    
+    if reciprocal:
+        yield from _with_reciprocal_scores(records(), pool, weights)
+    else:
+        for match_record, _ in records():
+            yield match_record
+
+@track_queries
+def get_matchmaker_matches(matchmaker_id, limit=100, include_details=True, hard_preferences=True,
+                           reciprocal=False, weights=None):
+    """Get matches that involve a matchmaker's applicants
+
+    Applicants are scored as one batch: each candidate gender pool is
+    loaded and encoded once, then every applicant is ranked against it.
+    Each applicant gets the same top `limit` as get_matches_for_user.
+    """
+    all_matches = list(iter_matchmaker_matches(matchmaker_id, limit, include_details,
+                                               hard_preferences, reciprocal, weights))
     
     # Sort by score
     all_matches.sort(key=lambda x: x["score"], reverse=True)
     return all_matches
 
-def get_matchmaker_matches(matchmaker_id, limit=100):
-    """Get matches that involve a matchmaker's applicants"""
+def iter_matchmaker_matches(matchmaker_id, limit=100, include_details=True, hard_preferences=True,
+                            reciprocal=False, weights=None):
+    """Yield the records of get_matchmaker_matches one at a time, in applicant order rather than by score"""
+    import numpy as np
     from app.models.matchmaker import Applicant
+    from app.services.match_vectors import (
+        ProfilePool,
+        candidate_columns,
+        dealbreaker_mask,
+        iter_row_scores
+    )
+    from app.services.ranking import top_k
     
     # Get all applicants for this matchmaker
     applicants = Applicant.query.filter_by(shidduch_lady_id=matchmaker_id).all()
     applicant_ids = [a.user_id for a in applicants]
     
     if not applicant_ids:
-        return []
-    
-    all_matches = []
-    
-    # For each applicant, get their matches
-    for applicant_id in applicant_ids:
-        user_matches = get_matches_for_user(applicant_id, limit=limit)
+        return
+    
+    loaded = {u.id: u for u in load_users(applicant_ids, scoring_only=True)}
+    applicant_users = [loaded[user_id] for user_id in applicant_ids if user_id in loaded]
+    if not applicant_users:
+        return
+    
+    # Encode applicants and each candidate gender pool they need together, once
+    genders = sorted({candidate_gender(u.gender) for u in applicant_users})
+    candidate_pools = {gender: load_users(gender=gender, scoring_only=True) for gender in genders}
+    users = list(applicant_users)
+    candidate_rows = {}
+    for gender in genders:
+        candidate_rows[gender] = np.arange(len(users), len(users) + len(candidate_pools[gender]))
+        users.extend(candidate_pools[gender])
+    record_pool("matchmaker", len(users), len(users) - len(applicant_users))
+    with stage_timer("scoring"):
+        pool = ProfilePool(users)
         
-        applicant = User.query.get(applicant_id)
-        if not applicant:
-            continue
-            
-        for match in user_matches:
-            match_record = {
-                "applicant_id": applicant_id,
-                "applicant_name": applicant.name,
-                "match_id": match["user_id"],
-                "match_name": match["name"],
-                "score": match["score"],
-                "compatibility": match.get("compatibility", {})
-            }
-            all_matches.append(match_record)
-    
-    # Sort by score
-    all_matches.sort(key=lambda x: x["score"], reverse=True)
-    return all_matches
+        top_matches = {}
+        for gender in genders:
+            candidates = candidate_rows[gender]
+            candidate_ids = pool.ids[candidates]
+            dobs, heights = candidate_columns(candidate_pools[gender])
+            rows = [row for row, u in enumerate(applicant_users) if candidate_gender(u.gender) == gender]
+            for block_rows, block in pool.score_blocks(rows, candidates, reciprocal=reciprocal,
+                                                       weights=weights):
+                # Never match applicants with themselves
+                block[pool.ids[block_rows][:, None] == candidate_ids[None, :]] = 0
+                for row, row_scores in zip(block_rows.tolist(), block):
+                    if hard_preferences:
+                        row_scores = np.where(dealbreaker_mask(users[row], dobs, heights), row_scores, 0)
+                    top_matches[row] = top_k(iter_row_scores(row_scores, candidates, limit), limit)
+    
+    def records():
+        details_clock = StageClock("details")
+        try:
+            for row, applicant in enumerate(applicant_users):
+                for match_row, score in top_matches.get(row, []):
+                    match_user = users[match_row]
+                    match_record = {
+                        "applicant_id": applicant.id,
+                        "applicant_name": applicant.name,
+                        "match_id": match_user.id,
+                        "match_name": match_user.name,
+                        "score": score
+                    }
+                    if include_details:
+                        with details_clock:
+                            match_record["compatibility"] = get_compatibility_details(applicant,
+                                                                                      match_user)
+                    yield match_record, (row, match_row)
+        finally:
+            details_clock.observe()
+    
+    if reciprocal:
+        yield from _with_reciprocal_scores(records(), pool, weights)
+    else:
+        for match_record, _ in records():
+            yield match_record
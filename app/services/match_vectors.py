@@ -0,0 +1,619 @@
+"""
+Vectorized scoring for the match engine.
+
+Profiles are encoded into NumPy arrays once, then a user is scored against
+the whole candidate pool in a single pass instead of calling score_match
+once per pair. Scores agree with match_engine.score_match to within rounding.
+"""
+
+import json
+from datetime import date
+
+import numpy as np
+
+from app.services.bitsets import encode_masks, jaccard_masks
+from app.services.ranking import top_k
+from app.services.score_cache import tensor_cache
+from app.services.profile_features import (
+    ages_from_ordinals,
+    background_min_height_inches,
+    religious_rank,
+    user_dob_ordinal,
+    user_height_inches
+)
+from app.services.match_engine import (
+    COMPATIBILITY_WEIGHTS,
+    birth_date_cutoff,
+    shabbat_ranks,
+    kosher_ranks,
+    learning_ranks,
+    attendance_ranks,
+    prayer_ranks
+)
+
+# Ordinal fields scored like rank_compatibility: field -> (profile, ranking system)
+RANK_FIELDS = {
+    "shabbat_observance": ("religious_profile", shabbat_ranks),
+    "kosher_observance": ("religious_profile", kosher_ranks),
+    "jewish_learning": ("religious_profile", learning_ranks),
+    "synagogue_attendance": ("religious_profile", attendance_ranks),
+    "prayer_habits": ("religious_profile", prayer_ranks)
+}
+
+# Fields scored 1 for an exact match and 0.5 otherwise: field -> profile
+EQUALITY_FIELDS = {
+    "childrens_education": "religious_profile",
+    "religious_growth": "religious_profile",
+    "convert_status": "background",
+    "marital_status": "background",
+    "children": "background",
+    "aliyah": "background",
+    "conflict_style": "lifestyle",
+    "life_focus": "lifestyle",
+    "activity_level": "lifestyle",
+    "alcohol": "lifestyle",
+    "smoking": "lifestyle"
+}
+
+# Multi-valued fields scored like array_compatibility: field -> profile
+SET_FIELDS = {
+    "cultural_background": "religious_profile",
+    "languages": "religious_profile",
+    "relationship_traits": "lifestyle",
+    "ranked_priorities": "lifestyle"
+}
+
+# Same order score_match accumulates in, so float sums line up
+SCORE_FIELDS = [
+    "gender", "age", "height",
+    "cultural_background", "languages",
+    "shabbat_observance", "kosher_observance", "jewish_learning",
+    "synagogue_attendance", "prayer_habits",
+    "childrens_education", "religious_growth",
+    "convert_status", "marital_status", "children", "aliyah",
+    "conflict_style", "life_focus", "activity_level", "alcohol", "smoking",
+    "relationship_traits", "ranked_priorities"
+]
+
+# Upper bound on cells per block when building a score matrix
+MAX_BLOCK_CELLS = 1_000_000
+
+# Candidates scored per chunk when streaming one user's scores
+CHUNK_SIZE = 8192
+
+# Largest ComponentTensor (in pairs) kept in tensor_cache; bigger blocks are scored once
+MAX_CACHED_TENSOR_CELLS = 65_536
+
+# ProfilePool array attributes, and dict attributes holding one array per field
+POOL_ARRAYS = [
+    "ids", "versions", "gender", "has_dob", "dob", "age", "has_max_age", "max_age",
+    "has_height", "height", "has_min_height", "min_height"
+]
+POOL_ARRAY_GROUPS = ["ranks", "codes", "sets", "dealbreakers"]
+
+def field_weight(field):
+    """Weight of a scored field (score_match defaults unknown fields to 1)"""
+    return COMPATIBILITY_WEIGHTS.get(field, 1)
+
+def weight_vector(weights=None):
+    """Field weights in SCORE_FIELDS order, with {field: weight} overrides applied"""
+    overrides = weights or {}
+    unknown = sorted(set(overrides) - set(SCORE_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown weight fields: {', '.join(unknown)}")
+    if any(isinstance(weight, bool) for weight in overrides.values()):
+        raise ValueError("Weights must be numbers")
+    vector = np.array([float(overrides.get(field, field_weight(field))) for field in SCORE_FIELDS])
+    if not np.isfinite(vector).all() or (vector < 0).any() or vector.sum() <= 0:
+        raise ValueError("Weights must be finite, non-negative and not all zero")
+    return vector.astype(np.float32)
+
+def parse_weights(text):
+    """Parse a weights override: JSON object or "field:weight,field:weight", None if empty"""
+    if not text:
+        return None
+    try:
+        if text.lstrip().startswith("{"):
+            weights = json.loads(text)
+            if any(isinstance(weight, bool) for weight in weights.values()):
+                raise ValueError
+            weights = {field: float(weight) for field, weight in weights.items()}
+        else:
+            weights = {}
+            for item in text.split(","):
+                field, _, weight = item.partition(":")
+                weights[field.strip()] = float(weight)
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError("weights must look like field:weight,field:weight")
+    weight_vector(weights)
+    return weights
+
+def profile_value(user, profile, field):
+    """Read a profile field, treating a missing profile as missing data"""
+    section = getattr(user, profile, None)
+    if section is None:
+        return None
+    return getattr(section, field)
+
+def encode_codes(values, codes=None):
+    """Map values to integer codes so equal values share a code (None included)
+
+    Pass a value -> code dict to extend it, so later encodings stay comparable.
+    """
+    codes = {} if codes is None else codes
+    return np.array([codes.setdefault(v, len(codes)) for v in values], dtype=np.int32)
+
+class ComponentTensor:
+    """Per-field component scores of a set of pairs, float32 with shape (..., fields)
+
+    Fields follow SCORE_FIELDS. A total under any weighting is one
+    matrix-vector product over the last axis, so re-ranking with new
+    weights never rescores profiles.
+    """
+
+    def __init__(self, components, opposite):
+        shape = np.shape(components[SCORE_FIELDS[0]])
+        self.values = np.empty(shape + (len(SCORE_FIELDS),), dtype=np.float32)
+        for i, field in enumerate(SCORE_FIELDS):
+            self.values[..., i] = components[field]
+        # Same-gender pairs always score 0
+        self.opposite = np.broadcast_to(opposite, shape)
+
+    def scores(self, weights=None):
+        """Overall 0-100 scores under `weights` ({field: weight} overrides)"""
+        vector = weight_vector(weights)
+        totals = (self.values @ vector).astype(np.float64)
+        scores = np.round(totals / float(vector.sum()) * 100, 1)
+        return np.where(self.opposite, scores, 0)
+
+def pool_key(ids, versions, day):
+    """Identity for the tensor cache: who is encoded, at which profile versions, as of which day"""
+    return (day, len(ids), hash(ids.tobytes()), hash(versions.tobytes()))
+
+class ProfilePool:
+    """Numeric encoding of a list of users for vectorized scoring"""
+
+    def __init__(self, users, code_maps=None):
+        self.users = list(users)
+        users = self.users
+
+        self.ids = np.array([u.id for u in users], dtype=np.int64)
+        self.index = {user_id: row for row, user_id in enumerate(self.ids.tolist())}
+        self.versions = np.array([u.profile_version or 0 for u in users], dtype=np.int64)
+        self.key = pool_key(self.ids, self.versions, date.today().toordinal())
+        # value -> code of gender and EQUALITY_FIELDS, kept so updated() encodes alike
+        self.code_maps = {} if code_maps is None else code_maps
+        self.gender = encode_codes([u.gender for u in users], self.code_maps.setdefault("gender", {}))
+
+        # Age and the user's own maximum partner age
+        dob_ordinals = [user_dob_ordinal(u) for u in users]
+        self.has_dob = np.array([v is not None for v in dob_ordinals], dtype=bool)
+        self.dob = np.array([v if v is not None else 0 for v in dob_ordinals], dtype=np.int64)
+        self.age = ages_from_ordinals(self.dob).astype(np.float64)
+        max_ages = [profile_value(u, "background", "max_partner_age") for u in users]
+        self.has_max_age = np.array([v is not None for v in max_ages], dtype=bool)
+        self.max_age = np.array([v if v is not None else 0 for v in max_ages], dtype=np.float64)
+
+        # Height in inches and the user's own minimum partner height
+        heights = [user_height_inches(u) for u in users]
+        self.has_height = np.array([v is not None for v in heights], dtype=bool)
+        self.height = np.array([v if v is not None else 0 for v in heights], dtype=np.float64)
+        min_heights = [background_min_height_inches(u.background) for u in users]
+        self.has_min_height = np.array([v is not None for v in min_heights], dtype=bool)
+        self.min_height = np.array([v if v is not None else 0 for v in min_heights],
+                                   dtype=np.float64)
+
+        # Ordinal ranks, -1 for missing or unknown values
+        self.ranks = {}
+        for field in RANK_FIELDS:
+            values = [religious_rank(u.religious_profile, field) for u in users]
+            self.ranks[field] = np.array([v if v is not None else -1 for v in values],
+                                         dtype=np.int8)
+
+        self.codes = {
+            field: encode_codes([profile_value(u, profile, field) for u in users],
+                                self.code_maps.setdefault(field, {}))
+            for field, profile in EQUALITY_FIELDS.items()
+        }
+
+        # Multi-valued fields as (users, words) uint64 bitmasks
+        self.sets = {
+            field: encode_masks(field, [profile_value(u, profile, field) for u in users])
+            for field, profile in SET_FIELDS.items()
+        }
+
+        # Stored columns and limits for hard preferences, NaN where NULL or unset
+        dobs, heights = candidate_columns(users)
+        limits = np.array([dealbreaker_limits(u) for u in users], dtype=np.float64).reshape(-1, 2)
+        self.dealbreakers = {
+            "dob": dobs,
+            "height": heights,
+            "dob_cutoff": limits[:, 0],
+            "min_height": limits[:, 1]
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def arrays(self):
+        """Flat name -> array snapshot of the encoding (no ORM objects)"""
+        arrays = {name: getattr(self, name) for name in POOL_ARRAYS}
+        for group in POOL_ARRAY_GROUPS:
+            for field, array in getattr(self, group).items():
+                arrays[f"{group}.{field}"] = array
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a pool from an arrays() snapshot; `users` is None"""
+        pool = cls.__new__(cls)
+        pool.users = None
+        pool.key = None
+        pool.code_maps = None
+        for name in POOL_ARRAYS:
+            setattr(pool, name, arrays[name])
+        for group in POOL_ARRAY_GROUPS:
+            setattr(pool, group, {})
+        for name, array in arrays.items():
+            group, _, field = name.partition(".")
+            if field:
+                getattr(pool, group)[field] = array
+        pool.index = {user_id: row for row, user_id in enumerate(pool.ids.tolist())}
+        return pool
+
+    def updated(self, users):
+        """Copy of the pool with `users` re-encoded, rows of new ids added, in user id order
+
+        The copy has no `users` list; this pool is left unchanged.
+        """
+        fresh = ProfilePool(users, {name: dict(codes) for name, codes in self.code_maps.items()})
+        rows = np.array([self.index.get(user_id, -1) for user_id in fresh.ids.tolist()],
+                        dtype=np.int64)
+        known = rows >= 0
+
+        fresh_arrays = fresh.arrays()
+        arrays = {}
+        for name, current in self.arrays().items():
+            array = fresh_arrays[name]
+            if current.ndim == 2 and current.shape[1] != array.shape[1]:
+                # A bitset vocabulary grew a word; missing words are empty
+                words = max(current.shape[1], array.shape[1])
+                current = np.pad(current, ((0, 0), (0, words - current.shape[1])))
+                array = np.pad(array, ((0, 0), (0, words - array.shape[1])))
+            current = current.copy()
+            current[rows[known]] = array[known]
+            arrays[name] = np.concatenate([current, array[~known]])
+
+        order = np.argsort(arrays["ids"], kind="stable")
+        if (order != np.arange(len(order))).any():
+            arrays = {name: array[order] for name, array in arrays.items()}
+        pool = ProfilePool.from_arrays(arrays)
+        pool.code_maps = fresh.code_maps
+        # Ages of untouched rows are as of the day this pool was encoded
+        pool.key = pool_key(pool.ids, pool.versions, self.key[0])
+        return pool
+
+    def aged(self):
+        """Copy of the pool with ages and max partner age cutoffs as of today, without re-encoding
+
+        Only these depend on the date; every other array is shared.
+        """
+        arrays = dict(self.arrays())
+        arrays["age"] = ages_from_ordinals(self.dob).astype(np.float64)
+        # dealbreaker_limits: a cutoff where the user has a dob and a max partner age
+        has_cutoff = ~np.isnan(self.dealbreakers["dob"]) & self.has_max_age
+        cutoffs = {age: birth_date_cutoff(int(age) + 1).toordinal()
+                   for age in np.unique(self.max_age[has_cutoff]).tolist()}
+        arrays["dealbreakers.dob_cutoff"] = np.array(
+            [cutoffs[age] if keep else np.nan
+             for age, keep in zip(self.max_age.tolist(), has_cutoff.tolist())], dtype=np.float64)
+        pool = ProfilePool.from_arrays(arrays)
+        pool.code_maps = self.code_maps
+        pool.key = pool_key(pool.ids, pool.versions, date.today().toordinal())
+        return pool
+
+    def gender_rows(self, gender):
+        """Rows of the users with a given gender, in row order"""
+        code = self.code_maps["gender"].get(gender)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.gender == code)
+
+    def gender_of(self, row):
+        """Gender value of a pool row"""
+        code = self.gender[row]
+        return next(value for value, value_code in self.code_maps["gender"].items()
+                    if value_code == code)
+
+    def component_scores(self, rows, candidates):
+        """Per-field compatibility of pool rows (user_a) against candidate rows
+
+        `rows` and `candidates` are index arrays (or a scalar row) that
+        broadcast against each other, e.g. rows[:, None] and candidates[None, :]
+        for a full score matrix.
+        """
+        a = np.asarray(rows, dtype=np.int64)
+        c = np.asarray(candidates, dtype=np.int64)
+        scores = self.shared_components(a, c)
+        scores.update(self.preference_components(a, c, scores))
+        return scores
+
+    def shared_components(self, a, c):
+        """Components that are the same in both directions
+
+        Age and height are included before either side's preferences apply.
+        """
+        shape = np.broadcast(a, c).shape
+        scores = {"gender": np.ones(shape)}
+
+        # Age: 10 year span is the max difference
+        age = np.maximum(0, 1 - np.abs(self.age[a] - self.age[c]) / 10)
+        scores["age"] = np.where(self.has_dob[a] & self.has_dob[c], age, 0.5)
+
+        # Height: 12 inch difference is 0
+        height = np.maximum(0, 1 - np.abs(self.height[a] - self.height[c]) / 12)
+        scores["height"] = np.where(self.has_height[a] & self.has_height[c], height, 0.5)
+
+        for field, (profile, ranking) in RANK_FIELDS.items():
+            max_diff = max(ranking.values()) - min(ranking.values())
+            rank_a = self.ranks[field][a]
+            rank_b = self.ranks[field][c]
+            if max_diff == 0:
+                similarity = np.ones(shape)
+            else:
+                similarity = 1 - np.abs(rank_b.astype(np.float64) - rank_a) / max_diff
+            scores[field] = np.where((rank_a >= 0) & (rank_b >= 0), similarity, 0.5)
+
+        for field, codes in self.codes.items():
+            scores[field] = np.where(codes[c] == codes[a], 1.0, 0.5)
+
+        for field, masks in self.sets.items():
+            scores[field] = jaccard_masks(masks[a], masks[c])
+
+        return scores
+
+    def preference_components(self, a, c, shared):
+        """Age and height with user_a's max age and min height applied to candidate c"""
+        over_age = self.has_dob[a] & self.has_dob[c] & self.has_max_age[a] \
+            & (self.age[c] > self.max_age[a])
+        too_short = self.has_height[a] & self.has_height[c] & self.has_min_height[a] \
+            & (self.height[c] < self.min_height[a])
+        return {
+            "age": np.where(over_age, 0, shared["age"]),
+            "height": np.where(too_short, 0, shared["height"])
+        }
+
+    def dealbreaker_mask(self, row, candidates):
+        """dealbreaker_mask for pool row `row`: True for candidate rows its hard preferences keep"""
+        columns = self.dealbreakers
+        return ~(columns["dob"][candidates] <= columns["dob_cutoff"][row]) \
+            & ~(columns["height"][candidates] < columns["min_height"][row])
+
+    def total_scores(self, components, a, c, weights=None):
+        """Weighted 0-100 score from component arrays, 0 for same-gender pairs
+
+        A weights override goes through a ComponentTensor built from these
+        components; the default weights keep score_match's exact summation.
+        """
+        if weights is not None:
+            return ComponentTensor(components, self.gender[c] != self.gender[a]).scores(weights)
+
+        weighted_score = np.zeros(np.broadcast(a, c).shape)
+        total_weight = 0
+        for field in SCORE_FIELDS:
+            weight = field_weight(field)
+            weighted_score += components[field] * weight
+            total_weight += weight
+
+        scores = np.round(weighted_score / total_weight * 100, 1)
+        # Must be opposite gender
+        scores[self.gender[c] == self.gender[a]] = 0
+        return scores
+
+    def weighted_scores(self, rows, candidates, weights=None):
+        """Overall match scores (0-100) for broadcast rows/candidates
+
+        A weights override is a dot product against the pairs' cached
+        ComponentTensor, so only the first weighting scores the profiles.
+        """
+        a = np.asarray(rows, dtype=np.int64)
+        c = np.asarray(candidates, dtype=np.int64)
+        if weights is not None:
+            return self.component_tensor(a, c).scores(weights)
+        return self.total_scores(self.component_scores(a, c), a, c)
+
+    def component_tensor(self, rows, candidates):
+        """ComponentTensor of broadcast rows/candidates, from tensor_cache when this pool built it"""
+        a = np.asarray(rows, dtype=np.int64)
+        c = np.asarray(candidates, dtype=np.int64)
+        key = None
+        if self.key is not None and np.broadcast(a, c).size <= MAX_CACHED_TENSOR_CELLS:
+            key = (self.key, a.shape, hash(a.tobytes()), c.shape, hash(c.tobytes()))
+            tensor = tensor_cache.get(key)
+            if tensor is not None:
+                return tensor
+        tensor = ComponentTensor(self.component_scores(a, c), self.gender[c] != self.gender[a])
+        if key is not None:
+            tensor_cache.put(key, tensor)
+        return tensor
+
+    def reciprocal_scores(self, rows, candidates, weights=None):
+        """Forward, reverse and combined scores for broadcast rows/candidates
+
+        Forward applies the row user's preferences (score_match(row, candidate)),
+        reverse the candidate's (score_match(candidate, row)) and combined is
+        their mean. Shared components are computed once for both directions.
+        """
+        a = np.asarray(rows, dtype=np.int64)
+        c = np.asarray(candidates, dtype=np.int64)
+        shared = self.shared_components(a, c)
+        forward = self.total_scores(dict(shared, **self.preference_components(a, c, shared)),
+                                    a, c, weights)
+        reverse = self.total_scores(dict(shared, **self.preference_components(c, a, shared)),
+                                    a, c, weights)
+        return {
+            "forward": forward,
+            "reverse": reverse,
+            "combined": np.round((forward + reverse) / 2, 1)
+        }
+
+    def ranking_scores(self, rows, candidates, reciprocal=False, weights=None):
+        """Scores used to rank matches: forward, or combined when reciprocal"""
+        if reciprocal:
+            return self.reciprocal_scores(rows, candidates, weights)["combined"]
+        return self.weighted_scores(rows, candidates, weights)
+
+    def score_against(self, row, candidates, reciprocal=False, weights=None):
+        """Overall match scores (0-100) of pool row `row` against candidate rows"""
+        return self.ranking_scores(row, candidates, reciprocal, weights)
+
+    def score_blocks(self, rows, candidates, max_cells=MAX_BLOCK_CELLS, reciprocal=False,
+                     weights=None):
+        """Yield (row indices, score block) covering the rows x candidates matrix
+
+        The matrix is built in row blocks so memory stays bounded on large pools.
+        A row's score against itself is 0.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        candidates = np.asarray(candidates, dtype=np.int64)
+        step = max(1, max_cells // max(len(candidates), 1))
+        for start in range(0, len(rows), step):
+            block_rows = rows[start:start + step]
+            block = self.ranking_scores(block_rows[:, None], candidates[None, :], reciprocal, weights)
+            block[block_rows[:, None] == candidates[None, :]] = 0
+            yield block_rows, block
+
+    def score_matrix(self, rows, candidates):
+        """Full score matrix of pool rows against candidate rows"""
+        blocks = [block for _, block in self.score_blocks(rows, candidates)]
+        if not blocks:
+            return np.zeros((0, len(candidates)))
+        return np.vstack(blocks)
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, ties kept in index order"""
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+    kth = np.partition(scores, n - k)[n - k]
+    selected = np.flatnonzero(scores >= kth)
+    return selected[np.argsort(-scores[selected], kind="stable")][:k]
+
+def iter_row_scores(row_scores, candidates, limit=None, min_score=0):
+    """Yield (candidate, score) for non-zero scores >= min_score in candidate order
+
+    With a limit, only the row's own top `limit` entries are yielded. Any
+    global top-`limit` entry is also in its row's top `limit`, so a top_k
+    over several rows or chunks loses nothing.
+    """
+    if limit is not None:
+        keep = np.sort(top_k_indices(row_scores, limit))
+    else:
+        keep = np.arange(len(row_scores))
+    keep = keep[(row_scores[keep] > 0) & (row_scores[keep] >= min_score)]
+    yield from zip(np.asarray(candidates)[keep].tolist(), row_scores[keep].tolist())
+
+def iter_scores(pool, row, candidates, limit=None, min_score=0, chunk_size=CHUNK_SIZE,
+                reciprocal=False, weights=None):
+    """Stream (candidate row, score) for pool row `row`, scoring candidates chunk by chunk"""
+    candidates = np.asarray(candidates, dtype=np.int64)
+    for start in range(0, len(candidates), chunk_size):
+        chunk = candidates[start:start + chunk_size]
+        yield from iter_row_scores(pool.score_against(row, chunk, reciprocal, weights),
+                                   chunk, limit, min_score)
+
+def top_matches_by_row(pool, rows, candidates, limit, min_score=0, reciprocal=False, weights=None,
+                       hard_preferences=False):
+    """Top `limit` non-zero matches per row from the rows x candidates matrix
+
+    Returns {row: [(candidate row, score), ...]} with scores in descending order.
+    With reciprocal=True rows are ranked by the combined score, and weights
+    overrides the field weights. With hard_preferences each row drops the
+    candidates its dealbreakers rule out. With a positive min_score,
+    candidates in observance buckets that cannot reach it are never scored,
+    unless so few are ruled out that one full scan is cheaper.
+    """
+    from app.services.blocking import BlockingIndex
+
+    candidates = np.asarray(candidates, dtype=np.int64)
+    if min_score > 0:
+        groups = BlockingIndex(pool, candidates).groups(rows, min_score, weights)
+    else:
+        groups = [(rows, candidates)]
+
+    results = {}
+    for group_rows, group_candidates in groups:
+        for block_rows, block in pool.score_blocks(group_rows, group_candidates, reciprocal=reciprocal,
+                                                   weights=weights):
+            for row, row_scores in zip(block_rows.tolist(), block):
+                if hard_preferences:
+                    row_scores = np.where(pool.dealbreaker_mask(row, group_candidates), row_scores, 0)
+                results[row] = top_k(iter_row_scores(row_scores, group_candidates, limit, min_score),
+                                     limit)
+    return results
+
+def top_matches_for_user(user, candidates, limit, reciprocal=False, weights=None):
+    """Top `limit` non-zero (candidate, score) pairs for one user, best first"""
+    candidates = list(candidates)
+    pool = ProfilePool([user] + candidates)
+    top = top_k(iter_scores(pool, 0, np.arange(1, len(pool)), limit, reciprocal=reciprocal,
+                            weights=weights), limit)
+    return [(candidates[row - 1], score) for row, score in top]
+
+def score_user_against(user, candidates, weights=None):
+    """Score one user against a list of candidate users, returns an array of scores"""
+    pool = ProfilePool([user] + list(candidates))
+    return pool.score_against(0, np.arange(1, len(pool)), weights=weights)
+
+def pair_reciprocal_scores(pool, rows, candidates, weights=None):
+    """[{"forward", "reverse", "combined"}] for parallel lists of pool rows and candidate rows"""
+    if not len(rows):
+        return []
+    scores = pool.reciprocal_scores(rows, candidates, weights)
+    return [
+        {"forward": forward, "reverse": reverse, "combined": combined}
+        for forward, reverse, combined in zip(scores["forward"].tolist(),
+                                              scores["reverse"].tolist(),
+                                              scores["combined"].tolist())
+    ]
+
+def reciprocal_scores_for(user, candidates, weights=None):
+    """Forward, reverse and combined scores of one user against each candidate"""
+    pool = ProfilePool([user] + list(candidates))
+    candidate_rows = np.arange(1, len(pool))
+    return pair_reciprocal_scores(pool, np.zeros(len(candidate_rows), dtype=np.int64),
+                                  candidate_rows, weights)
+
+def candidate_columns(candidates):
+    """Stored dob ordinals and height_inches of candidates, NaN where NULL"""
+    dobs = np.array([c.dob.toordinal() if c.dob else np.nan for c in candidates], dtype=np.float64)
+    heights = np.array([c.height_inches if c.height_inches is not None else np.nan
+                        for c in candidates], dtype=np.float64)
+    return dobs, heights
+
+def dealbreaker_limits(user):
+    """(birth date cutoff ordinal, min height inches) of the user's hard preferences, NaN if unset"""
+    cutoff = min_inches = np.nan
+    background = user.background
+    if background is None:
+        return cutoff, min_inches
+
+    if user.dob is not None and background.max_partner_age is not None:
+        cutoff = birth_date_cutoff(background.max_partner_age + 1).toordinal()
+
+    if user.height is not None:
+        min_height = background_min_height_inches(background)
+        if min_height is not None:
+            min_inches = min_height
+    return cutoff, min_inches
+
+def dealbreaker_mask(user, candidate_dobs, candidate_heights):
+    """match_engine.dealbreaker_criteria in NumPy: True for candidates the user keeps
+
+    Takes candidate_columns() output; NaN (NULL or no preference) never
+    fails a comparison, like the IS NULL branches of the SQL predicates.
+    """
+    cutoff, min_inches = dealbreaker_limits(user)
+    return ~(candidate_dobs <= cutoff) & ~(candidate_heights < min_inches)
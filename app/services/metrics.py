@@ -0,0 +1,161 @@
+"""
+Prometheus metrics for requests and the match engine.
+
+Metrics live in a registry of their own and are served in the text
+exposition format at /metrics (init_metrics). Tests read them with
+sample_value() or by fetching /metrics from the test client, so no
+collector is needed.
+
+Engine stages are timed around whole sections (a candidate query, a
+vectorized scoring pass, a response body), never per pair, so the
+scoring loops are untouched. Work done a record at a time (detail
+building, NDJSON lines) is summed with a StageClock and observed once.
+
+/metrics is off unless METRICS_ENABLED is set, and with METRICS_TOKEN it
+requires "Authorization: Bearer <token>". Values are per process unless
+PROMETHEUS_MULTIPROC_DIR points at an empty directory when the server
+starts: then every worker writes its values there and /metrics exports
+the sum over all of them. Clear the directory before each start, and
+call mark_worker_dead from the server's worker exit hook (gunicorn:
+child_exit) so the gauges of dead workers are dropped.
+"""
+
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, abort, current_app, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Gauge, Histogram, generate_latest
+
+registry = CollectorRegistry()
+
+# Seconds; from cached lookups up to full-population runs
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+ENGINE_STAGES = ("candidate_load", "scoring", "details", "serialization")
+
+request_latency = Histogram(
+    "sparc_request_duration_seconds", "Request latency by route",
+    ["endpoint", "method", "status"], buckets=LATENCY_BUCKETS, registry=registry
+)
+engine_stage_seconds = Histogram(
+    "sparc_match_engine_stage_seconds", "Time spent in each match engine stage",
+    ["stage"], buckets=LATENCY_BUCKETS, registry=registry
+)
+# With several worker processes the most recently set value wins
+profile_pool_size = Gauge(
+    "sparc_profile_pool_size", "Profiles encoded by the latest ranking, by operation",
+    ["operation"], registry=registry, multiprocess_mode="mostrecent"
+)
+match_candidates = Gauge(
+    "sparc_match_candidates", "Candidates considered by the latest ranking, by operation",
+    ["operation"], registry=registry, multiprocess_mode="mostrecent"
+)
+
+# Label lookups done once rather than per observation
+_stage_histograms = {stage: engine_stage_seconds.labels(stage=stage) for stage in ENGINE_STAGES}
+
+def observe_stage(stage, seconds):
+    _stage_histograms[stage].observe(seconds)
+
+@contextmanager
+def stage_timer(stage):
+    """Time the block as one observation of an engine stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+class StageClock:
+    """Sums many short sections of one stage; observe() records the total once
+
+        clock = StageClock("details")
+        for record in records:
+            with clock:
+                record["compatibility"] = ...
+        clock.observe()
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.elapsed = 0.0
+        self.sections = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed += time.perf_counter() - self._start
+        self.sections += 1
+
+    def observe(self):
+        if self.sections:
+            observe_stage(self.stage, self.elapsed)
+            self.elapsed = 0.0
+            self.sections = 0
+
+def record_pool(operation, pool_size, candidates):
+    """Set the pool size and candidate count gauges for an engine operation"""
+    profile_pool_size.labels(operation=operation).set(pool_size)
+    match_candidates.labels(operation=operation).set(candidates)
+
+def sample_value(name, labels=None):
+    """Current value of one sample, e.g. sample_value("sparc_match_candidates", {"operation": "user"})"""
+    return registry.get_sample_value(name, labels or {})
+
+def multiprocess_dir():
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+def exported_registry():
+    """This process's registry, or one collecting every worker's files in multiprocess mode"""
+    if not multiprocess_dir():
+        return registry
+    from prometheus_client import multiprocess
+    collected = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collected)
+    return collected
+
+def mark_worker_dead(pid):
+    """Drop a dead worker's live gauge files (no-op outside multiprocess mode)"""
+    if multiprocess_dir():
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+
+def metrics_view():
+    if not current_app.config.get("METRICS_ENABLED"):
+        abort(404)
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    return Response(generate_latest(exported_registry()), mimetype=CONTENT_TYPE_LATEST)
+
+# Request hooks
+
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+def _note_status(response):
+    g.response_status = response.status_code
+    return response
+
+def _observe_request(exc):
+    # Runs when the request context is torn down, after a streamed body is sent
+    started = g.pop("request_started", None)
+    if started is None:
+        return
+    status = g.pop("response_status", 500 if exc is not None else 200)
+    request_latency.labels(
+        endpoint=request.endpoint or "unmatched",
+        method=request.method,
+        status=str(status)
+    ).observe(time.perf_counter() - started)
+
+def init_metrics(app):
+    """Install the request timers and the /metrics endpoint"""
+    app.before_request(_start_request_timer)
+    app.after_request(_note_status)
+    app.teardown_request(_observe_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -0,0 +1,116 @@
+"""
+Keyset pagination for match lists.
+
+Lists are ordered by (score desc, pair id asc) and a cursor is the
+opaque encoding of the last record's (score, pair id). The next page
+starts strictly after that key, so cursors stay valid while scores are
+unchanged even if the list is recomputed in between (or on another
+worker). A sorted list is computed once and kept in a small in-process
+result set cache; each following page is a bisect plus a slice.
+"""
+
+import base64
+import json
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+
+# Pair id fields of each kind of match record
+PAIR_ID_FIELDS = {
+    "user": ("user_id",),
+    "pair": ("user_a_id", "user_b_id"),
+    "applicant": ("applicant_id", "match_id")
+}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+def record_key(record, id_fields):
+    return (-record["score"],) + tuple(record[field] for field in id_fields)
+
+def encode_cursor(key):
+    """Opaque cursor for a record_key"""
+    payload = json.dumps([-key[0]] + list(key[1:]), separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, id_fields):
+    """record_key of a cursor, raises ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != 1 + len(id_fields) \
+            or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        raise ValueError("Invalid cursor")
+    return (-values[0],) + tuple(values[1:])
+
+class ResultSet:
+    """A match list sorted by (score desc, pair id) with its keys for bisecting"""
+
+    def __init__(self, records, id_fields):
+        self.id_fields = id_fields
+        self.records = sorted(records, key=lambda r: record_key(r, id_fields))
+        self.keys = [record_key(r, id_fields) for r in self.records]
+        self.created_at = time.time()
+
+    def page(self, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        """(records, next cursor or None) for the page after `cursor`"""
+        start = 0 if cursor is None else bisect_right(self.keys, decode_cursor(cursor, self.id_fields))
+        records = self.records[start:start + page_size]
+        more = start + page_size < len(self.records)
+        next_cursor = encode_cursor(self.keys[start + page_size - 1]) if more and records else None
+        return records, next_cursor
+
+class ResultSetCache:
+    """Small LRU of ResultSets keyed by endpoint parameters"""
+
+    def __init__(self, max_sets=16, ttl=300):
+        self.max_sets = max_sets
+        self.ttl = ttl
+        self._sets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute, id_fields):
+        with self._lock:
+            result_set = self._sets.get(key)
+            if result_set is not None and time.time() - result_set.created_at <= self.ttl:
+                self._sets.move_to_end(key)
+                return result_set
+        result_set = ResultSet(compute(), id_fields)
+        with self._lock:
+            self._sets[key] = result_set
+            self._sets.move_to_end(key)
+            while len(self._sets) > self.max_sets:
+                self._sets.popitem(last=False)
+        return result_set
+
+    def clear(self, *args):
+        with self._lock:
+            self._sets.clear()
+
+result_sets = ResultSetCache()
+
+def paginate(name, params, compute, kind, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """One page of the list `compute()` returns, computed once per (name, params)
+
+    Returns (records, next_cursor). Raises ValueError for a bad cursor.
+    """
+    id_fields = PAIR_ID_FIELDS[kind]
+    if cursor is not None:
+        decode_cursor(cursor, id_fields)
+    key = json.dumps([name, params], sort_keys=True)
+    result_set = result_sets.get_or_compute(key, compute, id_fields)
+    return result_set.page(cursor, page_size)
+
+def init_pagination(app):
+    """Expire result sets with the match cache TTL and drop them when profiles or the population change"""
+    from app.services.match_cache import on_population_changed, population_changed_hooks
+    from app.services.score_cache import on_profile_saved, profile_saved_hooks
+
+    result_sets.ttl = app.config.get("MATCH_CACHE_TTL", result_sets.ttl)
+    if result_sets.clear not in profile_saved_hooks:
+        on_profile_saved(result_sets.clear)
+    if result_sets.clear not in population_changed_hooks:
+        on_population_changed(result_sets.clear)
@@ -0,0 +1,156 @@
+"""
+Global pairing suggestions.
+
+get_all_top_matches lists each person's best matches, so one popular user
+appears in many pairs. Here the whole men x women score matrix is solved
+at once so everyone gets at most one suggested introduction:
+
+- "assignment": maximum total combined score (Hungarian algorithm via SciPy)
+- "stable": Gale-Shapley stable matching, men proposing on their forward
+  scores and women accepting on theirs, so no two people would both rather
+  be paired with each other than with their suggestion
+
+Pairs below min_score, and pairs whose applicants share a matchmaker when
+exclude_same_matchmaker is set, are never suggested.
+"""
+
+import numpy as np
+
+from app import db
+from app.services.match_engine import get_compatibility_details
+from app.services.match_vectors import ProfilePool, MAX_BLOCK_CELLS
+from app.services.metrics import StageClock, record_pool, stage_timer
+from app.services.profile_loader import load_users
+from app.services.query_stats import track_queries
+
+PAIRING_METHODS = ("assignment", "stable")
+
+def _matchmaker_codes(users):
+    """Matchmaker id per user, -1 for users without an applicant record"""
+    from app.models.matchmaker import Applicant
+
+    user_ids = [u.id for u in users]
+    matchmakers = dict(db.session.query(Applicant.user_id, Applicant.shidduch_lady_id)
+                       .filter(Applicant.user_id.in_(user_ids)).all())
+    return np.array([matchmakers.get(user_id) or -1 for user_id in user_ids], dtype=np.int64)
+
+def _score_matrices(pool, men, women, weights=None):
+    """Forward (men's preferences), reverse (women's preferences) and combined men x women scores
+
+    Built in row blocks and stored as float32 to bound memory on large pools.
+    """
+    shape = (len(men), len(women))
+    matrices = {name: np.zeros(shape, dtype=np.float32) for name in ("forward", "reverse", "combined")}
+    step = max(1, MAX_BLOCK_CELLS // max(len(women), 1))
+    for start in range(0, len(men), step):
+        block = pool.reciprocal_scores(men[start:start + step, None], women[None, :], weights)
+        for name, matrix in matrices.items():
+            matrix[start:start + step] = block[name]
+    return matrices["forward"], matrices["reverse"], matrices["combined"]
+
+def assignment_pairs(weights, allowed):
+    """Maximum-weight matching as [(row, column)], using only allowed cells"""
+    from scipy.optimize import linear_sum_assignment
+
+    # Disallowed cells weigh 0, so they are only ever picked as filler and dropped
+    rows, columns = linear_sum_assignment(np.where(allowed, weights, 0), maximize=True)
+    keep = allowed[rows, columns]
+    return list(zip(rows[keep].tolist(), columns[keep].tolist()))
+
+def stable_pairs(proposer_scores, receiver_scores, allowed):
+    """Proposer-optimal stable matching as [(proposer, receiver)]
+
+    proposer_scores[i, j] is how proposer i rates receiver j and
+    receiver_scores[i, j] how receiver j rates proposer i. Disallowed pairs
+    are left off both preference lists; ties prefer the lower index.
+    """
+    proposers, receivers = proposer_scores.shape
+    if not proposers or not receivers:
+        return []
+
+    preferences = np.argsort(np.where(allowed, -proposer_scores, np.inf), axis=1, kind="stable")
+    acceptable = allowed.sum(axis=1)
+    # Position of each proposer in each receiver's preference order (lower is better)
+    receiver_order = np.argsort(-receiver_scores, axis=0, kind="stable")
+    receiver_rank = np.empty_like(receiver_order)
+    np.put_along_axis(receiver_rank, receiver_order,
+                      np.arange(proposers)[:, None].repeat(receivers, axis=1), axis=0)
+
+    next_choice = np.zeros(proposers, dtype=np.int64)
+    partner = np.full(receivers, -1, dtype=np.int64)
+    free = list(range(proposers - 1, -1, -1))
+    while free:
+        proposer = free.pop()
+        while next_choice[proposer] < acceptable[proposer]:
+            receiver = preferences[proposer, next_choice[proposer]]
+            next_choice[proposer] += 1
+            current = partner[receiver]
+            if current < 0:
+                partner[receiver] = proposer
+                break
+            if receiver_rank[proposer, receiver] < receiver_rank[current, receiver]:
+                partner[receiver] = proposer
+                free.append(current)
+                break
+
+    return sorted((int(proposer), receiver) for receiver, proposer in enumerate(partner.tolist())
+                  if proposer >= 0)
+
+@track_queries
+def get_pairing_suggestions(method="assignment", min_score=50, exclude_same_matchmaker=True,
+                            include_details=False, weights=None):
+    """One suggested introduction per person across all men and women
+
+    Returns pair records (man as user_a) with the combined score and both
+    directional scores, best first. `weights` overrides the field weights.
+    """
+    if method not in PAIRING_METHODS:
+        raise ValueError(f"Unknown pairing method: {method}")
+
+    users = load_users(scoring_only=True)
+    men = np.array([row for row, u in enumerate(users) if u.gender == "Male"], dtype=np.int64)
+    women = np.array([row for row, u in enumerate(users) if u.gender == "Female"], dtype=np.int64)
+    if not len(men) or not len(women):
+        return []
+
+    matchmakers = _matchmaker_codes(users) if exclude_same_matchmaker else None
+
+    record_pool("pairings", len(users), len(men) + len(women))
+    with stage_timer("scoring"):
+        pool = ProfilePool(users)
+        forward, reverse, combined = _score_matrices(pool, men, women, weights)
+
+        # Scores are stored as float32, compare against the threshold at one decimal
+        allowed = (combined > 0) & (np.round(combined.astype(np.float64), 1) >= min_score)
+        if matchmakers is not None:
+            same = (matchmakers[men][:, None] == matchmakers[women][None, :]) \
+                & (matchmakers[men][:, None] >= 0)
+            allowed &= ~same
+
+        if method == "assignment":
+            pairs = assignment_pairs(combined, allowed)
+        else:
+            pairs = stable_pairs(forward, reverse, allowed)
+
+    details_clock = StageClock("details")
+    suggestions = []
+    for man, woman in pairs:
+        user_a = users[men[man]]
+        user_b = users[women[woman]]
+        suggestion = {
+            "user_a_id": user_a.id,
+            "user_a_name": user_a.name,
+            "user_b_id": user_b.id,
+            "user_b_name": user_b.name,
+            "score": round(float(combined[man, woman]), 1),
+            "forward_score": round(float(forward[man, woman]), 1),
+            "reverse_score": round(float(reverse[man, woman]), 1)
+        }
+        if include_details:
+            with details_clock:
+                suggestion["compatibility"] = get_compatibility_details(user_a, user_b)
+        suggestions.append(suggestion)
+    details_clock.observe()
+
+    suggestions.sort(key=lambda x: x["score"], reverse=True)
+    return suggestions
@@ -0,0 +1,122 @@
+"""
+Multi-process all-pairs scoring.
+
+The encoded population (ProfilePool arrays, never ORM objects) is copied
+once into shared memory. Worker processes map those segments as read-only
+NumPy arrays without copying, and each task scores one shard of the outer
+user loop. Every row's top matches depend only on that row, so merging the
+shard results by row gives the same output as a single-process run.
+
+Process pools are for batch runs (show_top_matches.py and other
+scripts). Requests always score in-process: a pool started per request
+would pay for process start-up each time, and forking a server process
+copies its memory and open database connections. Workers are started
+with forkserver (spawn where unavailable), never forked from the caller.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app.services.match_vectors import ProfilePool, top_matches_by_row
+
+# Shards per worker, so uneven shards still keep every worker busy
+SHARDS_PER_WORKER = 4
+
+# Set in each worker process by _init_worker
+_worker_pool = None
+_worker_segments = []
+
+def resolve_workers(workers=None):
+    """Worker count: explicit value, else MATCH_WORKERS config outside requests, 0 meaning all CPUs"""
+    if workers is None:
+        from flask import current_app, has_app_context, has_request_context
+        if has_app_context() and not has_request_context():
+            workers = current_app.config.get("MATCH_WORKERS", 1)
+        else:
+            workers = 1
+    workers = int(workers)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+class SharedPoolArrays:
+    """Context manager copying a pool's arrays into shared memory segments once"""
+
+    def __init__(self, pool):
+        self.arrays = pool.arrays()
+        self.segments = []
+        self.spec = {}
+
+    def __enter__(self):
+        for name, array in self.arrays.items():
+            array = np.ascontiguousarray(array)
+            segment = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            self.segments.append(segment)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+            self.spec[name] = (segment.name, array.shape, array.dtype.str)
+        return self.spec
+
+    def __exit__(self, *exc):
+        for segment in self.segments:
+            segment.close()
+            segment.unlink()
+        self.segments = []
+
+def _context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _init_worker(spec):
+    """Map the shared arrays and build the worker's ProfilePool view"""
+    global _worker_pool
+    arrays = {}
+    for name, (segment_name, shape, dtype) in spec.items():
+        # Workers share the parent's resource tracker, which unlinks the segment once
+        segment = shared_memory.SharedMemory(name=segment_name)
+        _worker_segments.append(segment)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+    _worker_pool = ProfilePool.from_arrays(arrays)
+
+def _score_shard(rows, candidates, limit, min_score, reciprocal, weights, hard_preferences):
+    return top_matches_by_row(_worker_pool, rows, candidates, limit, min_score, reciprocal, weights,
+                              hard_preferences)
+
+def _shards(rows, count):
+    rows = np.asarray(rows, dtype=np.int64)
+    return [shard for shard in np.array_split(rows, count) if len(shard)]
+
+def parallel_top_matches_by_row(pool, jobs, limit, min_score=0, workers=None, reciprocal=False,
+                                weights=None, hard_preferences=False):
+    """top_matches_by_row over several (rows, candidates) jobs on a process pool
+
+    Returns the merged {row: [(candidate row, score), ...]} dict. Falls back
+    to the in-process path when only one worker is configured.
+    """
+    workers = resolve_workers(workers)
+    if workers == 1:
+        results = {}
+        for rows, candidates in jobs:
+            results.update(top_matches_by_row(pool, rows, candidates, limit, min_score,
+                                              reciprocal, weights, hard_preferences))
+        return results
+
+    results = {}
+    with SharedPoolArrays(pool) as spec, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=_context(),
+                                initializer=_init_worker, initargs=(spec,)) as executor:
+        futures = []
+        for rows, candidates in jobs:
+            candidates = np.asarray(candidates, dtype=np.int64)
+            for shard in _shards(rows, workers * SHARDS_PER_WORKER):
+                futures.append(executor.submit(_score_shard, shard, candidates, limit, min_score,
+                                               reciprocal, weights, hard_preferences))
+        # Merge in submission order so later jobs override earlier ones like update()
+        for future in futures:
+            results.update(future.result())
+    return results
@@ -0,0 +1,84 @@
+"""
+The encoded population, shared by the requests a worker serves.
+
+Loading and encoding every profile takes seconds on a large population,
+while scoring one user against the encoded arrays takes milliseconds. So
+population_pool() keeps one ProfilePool of all users and checks it on each
+call against the users' current (id, profile_version) pairs, read in one
+column-only query. That snapshot covers the population epoch as well:
+added users are new ids and profile saves bump profile_version. Changed and
+new users are re-encoded into a copy of the pool, and on a new day ages
+are recomputed from the stored birth dates; everyone is re-encoded only
+when users were deleted or most of them changed.
+"""
+
+import threading
+from datetime import date
+
+import numpy as np
+from sqlalchemy import select
+
+from app import db
+from app.models.user import User
+from app.services.profile_loader import load_users
+
+# Re-encode everyone once more than this fraction of users changed
+FULL_REBUILD_FRACTION = 0.5
+
+_lock = threading.Lock()
+_pool = None
+
+def population_versions():
+    """(ids, profile versions) of every user as id-ordered arrays, from one column-only query"""
+    rows = db.session.execute(select(User.id, User.profile_version).order_by(User.id)).all()
+    ids = np.array([user_id for user_id, _ in rows], dtype=np.int64)
+    versions = np.array([version or 0 for _, version in rows], dtype=np.int64)
+    return ids, versions
+
+def changed_user_ids(pool, ids, versions):
+    """Ids that are new or at another profile version than in the pool, None if users were deleted"""
+    if len(pool.ids) == len(ids) and np.array_equal(pool.ids, ids):
+        return ids[pool.versions != versions]
+    positions = np.minimum(np.searchsorted(pool.ids, ids), len(pool.ids) - 1)
+    known = pool.ids[positions] == ids
+    if known.sum() < len(pool.ids):
+        return None
+    return ids[~known | (pool.versions[positions] != versions)]
+
+def population_pool():
+    """ProfilePool of every user, rows in user id order, current as of this call
+
+    The pool is shared: it has no `users` list and must not be modified.
+    Returns None when there are no users.
+    """
+    global _pool
+    from app.services.match_vectors import ProfilePool
+
+    ids, versions = population_versions()
+    with _lock:
+        pool = _pool
+        if not len(ids):
+            _pool = None
+            return None
+
+        changed = None
+        if pool is not None and len(pool.ids):
+            if pool.key[0] != date.today().toordinal():
+                pool = _pool = pool.aged()
+            changed = changed_user_ids(pool, ids, versions)
+        if changed is not None and not len(changed):
+            return pool
+
+        if changed is None or len(changed) > FULL_REBUILD_FRACTION * len(ids):
+            pool = ProfilePool(load_users(scoring_only=True))
+        else:
+            pool = pool.updated(load_users(changed.tolist(), scoring_only=True))
+        pool.users = None
+        _pool = pool
+        return pool
+
+def clear_population_pool():
+    """Drop the shared pool, e.g. after switching databases"""
+    global _pool
+    with _lock:
+        _pool = None
@@ -0,0 +1,102 @@
+"""
+Derived numeric profile columns.
+
+The scorer works on heights in inches, birth dates and observance ranks.
+These are computed once when a profile is written and stored next to the
+source strings, so the match engine never parses strings while scoring.
+Rows written before the columns existed fall back to parsing on read.
+"""
+
+import numpy as np
+
+from app.services.match_engine import (
+    birth_date_cutoff,
+    parse_height_to_inches,
+    shabbat_ranks,
+    kosher_ranks,
+    learning_ranks,
+    attendance_ranks,
+    prayer_ranks
+)
+
+# Religious profile field -> (derived rank column, ranking system)
+RANK_COLUMNS = {
+    "shabbat_observance": ("shabbat_rank", shabbat_ranks),
+    "kosher_observance": ("kosher_rank", kosher_ranks),
+    "jewish_learning": ("learning_rank", learning_ranks),
+    "synagogue_attendance": ("attendance_rank", attendance_ranks),
+    "prayer_habits": ("prayer_rank", prayer_ranks)
+}
+
+# Oldest age the vectorized age lookup resolves
+MAX_AGE = 150
+
+def height_inches(height):
+    """Height string to inches, None when missing (unparseable heights use the scorer's default)"""
+    if height is None:
+        return None
+    return parse_height_to_inches(height)
+
+def min_height_inches(min_height):
+    """Minimum partner height to inches, None when no preference is set"""
+    if not min_height:
+        return None
+    return parse_height_to_inches(min_height)
+
+def rank_value(value, ranking):
+    """Ordinal rank of a value, None when missing or not in the ranking system"""
+    if value is None:
+        return None
+    return ranking.get(value)
+
+def update_derived_fields(user=None, religious_profile=None, background=None):
+    """Refresh derived columns on whichever profile objects are given"""
+    if user is not None:
+        user.height_inches = height_inches(user.height)
+        user.dob_ordinal = user.dob.toordinal() if user.dob else None
+
+    if religious_profile is not None:
+        for field, (column, ranking) in RANK_COLUMNS.items():
+            setattr(religious_profile, column, rank_value(getattr(religious_profile, field), ranking))
+
+    if background is not None:
+        background.min_partner_height_inches = min_height_inches(background.min_partner_height)
+
+# Read helpers: prefer the stored column, parse only rows that predate it
+
+def user_height_inches(user):
+    if user.height_inches is not None:
+        return user.height_inches
+    return height_inches(user.height)
+
+def user_dob_ordinal(user):
+    if user.dob_ordinal is not None:
+        return user.dob_ordinal
+    return user.dob.toordinal() if user.dob else None
+
+def background_min_height_inches(background):
+    if background is None:
+        return None
+    if background.min_partner_height_inches is not None:
+        return background.min_partner_height_inches
+    return min_height_inches(background.min_partner_height)
+
+def religious_rank(religious_profile, field):
+    if religious_profile is None:
+        return None
+    column, ranking = RANK_COLUMNS[field]
+    rank = getattr(religious_profile, column)
+    if rank is not None:
+        return rank
+    return rank_value(getattr(religious_profile, field), ranking)
+
+def ages_from_ordinals(ordinals):
+    """Vectorized calculate_age over birth-date ordinals
+
+    Someone is at least N years old when born on or before the N-year
+    cutoff date, so an age is the number of cutoffs the birth date clears.
+    """
+    cutoffs = np.array([birth_date_cutoff(age).toordinal() for age in range(MAX_AGE, 0, -1)],
+                       dtype=np.int64)  # ascending
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    return len(cutoffs) - np.searchsorted(cutoffs, ordinals, side="left")
@@ -0,0 +1,84 @@
+"""
+Profile loading for the match engine.
+
+User.religious_profile, User.background and User.lifestyle are lazy
+relationships, so touching them per candidate costs one SELECT per profile.
+These helpers fetch users together with all three profiles in a constant
+number of queries (one for users plus one select-in query per profile table).
+"""
+
+from sqlalchemy.orm import selectinload, load_only
+from app.services.metrics import stage_timer
+from app.models.user import User
+from app.models.religion import ReligiousProfile
+from app.models.background import BackgroundPreferences
+from app.models.lifestyle import LifestylePreferences
+
+# Columns read by score_match and get_compatibility_details
+SCORING_COLUMNS = {
+    User: ["id", "name", "gender", "dob", "height", "height_inches", "dob_ordinal",
+           "profile_version"],
+    ReligiousProfile: [
+        "id", "user_id", "cultural_background", "languages", "shabbat_observance",
+        "kosher_observance", "jewish_learning", "synagogue_attendance",
+        "childrens_education", "prayer_habits", "religious_growth",
+        "shabbat_rank", "kosher_rank", "learning_rank", "attendance_rank", "prayer_rank"
+    ],
+    BackgroundPreferences: [
+        "id", "user_id", "convert_status", "marital_status", "children", "aliyah",
+        "min_partner_height", "max_partner_age", "min_partner_height_inches"
+    ],
+    LifestylePreferences: [
+        "id", "user_id", "conflict_style", "life_focus", "activity_level", "alcohol",
+        "smoking", "relationship_traits", "ranked_priorities"
+    ]
+}
+
+# User relationship -> profile model
+PROFILE_RELATIONSHIPS = [
+    (User.religious_profile, ReligiousProfile),
+    (User.background, BackgroundPreferences),
+    (User.lifestyle, LifestylePreferences)
+]
+
+def _columns(model):
+    return [getattr(model, name) for name in SCORING_COLUMNS[model]]
+
+def profile_query(scoring_only=False):
+    """User query that loads all three profiles up front
+
+    With scoring_only=True only the columns the match engine reads are
+    fetched; other attributes are deferred and load on first access.
+    """
+    options = []
+    for relationship, model in PROFILE_RELATIONSHIPS:
+        loader = selectinload(relationship)
+        if scoring_only:
+            loader = loader.load_only(*_columns(model))
+        options.append(loader)
+
+    if scoring_only:
+        options.append(load_only(*_columns(User)))
+
+    return User.query.options(*options)
+
+def load_user(user_id, scoring_only=False):
+    """Load one user with all profiles, None if not found"""
+    with stage_timer("candidate_load"):
+        return profile_query(scoring_only).filter(User.id == user_id).first()
+
+def load_users(user_ids=None, gender=None, scoring_only=False, criteria=None):
+    """Load users with all profiles, optionally restricted by ids, gender and extra SQL criteria"""
+    query = profile_query(scoring_only)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return []
+        query = query.filter(User.id.in_(user_ids))
+    if gender is not None:
+        query = query.filter(User.gender == gender)
+    if criteria:
+        query = query.filter(*criteria)
+    # Deterministic order so equal scores always rank by user id
+    with stage_timer("candidate_load"):
+        return query.order_by(User.id).all()
@@ -0,0 +1,199 @@
+"""
+SQL query accounting built on SQLAlchemy engine events.
+
+Every statement executed on any engine is timed between the
+before_cursor_execute and after_cursor_execute events and recorded in
+each open QueryLog. Logs are opened per request (init_query_stats),
+around the match engine entry points (track_queries) and by tests
+(query_budget). Statement text is parameterized, so a statement run
+`repeat_threshold` times or more in one log is almost always a
+per-row query inside a loop and is reported as an N+1 suspect.
+
+With DEBUG or QUERY_STATS_HEADERS, responses carry X-Query-Count,
+X-Query-Time-Ms and X-Query-Repeats. Streamed bodies run their queries
+after the headers are sent, so the headers only cover the queries made
+before streaming starts.
+"""
+
+import functools
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Executions of one statement in a log at which it is flagged (QUERY_REPEAT_THRESHOLD)
+DEFAULT_REPEAT_THRESHOLD = 10
+
+logger = logging.getLogger(__name__)
+
+# Logs open on this thread, outermost first
+_active = threading.local()
+
+class QueryLog:
+    """Statements executed while the log is open, with their total DB time"""
+
+    def __init__(self, name=None, repeat_threshold=DEFAULT_REPEAT_THRESHOLD):
+        self.name = name
+        self.repeat_threshold = repeat_threshold
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        # Summaries of the engine calls tracked while this log was open
+        self.calls = []
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    @property
+    def repeated(self):
+        """{statement: executions} of the statements run repeat_threshold times or more"""
+        return {statement: count for statement, count in self.statements.most_common()
+                if count >= self.repeat_threshold}
+
+    def summary(self):
+        return {
+            "name": self.name,
+            "queries": self.count,
+            "db_time_ms": round(self.duration * 1000, 1),
+            "repeated": len(self.repeated)
+        }
+
+def _open_logs():
+    logs = getattr(_active, "logs", None)
+    if logs is None:
+        logs = _active.logs = []
+    return logs
+
+def open_log(log):
+    """Start recording statements into a log on this thread"""
+    _open_logs().append(log)
+    return log
+
+def close_log(log):
+    logs = _open_logs()
+    if log in logs:
+        logs.remove(log)
+    return log
+
+@contextmanager
+def query_log(name=None, repeat_threshold=DEFAULT_REPEAT_THRESHOLD):
+    """Record the statements executed inside the block
+
+        with query_log() as log:
+            get_matches_for_user(user_id)
+        log.count, log.duration, log.repeated
+    """
+    log = open_log(QueryLog(name, repeat_threshold))
+    try:
+        yield log
+    finally:
+        close_log(log)
+
+def track_queries(function):
+    """Record a function's queries as one engine call in every open log
+
+    Costs one attribute lookup when no log is open.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        logs = getattr(_active, "logs", None)
+        if not logs:
+            return function(*args, **kwargs)
+        outer = list(logs)
+        with query_log(function.__name__, outer[-1].repeat_threshold) as log:
+            result = function(*args, **kwargs)
+        for parent in outer:
+            parent.calls.append(log.summary())
+        return result
+    return wrapper
+
+def describe(log, limit=5):
+    """Readable summary of a log and its most repeated statements"""
+    lines = [f"{log.count} queries in {log.duration * 1000:.1f} ms"]
+    for call in log.calls:
+        lines.append(f"  {call['name']}: {call['queries']} queries in {call['db_time_ms']} ms")
+    for statement, count in list(log.repeated.items())[:limit]:
+        lines.append(f"  repeated {count}x: {' '.join(statement.split())[:200]}")
+    return "\n".join(lines)
+
+@contextmanager
+def query_budget(max_queries, allow_repeats=False, repeat_threshold=DEFAULT_REPEAT_THRESHOLD):
+    """Test helper: fail if the block runs more than max_queries statements or an N+1 pattern
+
+        with query_budget(5):
+            client.get("/api/matches/matchmaker/matches")
+
+    Raises AssertionError listing the offending statements.
+    """
+    with query_log("query_budget", repeat_threshold) as log:
+        yield log
+
+    problems = []
+    if log.count > max_queries:
+        problems.append(f"query budget exceeded: {log.count} > {max_queries}")
+    if log.repeated and not allow_repeats:
+        problems.append(f"{len(log.repeated)} statements repeated {repeat_threshold}+ times (N+1)")
+    if problems:
+        raise AssertionError("; ".join(problems) + "\n" + describe(log))
+
+# Engine events
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_active, "logs", None):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    for log in getattr(_active, "logs", None) or ():
+        log.record(statement, duration)
+
+def _discard_failed_start(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+# Request hooks
+
+def _open_request_log():
+    threshold = current_app.config.get("QUERY_REPEAT_THRESHOLD", DEFAULT_REPEAT_THRESHOLD)
+    g.query_log = open_log(QueryLog(request.endpoint, threshold))
+
+def _add_query_headers(response):
+    log = g.get("query_log")
+    if log is not None and (current_app.debug or current_app.config.get("QUERY_STATS_HEADERS")):
+        response.headers["X-Query-Count"] = str(log.count)
+        response.headers["X-Query-Time-Ms"] = f"{log.duration * 1000:.1f}"
+        response.headers["X-Query-Repeats"] = str(len(log.repeated))
+    return response
+
+def _close_request_log(exc):
+    log = g.pop("query_log", None)
+    if log is None:
+        return
+    close_log(log)
+    if log.repeated:
+        logger.warning("Possible N+1 queries in %s %s\n%s", request.method, request.path, describe(log))
+    else:
+        logger.debug("%s %s: %s", request.method, request.path, describe(log))
+
+def init_query_stats(app):
+    """Install the engine timers and the per-request query log"""
+    for name, listener in (("before_cursor_execute", _before_cursor_execute),
+                           ("after_cursor_execute", _after_cursor_execute),
+                           ("handle_error", _discard_failed_start)):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+    app.before_request(_open_request_log)
+    app.after_request(_add_query_headers)
+    app.teardown_request(_close_request_log)
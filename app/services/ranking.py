@@ -0,0 +1,19 @@
+"""
+Bounded top-K selection shared by the match engine.
+"""
+
+import heapq
+from operator import itemgetter
+
+def top_k(items, k, key=itemgetter(1)):
+    """Return the k items with the highest key, best first
+
+    Items are consumed as a stream and kept in a bounded heap, so memory is
+    O(k) and time O(n log k). Ties keep their input order, like a stable
+    sort followed by a slice.
+    """
+    if k is None:
+        return sorted(items, key=key, reverse=True)
+    if k <= 0:
+        return []
+    return heapq.nlargest(k, items, key=key)
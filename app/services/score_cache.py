@@ -0,0 +1,258 @@
+"""
+In-process LRU caches for pairwise match scores and component tensors.
+
+Entries are keyed by (user_a_id, user_b_id, profile_version_a,
+profile_version_b, weights_version, today's ordinal), so a profile edit, a
+different weighting or a birthday (ages feed the score and the max partner
+age dealbreaker) can never return a stale score. users.profile_version is bumped
+in a before_flush hook whenever a user or one of their profiles changes,
+and after the commit the profile-saved hooks run; the default hook drops
+the user's entries so stale keys do not sit in the cache until evicted.
+
+Component tensors (per-field scores of a user against a candidate pool)
+are kept by the pool's identity, its user ids and profile versions, so
+re-ranking the same pool under new weights is one matrix-vector product.
+
+The pair cache is off by default (MATCH_SCORE_CACHE_SIZE=0): one key lookup
+per candidate costs about as much as scoring the candidate in a vectorized
+pass, so it only pays off for pair lookups such as get_pair_compatibility
+repeated over a small set of users.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+# Default number of cached pair scores (MATCH_SCORE_CACHE_SIZE, 0 disables)
+DEFAULT_MAX_SIZE = 0
+# Default number of cached component tensors (MATCH_TENSOR_CACHE_SIZE, 0 disables)
+DEFAULT_TENSOR_CACHE_SIZE = 32
+
+class ScoreCache:
+    """Thread-safe bounded LRU of pair scores with hit/miss/eviction counters"""
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Cached score for a key, None on a miss"""
+        with self._lock:
+            score = self._entries.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def get_many(self, keys):
+        """Cached scores for keys (None for misses), under one lock acquisition"""
+        with self._lock:
+            scores = [self._entries.get(key) for key in keys]
+            for key, score in zip(keys, scores):
+                if score is not None:
+                    self._entries.move_to_end(key)
+            found = sum(score is not None for score in scores)
+            self.hits += found
+            self.misses += len(keys) - found
+            return scores
+
+    def put(self, key, score):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                for user_id in key[:2]:
+                    self._keys_by_user.setdefault(user_id, set()).add(key)
+            self._entries[key] = score
+            while len(self._entries) > self.max_size:
+                old_key, _ = self._entries.popitem(last=False)
+                self._forget(old_key)
+                self.evictions += 1
+
+    def _forget(self, key):
+        for user_id in key[:2]:
+            keys = self._keys_by_user.get(user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_user[user_id]
+
+    def invalidate_user(self, user_id):
+        """Drop every entry involving a user, returns the number removed"""
+        with self._lock:
+            keys = self._keys_by_user.pop(user_id, set())
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._forget(key)
+                    self.invalidations += 1
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+class TensorCache:
+    """Thread-safe bounded LRU of ComponentTensors keyed by pool identity and the pairs scored"""
+
+    def __init__(self, max_size=DEFAULT_TENSOR_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            tensor = self._entries.get(key)
+            if tensor is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return tensor
+
+    def put(self, key, tensor):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = tensor
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+pair_cache = ScoreCache()
+tensor_cache = TensorCache()
+
+# Callbacks run with a user id after a commit that changed that user's profile
+profile_saved_hooks = [pair_cache.invalidate_user]
+
+def on_profile_saved(hook):
+    """Register a callback fired with the user id whenever a user's profile is saved"""
+    profile_saved_hooks.append(hook)
+    return hook
+
+def profile_saved(user_id):
+    """Fire the profile-saved hooks for a user"""
+    for hook in profile_saved_hooks:
+        hook(user_id)
+
+def weights_version(weights=None):
+    """Hashable identity of the effective field weights"""
+    from app.services.match_vectors import weight_vector
+    return hash(weight_vector(weights).tobytes())
+
+def pair_key(user_a, user_b, version, today=None):
+    # Scores depend on ages, so keys expire at midnight like ProfilePool.key
+    today = (today or date.today()).toordinal()
+    return (user_a.id, user_b.id, user_a.profile_version or 0, user_b.profile_version or 0,
+            version, today)
+
+def scores_for(user, candidates, weights=None):
+    """Forward scores of a user against candidates, scoring only pairs not in the cache"""
+    from app.services.match_vectors import score_user_against
+
+    if not score_cache_enabled():
+        return score_user_against(user, list(candidates), weights)
+
+    version = weights_version(weights)
+    today = date.today()
+    keys = [pair_key(user, candidate, version, today) for candidate in candidates]
+    scores = np.empty(len(keys))
+    missing = []
+    for i, score in enumerate(pair_cache.get_many(keys)):
+        if score is None:
+            missing.append(i)
+        else:
+            scores[i] = score
+
+    if missing:
+        fresh = score_user_against(user, [candidates[i] for i in missing], weights)
+        scores[missing] = fresh
+        for i, score in zip(missing, fresh.tolist()):
+            pair_cache.put(keys[i], score)
+    return scores
+
+def score_cache_enabled():
+    return pair_cache.max_size > 0
+
+# Profile versioning
+
+def _profile_models():
+    from app.models.user import User
+    from app.models.religion import ReligiousProfile
+    from app.models.background import BackgroundPreferences
+    from app.models.lifestyle import LifestylePreferences
+    return User, (ReligiousProfile, BackgroundPreferences, LifestylePreferences)
+
+def _bump_profile_versions(session, flush_context, instances):
+    """Bump profile_version of users whose user row or profiles changed in this flush"""
+    User, profile_models = _profile_models()
+    changed = session.info.setdefault("changed_profiles", set())
+    with session.no_autoflush:
+        for obj in list(session.new) + list(session.dirty):
+            if obj not in session.new and not session.is_modified(obj):
+                continue
+            if isinstance(obj, User):
+                user = obj
+            elif isinstance(obj, profile_models):
+                user = session.get(User, obj.user_id) if obj.user_id is not None else obj.user
+            else:
+                continue
+            # New users start at the column default; nothing can be cached for them yet
+            if user is None or user in session.new or user.id in changed:
+                continue
+            user.profile_version = (user.profile_version or 0) + 1
+            changed.add(user.id)
+
+def _fire_profile_hooks(session):
+    for user_id in session.info.pop("changed_profiles", set()):
+        profile_saved(user_id)
+
+def _discard_profile_changes(session):
+    session.info.pop("changed_profiles", None)
+
+def init_score_cache(app):
+    """Size the caches from config and install the profile-version hooks"""
+    pair_cache.max_size = app.config.get("MATCH_SCORE_CACHE_SIZE", DEFAULT_MAX_SIZE)
+    tensor_cache.max_size = app.config.get("MATCH_TENSOR_CACHE_SIZE", DEFAULT_TENSOR_CACHE_SIZE)
+    for name, listener in (("before_flush", _bump_profile_versions),
+                           ("after_commit", _fire_profile_hooks),
+                           ("after_rollback", _discard_profile_changes)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
@@ -0,0 +1,344 @@
+"""
+Materialized match scores.
+
+The match_scores table holds each user's top MATCH_SCORE_STORE_LIMIT
+matches, as directional scores where user_a's preferences (hard
+preferences included) were applied, so it grows linearly with the
+population and reads are range scans of the (user_a_id, score) index.
+Requests for longer lists, or without hard preferences, are computed
+live.
+
+A saved profile queues its user; after the request (or before the next
+stored read) the queued users' lists are rebuilt, together with every
+list that held one of them or that one of them now enters. Scoring runs
+against the shared encoded population (population.population_pool), so
+only the saved users are re-encoded.
+
+Scores also depend on ages. Rows carry the time they were computed, and
+refresh_aged_scores() rebuilds the lists affected by birthdays since then;
+schedule `python rebuild_match_scores.py --birthdays` daily.
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models.user import User
+from app.models.match_score import MatchScore
+from app.services.match_engine import (
+    get_all_top_matches,
+    get_compatibility_details,
+    get_matches_for_user,
+    get_matchmaker_matches,
+    iter_all_top_matches,
+    iter_matchmaker_matches
+)
+from app.services.match_vectors import top_matches_by_row
+from app.services.metrics import stage_timer
+from app.services.population import population_pool
+from app.services.profile_loader import load_users
+from app.services.score_cache import on_profile_saved, profile_saved_hooks
+from app.services.streaming import STREAM_BATCH_SIZE, batched
+
+# Matches kept per user: the largest default endpoint limit (MATCH_SCORE_STORE_LIMIT)
+DEFAULT_STORED_LIMIT = 100
+
+# Rows scored and inserted together while rebuilding
+REBUILD_BATCH_ROWS = 2000
+
+# Users whose profiles were saved since their stored lists were last rebuilt
+pending_users = set()
+
+def stored_limit():
+    if has_app_context():
+        return current_app.config.get("MATCH_SCORE_STORE_LIMIT", DEFAULT_STORED_LIMIT)
+    return DEFAULT_STORED_LIMIT
+
+def is_stored(limit, hard_preferences=True):
+    """Whether a ranking with this limit can be read from the store"""
+    return hard_preferences and limit is not None and limit <= stored_limit()
+
+def _candidate_jobs(pool, rows=None):
+    """(rows, candidates) pool index pairs: men against women, everyone else against men
+
+    With `rows`, only those rows are kept.
+    """
+    men = pool.gender_rows("Male")
+    others = np.setdiff1d(np.arange(len(pool)), men)
+    jobs = [(men, pool.gender_rows("Female")), (others, men)]
+    if rows is not None:
+        jobs = [(np.intersect1d(job_rows, rows), candidates) for job_rows, candidates in jobs]
+    return [(job_rows, candidates) for job_rows, candidates in jobs if len(job_rows)]
+
+def _store_top_matches(pool, jobs, limit):
+    """Insert each job row's top `limit` matches under its hard preferences, returns the row count"""
+    total = 0
+    for rows, candidates in jobs:
+        for start in range(0, len(rows), REBUILD_BATCH_ROWS):
+            top = top_matches_by_row(pool, rows[start:start + REBUILD_BATCH_ROWS], candidates, limit,
+                                     hard_preferences=True)
+            score_rows = [
+                {"user_a_id": int(pool.ids[row]), "user_b_id": int(pool.ids[match_row]), "score": score}
+                for row, matches in top.items()
+                for match_row, score in matches
+            ]
+            if score_rows:
+                db.session.execute(MatchScore.__table__.insert(), score_rows)
+            total += len(score_rows)
+    return total
+
+def rebuild_match_scores(limit=None):
+    """Recompute every stored list from scratch, returns the rows stored"""
+    limit = limit or stored_limit()
+    pool = population_pool()
+    pending_users.clear()
+    db.session.query(MatchScore).delete()
+    total = _store_top_matches(pool, _candidate_jobs(pool), limit) if pool is not None else 0
+    db.session.commit()
+    return total
+
+def update_user_scores(user_ids, limit=None):
+    """Rebuild the stored lists affected by users that were added, changed or removed
+
+    A list is rebuilt when it belongs to one of the users, held one of them
+    (their new score may rank lower, so the next candidate must be found),
+    or would now take one of them: the list has room or its lowest score
+    does not beat theirs. Returns the rows stored.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return 0
+    limit = limit or stored_limit()
+    pool = population_pool()
+    if pool is None:
+        db.session.query(MatchScore).delete()
+        db.session.commit()
+        return 0
+    changed = np.array(sorted(pool.index[i] for i in user_ids if i in pool.index), dtype=np.int64)
+
+    affected = set(user_ids)
+    affected.update(user_a_id for (user_a_id,) in db.session.query(MatchScore.user_a_id)
+                    .filter(MatchScore.user_b_id.in_(user_ids)).distinct())
+
+    lists = {
+        user_a_id: (count, lowest)
+        for user_a_id, count, lowest in db.session.query(
+            MatchScore.user_a_id, db.func.count(), db.func.min(MatchScore.score)
+        ).group_by(MatchScore.user_a_id)
+    }
+    for rows, candidates in _candidate_jobs(pool):
+        entering = np.intersect1d(candidates, changed)
+        if not len(entering):
+            continue
+        top = top_matches_by_row(pool, rows, entering, 1, hard_preferences=True)
+        for row, matches in top.items():
+            if not matches:
+                continue
+            user_id = int(pool.ids[row])
+            count, lowest = lists.get(user_id, (0, None))
+            if count < limit or matches[0][1] >= lowest:
+                affected.add(user_id)
+
+    db.session.query(MatchScore).filter(MatchScore.user_a_id.in_(affected)) \
+        .delete(synchronize_session=False)
+    rows = np.array(sorted(pool.index[i] for i in affected if i in pool.index), dtype=np.int64)
+    total = _store_top_matches(pool, _candidate_jobs(pool, rows), limit)
+    db.session.commit()
+    return total
+
+def _age_on(dob, day):
+    """match_engine.calculate_age as of another day"""
+    return day.year - dob.year - ((day.month, day.day) < (dob.month, dob.day))
+
+def aged_user_ids(since, today=None):
+    """Ids of users whose age on `today` differs from their age on `since`"""
+    today = today or date.today()
+    rows = db.session.query(User.id, User.dob).filter(User.dob.isnot(None))
+    return {user_id for user_id, dob in rows if _age_on(dob, since) != _age_on(dob, today)}
+
+def refresh_aged_scores():
+    """Rebuild the stored lists affected by birthdays since the oldest stored score, returns the rows stored
+
+    A birthday changes age scores and max partner age dealbreakers like a
+    profile edit would, so it is applied the same way.
+    """
+    oldest = db.session.query(db.func.min(MatchScore.computed_at)).scalar()
+    if oldest is None:
+        return 0
+    # computed_at is UTC while ages use the local date; a day of overlap misses nothing
+    total = update_user_scores(aged_user_ids(oldest.date() - timedelta(days=1)))
+    db.session.query(MatchScore).update({MatchScore.computed_at: datetime.utcnow()},
+                                        synchronize_session=False)
+    db.session.commit()
+    return total
+
+def recompute_user_scores(user_id, limit=None):
+    """Bring the store up to date after one user's profile changed"""
+    return update_user_scores([user_id], limit)
+
+def apply_pending_updates():
+    """Rebuild the lists affected by profiles saved since the last call"""
+    if not pending_users:
+        return 0
+    user_ids = set(pending_users)
+    pending_users.difference_update(user_ids)
+    return update_user_scores(user_ids)
+
+def _details_for(pairs):
+    """Compatibility details for (user_a_id, user_b_id) pairs, loading each user once"""
+    user_ids = {user_id for pair in pairs for user_id in pair}
+    users = {u.id: u for u in load_users(user_ids, scoring_only=True)}
+    with stage_timer("details"):
+        return {
+            (a, b): get_compatibility_details(users[a], users[b])
+            for a, b in pairs if a in users and b in users
+        }
+
+def _ranked_scores(user_ids=None, limit=None, min_score=0):
+    """Stored scores ranked per user_a (score desc, user_b_id asc), with both names
+
+    Rows are fetched from the database in batches as they are iterated.
+    """
+    user_a = aliased(User)
+    user_b = aliased(User)
+    rank = db.func.row_number().over(
+        partition_by=MatchScore.user_a_id,
+        order_by=(MatchScore.score.desc(), MatchScore.user_b_id)
+    ).label("rank")
+
+    ranked = db.session.query(
+        MatchScore.user_a_id, MatchScore.user_b_id, MatchScore.score, rank
+    ).filter(MatchScore.score > 0, MatchScore.score >= min_score)
+    if user_ids is not None:
+        ranked = ranked.filter(MatchScore.user_a_id.in_(list(user_ids)))
+    ranked = ranked.subquery()
+
+    query = db.session.query(
+        ranked.c.user_a_id, user_a.name, ranked.c.user_b_id, user_b.name, ranked.c.score
+    ).join(user_a, user_a.id == ranked.c.user_a_id) \
+     .join(user_b, user_b.id == ranked.c.user_b_id)
+    if limit is not None:
+        query = query.filter(ranked.c.rank <= limit)
+    return query.order_by(ranked.c.user_a_id, ranked.c.rank).yield_per(STREAM_BATCH_SIZE)
+
+def get_stored_matches_for_user(user_id, limit=10, include_details=True, hard_preferences=True):
+    """Stored equivalent of match_engine.get_matches_for_user"""
+    if not is_stored(limit, hard_preferences):
+        return get_matches_for_user(user_id, limit, include_details, hard_preferences)
+    apply_pending_updates()
+
+    rows = db.session.query(MatchScore.user_b_id, User.name, MatchScore.score) \
+        .join(User, User.id == MatchScore.user_b_id) \
+        .filter(MatchScore.user_a_id == user_id, MatchScore.score > 0) \
+        .order_by(MatchScore.score.desc(), MatchScore.user_b_id).limit(limit).all()
+
+    matches = [{"user_id": match_id, "name": name, "score": score} for match_id, name, score in rows]
+    if include_details:
+        details = _details_for([(user_id, m["user_id"]) for m in matches])
+        for match in matches:
+            match["compatibility"] = details.get((user_id, match["user_id"]), {})
+    return matches
+
+def _with_details(matches, id_fields):
+    """Add compatibility details to match records, looking them up one batch at a time"""
+    for batch in batched(matches):
+        details = _details_for([tuple(match[field] for field in id_fields) for match in batch])
+        for match in batch:
+            match["compatibility"] = details.get(tuple(match[field] for field in id_fields), {})
+            yield match
+
+def get_stored_top_matches(limit_per_match=5, min_score=50, include_details=True,
+                           hard_preferences=True):
+    """Stored equivalent of match_engine.get_all_top_matches"""
+    if not is_stored(limit_per_match, hard_preferences):
+        return get_all_top_matches(limit_per_match, min_score, include_details,
+                                   hard_preferences=hard_preferences)
+    all_matches = list(iter_stored_top_matches(limit_per_match, min_score, include_details))
+    all_matches.sort(key=lambda x: x["score"], reverse=True)
+    return all_matches
+
+def iter_stored_top_matches(limit_per_match=5, min_score=50, include_details=True,
+                            hard_preferences=True):
+    """Stored equivalent of match_engine.iter_all_top_matches"""
+    if not is_stored(limit_per_match, hard_preferences):
+        return iter_all_top_matches(limit_per_match, min_score, include_details,
+                                    hard_preferences=hard_preferences)
+    apply_pending_updates()
+
+    def records():
+        seen_pairs = set()
+        for user_a_id, user_a_name, user_b_id, user_b_name, score in _ranked_scores(
+                limit=limit_per_match, min_score=min_score):
+            # Keep only the first direction of each pair
+            if (user_b_id, user_a_id) in seen_pairs:
+                continue
+            seen_pairs.add((user_a_id, user_b_id))
+            yield {
+                "user_a_id": user_a_id,
+                "user_a_name": user_a_name,
+                "user_b_id": user_b_id,
+                "user_b_name": user_b_name,
+                "score": score
+            }
+
+    if include_details:
+        return _with_details(records(), ("user_a_id", "user_b_id"))
+    return records()
+
+def get_stored_matchmaker_matches(matchmaker_id, limit=100, include_details=True,
+                                  hard_preferences=True):
+    """Stored equivalent of match_engine.get_matchmaker_matches"""
+    if not is_stored(limit, hard_preferences):
+        return get_matchmaker_matches(matchmaker_id, limit, include_details, hard_preferences)
+    all_matches = list(iter_stored_matchmaker_matches(matchmaker_id, limit, include_details))
+    all_matches.sort(key=lambda x: x["score"], reverse=True)
+    return all_matches
+
+def iter_stored_matchmaker_matches(matchmaker_id, limit=100, include_details=True,
+                                   hard_preferences=True):
+    """Stored equivalent of match_engine.iter_matchmaker_matches"""
+    from app.models.matchmaker import Applicant
+
+    if not is_stored(limit, hard_preferences):
+        return iter_matchmaker_matches(matchmaker_id, limit, include_details, hard_preferences)
+    apply_pending_updates()
+
+    applicant_ids = [a.user_id for a in Applicant.query.filter_by(shidduch_lady_id=matchmaker_id).all()]
+    if not applicant_ids:
+        return iter(())
+
+    records = (
+        {
+            "applicant_id": user_a_id,
+            "applicant_name": user_a_name,
+            "match_id": user_b_id,
+            "match_name": user_b_name,
+            "score": score
+        }
+        for user_a_id, user_a_name, user_b_id, user_b_name, score
+        in _ranked_scores(user_ids=applicant_ids, limit=limit)
+    )
+
+    if include_details:
+        return _with_details(records, ("applicant_id", "match_id"))
+    return records
+
+# Keeping the store current
+
+def _note_profile_saved(user_id):
+    # Runs after the commit, when the session cannot query; the rebuild is deferred
+    if has_app_context() and current_app.config.get("MATCH_SCORE_STORE"):
+        pending_users.add(user_id)
+
+def _apply_after_request(response):
+    apply_pending_updates()
+    return response
+
+def init_score_store(app):
+    """Queue saved profiles for recomputation and apply the queue after each request"""
+    if _note_profile_saved not in profile_saved_hooks:
+        on_profile_saved(_note_profile_saved)
+    app.after_request(_apply_after_request)
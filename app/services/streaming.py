@@ -0,0 +1,39 @@
+"""
+Helpers for producing match records incrementally.
+
+Large exports are yielded record by record instead of being collected
+into one list. Work that is cheaper in bulk (reciprocal scores, detail
+lookups) is done per batch of STREAM_BATCH_SIZE records, so memory stays
+bounded by the batch rather than the result set.
+"""
+
+import json
+from itertools import islice
+
+# Records processed together when a step is vectorized or batched
+STREAM_BATCH_SIZE = 1000
+
+def batched(items, size=STREAM_BATCH_SIZE):
+    """Yield lists of up to `size` consecutive items"""
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+def ndjson_lines(records, dumps=json.dumps):
+    """Yield one newline-terminated JSON document per record
+
+    Encoding time is reported as the serialization stage once the stream ends.
+    """
+    from app.services.metrics import StageClock
+
+    clock = StageClock("serialization")
+    try:
+        for record in records:
+            with clock:
+                line = dumps(record) + "\n"
+            yield line
+    finally:
+        clock.observe()
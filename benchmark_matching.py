@@ -0,0 +1,392 @@
+"""
+Benchmark the match engine against generated populations.
+
+Covers score_match, get_matches_for_user, get_matchmaker_matches and
+get_all_top_matches, and the match list endpoints through the Flask test
+client with compatibility details (as clients call them), at several
+population sizes. Records wall time, peak memory, SQL query count and DB
+time for each as JSON.
+
+Usage:
+    python benchmark_matching.py [--sizes 1000,10000,50000] [--benchmarks name,name]
+                                 [--seed 42] [--repeat 3] [--output results.json]
+                                 [--baseline benchmarks/baseline.json] [--save-baseline]
+                                 [--tolerance 0.25] [--database-url URL]
+
+Each size gets its own SQLite database under instance/benchmarks, filled
+once by generate_population.py and reused by later runs, so everything
+runs locally. --database-url benchmarks an existing database instead
+(e.g. PostgreSQL loaded with generate_population.py); its user count is
+the size. Wall time is the best of --repeat runs and the query count
+comes from the same runs; peak memory (Python and NumPy allocations) is
+taken from one extra run under tracemalloc so tracing does not skew the
+timings. Caches are cleared and the session is reset before every run.
+
+With --baseline the results are compared against a stored run and the
+script exits with status 1 when a benchmark got more than --tolerance
+slower or larger, or issued more queries. --save-baseline writes the
+results to the baseline path instead.
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+from tabulate import tabulate
+
+# Add the application root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+DEFAULT_SIZES = [1_000, 10_000, 50_000]
+DEFAULT_DATA_DIR = os.path.join(basedir, "instance", "benchmarks")
+DEFAULT_BASELINE = os.path.join(basedir, "benchmarks", "baseline.json")
+
+# Work per benchmark run
+SCORE_MATCH_PAIRS = 2_000
+SAMPLE_USERS = 5
+# One matchmaker per this many generated users
+USERS_PER_MATCHMAKER = 500
+
+# Benchmarks: name -> setup(size, rng) returning the callable that is measured.
+# Setup runs before every measured run and is not timed.
+
+def setup_score_match(size, rng):
+    from app.services.match_engine import score_match
+    from app.services.profile_loader import load_users
+
+    men = load_users(gender="Male", scoring_only=True)
+    women = load_users(gender="Female", scoring_only=True)
+    pairs = [(rng.choice(men), rng.choice(women)) for _ in range(SCORE_MATCH_PAIRS)]
+
+    def run():
+        for user_a, user_b in pairs:
+            score_match(user_a, user_b)
+    return run
+
+def setup_get_matches_for_user(size, rng):
+    from app import db
+    from app.models.user import User
+    from app.services.match_engine import get_matches_for_user
+
+    # Ids actually in the database; imported data need not be numbered 1..N
+    existing = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)]
+    user_ids = rng.sample(existing, min(SAMPLE_USERS, len(existing)))
+
+    def run():
+        for user_id in user_ids:
+            get_matches_for_user(user_id, limit=10, include_details=False)
+    return run
+
+def setup_get_matchmaker_matches(size, rng):
+    from app import db
+    from app.models.matchmaker import Applicant
+    from app.services.match_engine import get_matchmaker_matches
+
+    # The matchmaker with the most applicants
+    matchmaker_id = db.session.query(Applicant.shidduch_lady_id) \
+        .group_by(Applicant.shidduch_lady_id) \
+        .order_by(db.func.count().desc(), Applicant.shidduch_lady_id).limit(1).scalar()
+
+    def run():
+        get_matchmaker_matches(matchmaker_id, limit=100, include_details=False)
+    return run
+
+def setup_get_all_top_matches(size, rng):
+    from app.services.match_engine import get_all_top_matches
+
+    def run():
+        get_all_top_matches(limit_per_match=5, min_score=50, include_details=False, workers=1)
+    return run
+
+# Endpoints, called through the test client with details on
+
+def busiest_matchmaker():
+    """The matchmaker with the most applicants"""
+    from app import db
+    from app.models.matchmaker import Applicant
+
+    return db.session.query(Applicant.shidduch_lady_id) \
+        .group_by(Applicant.shidduch_lady_id) \
+        .order_by(db.func.count().desc(), Applicant.shidduch_lady_id).limit(1).scalar()
+
+def api_client(matchmaker_id):
+    """Test client and auth headers for a matchmaker, made the admin in this app's config"""
+    import jwt
+    from flask import current_app
+    from app import db
+    from app.models.matchmaker import Matchmaker
+
+    current_app.config["ADMIN_EMAIL"] = db.session.get(Matchmaker, matchmaker_id).email
+    token = jwt.encode({"id": matchmaker_id}, current_app.config["SECRET_KEY"], algorithm="HS256")
+    return current_app.test_client(), {"Authorization": f"Bearer {token}"}
+
+def get_ok(client, url, headers):
+    response = client.get(url, headers=headers)
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {url} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+def setup_route_user_matches(size, rng):
+    from app.models.matchmaker import Applicant
+
+    matchmaker_id = busiest_matchmaker()
+    client, headers = api_client(matchmaker_id)
+    applicants = [a.user_id for a in Applicant.query.filter_by(shidduch_lady_id=matchmaker_id)
+                  .order_by(Applicant.user_id)]
+    user_ids = rng.sample(applicants, min(SAMPLE_USERS, len(applicants)))
+
+    def run():
+        for user_id in user_ids:
+            get_ok(client, f"/api/matches/user/{user_id}/matches?limit=10", headers)
+    return run
+
+def setup_route_matchmaker_matches(size, rng):
+    client, headers = api_client(busiest_matchmaker())
+
+    def run():
+        get_ok(client, "/api/matches/matchmaker/matches?limit=100", headers)
+    return run
+
+def setup_route_all_matches(size, rng):
+    client, headers = api_client(busiest_matchmaker())
+
+    def run():
+        get_ok(client, "/api/matches/matches/all?limit_per_match=5&min_score=50", headers)
+    return run
+
+BENCHMARKS = {
+    "score_match": setup_score_match,
+    "get_matches_for_user": setup_get_matches_for_user,
+    "get_matchmaker_matches": setup_get_matchmaker_matches,
+    "get_all_top_matches": setup_get_all_top_matches,
+    "route_user_matches": setup_route_user_matches,
+    "route_matchmaker_matches": setup_route_matchmaker_matches,
+    "route_all_matches": setup_route_all_matches
+}
+
+# Population databases
+
+def database_path(data_dir, size, seed):
+    return os.path.join(data_dir, f"population_{size}_seed{seed}.sqlite3")
+
+def make_app(database_url):
+    """App bound to one benchmark database, with the shared match list cache off"""
+    from app import create_app
+    from config import config, TestingConfig
+
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_ECHO = False
+        DEBUG = False
+        MATCH_CACHE_BACKEND = "none"
+        SECRET_KEY = "benchmark-secret-key-for-test-client-tokens"
+
+    config["benchmark"] = BenchmarkConfig
+    return create_app("benchmark")
+
+def ensure_population(data_dir, size, seed):
+    """URL of the SQLite database for (size, seed), generating it on first use"""
+    from app import db
+    from generate_population import load_population
+
+    path = database_path(data_dir, size, seed)
+    if os.path.exists(path):
+        return f"sqlite:///{path}"
+
+    os.makedirs(data_dir, exist_ok=True)
+    partial = path + ".partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+    print(f"Generating {size:,} users (seed {seed})...")
+    app = make_app(f"sqlite:///{partial}")
+    with app.app_context():
+        db.create_all()
+        load_population(size, seed, matchmakers=max(1, size // USERS_PER_MATCHMAKER))
+        db.session.remove()
+        db.engine.dispose()
+    os.replace(partial, path)
+    return f"sqlite:///{path}"
+
+# Measurement
+
+def reset_state():
+    """Start every run cold: empty caches and a fresh session"""
+    from app import db
+    from app.services.score_cache import pair_cache, tensor_cache
+    from app.services.pagination import result_sets
+    from app.services.population import clear_population_pool
+
+    pair_cache.clear()
+    tensor_cache.clear()
+    result_sets.clear()
+    clear_population_pool()
+    db.session.remove()
+
+def measure(setup, size, seed, repeat, trace_memory=True):
+    """Best wall time, query count and peak traced memory of one benchmark"""
+    from app.services.query_stats import query_log
+
+    times = []
+    queries = None
+    for _ in range(repeat):
+        reset_state()
+        run = setup(size, random.Random(seed))
+        with query_log(setup.__name__) as log:
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        queries = log.count
+        db_time = log.duration
+
+    peak = None
+    if trace_memory:
+        reset_state()
+        run = setup(size, random.Random(seed))
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "wall_time_s": round(min(times), 4),
+        "wall_times_s": [round(t, 4) for t in times],
+        "peak_memory_mb": round(peak / 2**20, 3) if peak is not None else None,
+        "queries": queries,
+        "db_time_s": round(db_time, 4)
+    }
+
+def run_benchmarks(sizes, names, seed, repeat, data_dir, trace_memory=True, database_url=None):
+    from app import db
+    from app.models.user import User
+
+    results = []
+    for size in sizes:
+        app = make_app(database_url or ensure_population(data_dir, size, seed))
+        with app.app_context():
+            if database_url:
+                size = User.query.count()
+            for name in names:
+                print(f"Running {name} at {size:,} users...")
+                result = {"benchmark": name, "size": size}
+                result.update(measure(BENCHMARKS[name], size, seed, repeat, trace_memory))
+                results.append(result)
+            db.session.remove()
+            db.engine.dispose()
+    return results
+
+def environment(seed, repeat):
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "repeat": repeat
+    }
+
+# Baseline comparison
+
+def compare(results, baseline, tolerance):
+    """Rows for a comparison table and the list of regressions"""
+    previous = {(r["benchmark"], r["size"]): r for r in baseline.get("results", [])}
+    rows = []
+    regressions = []
+    for result in results:
+        key = (result["benchmark"], result["size"])
+        old = previous.get(key)
+        if old is None:
+            rows.append([result["benchmark"], result["size"], result["wall_time_s"], None, None,
+                         result["peak_memory_mb"], result["queries"], "new"])
+            continue
+
+        time_ratio = result["wall_time_s"] / old["wall_time_s"] if old["wall_time_s"] else None
+        memory_ratio = None
+        if result["peak_memory_mb"] and old.get("peak_memory_mb"):
+            memory_ratio = result["peak_memory_mb"] / old["peak_memory_mb"]
+
+        problems = []
+        if time_ratio is not None and time_ratio > 1 + tolerance:
+            problems.append(f"time x{time_ratio:.2f}")
+        if memory_ratio is not None and memory_ratio > 1 + tolerance:
+            problems.append(f"memory x{memory_ratio:.2f}")
+        if old.get("queries") is not None and result["queries"] > old["queries"]:
+            problems.append(f"queries {old['queries']} -> {result['queries']}")
+        if problems:
+            regressions.append(f"{result['benchmark']} @ {result['size']:,}: " + ", ".join(problems))
+
+        rows.append([result["benchmark"], result["size"], result["wall_time_s"], old["wall_time_s"],
+                     round(time_ratio, 2) if time_ratio else None, result["peak_memory_mb"],
+                     result["queries"], "; ".join(problems) or "ok"])
+    return rows, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the match engine on generated populations")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma-separated population sizes")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS),
+                        help=f"comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--seed", type=int, default=42, help="population and sampling seed")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark (best is kept)")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where population databases are kept")
+    parser.add_argument("--output", help="write results JSON to this file (default: stdout)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline results JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed fractional slowdown or memory growth before failing")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak memory run")
+    parser.add_argument("--database-url",
+                        help="benchmark this database as it is instead of generated SQLite populations")
+    args = parser.parse_args()
+
+    # An existing database is one population; its size is its user count
+    sizes = [0] if args.database_url else [int(size) for size in args.sizes.split(",") if size]
+    names = [name for name in args.benchmarks.split(",") if name]
+    unknown = sorted(set(names) - set(BENCHMARKS))
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    results = run_benchmarks(sizes, names, args.seed, args.repeat, args.data_dir,
+                             trace_memory=not args.no_memory, database_url=args.database_url)
+    report = {"environment": environment(args.seed, args.repeat), "results": results}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline, args.tolerance)
+        headers = ["Benchmark", "Users", "Time (s)", "Baseline (s)", "Ratio", "Peak MB", "Queries", "Status"]
+        print(tabulate(rows, headers=headers, tablefmt="simple"))
+        if regressions:
+            print("❌ Regressions against the baseline:")
+            for regression in regressions:
+                print(f"   • {regression}")
+            sys.exit(1)
+        print("✅ No regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
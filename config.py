@@ -9,6 +9,29 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@example.com")
+    # Serve match lists from the materialized match_scores table
+    MATCH_SCORE_STORE = os.getenv("MATCH_SCORE_STORE", "false").lower() == "true"
+    # Matches stored per user; longer lists are computed live
+    MATCH_SCORE_STORE_LIMIT = int(os.getenv("MATCH_SCORE_STORE_LIMIT", "100"))
+    # Processes for full-population match runs in scripts (1 = in-process, 0 = all CPUs);
+    # requests always score in-process
+    MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "1"))
+    # Pair scores kept in the in-process LRU cache (0, the default, disables it);
+    # worth enabling only for repeated pair lookups, not full candidate pools
+    MATCH_SCORE_CACHE_SIZE = int(os.getenv("MATCH_SCORE_CACHE_SIZE", "0"))
+    # Component tensor chunks kept for re-ranking under new weights (0 disables)
+    MATCH_TENSOR_CACHE_SIZE = int(os.getenv("MATCH_TENSOR_CACHE_SIZE", "32"))
+    # Match list cache shared by workers: none, memory or sqlite (a local file)
+    MATCH_CACHE_BACKEND = os.getenv("MATCH_CACHE_BACKEND", "none")
+    MATCH_CACHE_PATH = os.getenv("MATCH_CACHE_PATH")  # defaults to instance/match_cache.sqlite3
+    MATCH_CACHE_TTL = int(os.getenv("MATCH_CACHE_TTL", "300"))
+    # Identical statements per request flagged as N+1 queries
+    QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "10"))
+    # X-Query-* response headers outside debug mode
+    QUERY_STATS_HEADERS = os.getenv("QUERY_STATS_HEADERS", "false").lower() == "true"
+    # Prometheus /metrics endpoint, and the bearer token it requires when set
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -16,7 +39,8 @@ class DevelopmentConfig(Config):
 
 class TestingConfig(Config):
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = os.getenv("TEST_DATABASE_URL")
+    # In-memory SQLite unless a test database is configured
+    SQLALCHEMY_DATABASE_URI = os.getenv("TEST_DATABASE_URL", "sqlite://")
     DEBUG = True
 
 class ProductionConfig(Config):
@@ -14,7 +14,7 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 from app import db, app
 # Import all models to ensure they're registered with SQLAlchemy
-from app.models import User, ReligiousProfile, BackgroundPreferences, LifestylePreferences, Matchmaker, Applicant
+from app.models import User, ReligiousProfile, BackgroundPreferences, LifestylePreferences, Matchmaker, Applicant, MatchScore
 
 def check_tables():
     """Check which tables exist in the database"""
@@ -27,7 +27,7 @@ def check_tables():
     
     # Define expected tables
     expected_tables = ['users', 'religious_profile', 'background_preferences', 
-                       'lifestyle_preferences', 'shidduch_ladies', 'applicants']
+                       'lifestyle_preferences', 'shidduch_ladies', 'applicants', 'match_scores']
     
     missing_tables = [table for table in expected_tables if table not in existing_tables]
     if missing_tables:
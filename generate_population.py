@@ -0,0 +1,423 @@
+"""
+Generate a large synthetic population for matching benchmarks.
+
+Every field the match engine reads is drawn from a weighted distribution
+(observance fields are correlated through one latent observance level,
+heights and partner preferences depend on gender and age) and the derived
+numeric columns are filled in directly. The same seed always produces the
+same population, whatever the batch size.
+
+Rows are written with bulk Core inserts, or straight to CSV files that
+load with COPY (--output), without touching the database.
+
+Usage:
+    python generate_population.py --users 100000 [--seed 42] [--matchmakers 50] [--batch-size 10000]
+    python generate_population.py --users 1000000 --output data/population
+
+All generated users and matchmakers get the test_ email prefix, so
+cleanup_test_data.py removes them.
+"""
+
+import sys
+import os
+import csv
+import time
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+
+# Add the application root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app.services.match_engine import (
+    shabbat_ranks,
+    kosher_ranks,
+    learning_ranks,
+    attendance_ranks,
+    prayer_ranks
+)
+
+TEST_EMAIL_PREFIX = "test_"
+MAX_USERS = 1_000_000
+
+# Users drawn per random stream; stream k is seeded with (seed, k)
+CHUNK_SIZE = 10_000
+
+# Share of scored fields left empty, as on real intake forms
+MISSING_RATE = 0.03
+
+# Latent observance level (4 = most observant) and how far each field strays from it
+OBSERVANCE_LEVELS = {4: 0.32, 3: 0.22, 2: 0.2, 1: 0.15, 0: 0.11}
+OBSERVANCE_NOISE = {-1: 0.15, 0: 0.7, 1: 0.15}
+RANKED_FIELDS = {
+    "shabbat_observance": ("shabbat_rank", shabbat_ranks),
+    "kosher_observance": ("kosher_rank", kosher_ranks),
+    "jewish_learning": ("learning_rank", learning_ranks),
+    "synagogue_attendance": ("attendance_rank", attendance_ranks),
+    "prayer_habits": ("prayer_rank", prayer_ranks)
+}
+
+# Single-valued categorical fields: table -> field -> {value: weight}
+CATEGORICAL_FIELDS = {
+    "religious_profile": {
+        "childrens_education": {
+            "Essential and non-negotiable": 0.35, "Important but can be provided outside of school": 0.25,
+            "Valuable but not essential": 0.2, "Open to it, though not a priority": 0.12,
+            "Not a priority": 0.08
+        },
+        "shomer_negiah": {
+            "Am fully shomer negiah": 0.3, "Am actively working on it": 0.2, "Am not shomer negiah": 0.5
+        },
+        "religious_growth": {
+            "Looking to grow": 0.3, "Open to growth": 0.35, "Open to discussion": 0.2,
+            "Happy where I am": 0.15
+        }
+    },
+    "background_preferences": {
+        "convert_status": {
+            "I am not a convert": 0.93, "I am a convert": 0.04,
+            "I am not a convert, but I have conversion history in my family": 0.03
+        },
+        "marital_status": {
+            "Never married": 0.78, "Previously Engaged": 0.07, "Divorced": 0.13, "Widowed": 0.02
+        },
+        "children": {
+            "Want Children": 0.82, "Don't want children": 0.04, "Have children and want more": 0.08,
+            "Have children and do not want more": 0.06
+        },
+        "aliyah": {"Yes": 0.2, "No": 0.45, "Open": 0.35},
+        "partner_background": {"Open to all": 0.5, "Ashkenaz": 0.15, "Sephardic": 0.15, "Same as Self": 0.2}
+    },
+    "lifestyle_preferences": {
+        "living_environment": {
+            "Specific City/Town": 0.35, "Slightly open to nearby cities/states": 0.35,
+            "Open to relocating nationally": 0.2, "Open to relocating internationally": 0.1
+        },
+        "conflict_style": {
+            "Direct and open": 0.4, "Calm and reflective": 0.35, "Avoids confrontation": 0.15,
+            "Prefers mediation": 0.1
+        },
+        "life_focus": {
+            "Family/community oriented balance": 0.35, "Career/family oriented balance": 0.3,
+            "Family/social oriented balance": 0.15, "Career Driven": 0.1, "Self-fulfillment focus": 0.06,
+            "Travel": 0.04
+        },
+        "activity_level": {
+            "Very Active (5-7 times per week)": 0.15, "Active (3-4 times per week)": 0.35,
+            "Somewhat Active (1-2 times per week)": 0.35, "Not Active": 0.15
+        },
+        "alcohol": {"Regularly": 0.05, "Socially": 0.55, "Occasionally/Rarely": 0.3, "Never": 0.1},
+        "smoking": {"Regularly": 0.04, "Socially": 0.06, "Occasionally/Rarely": 0.1, "Never": 0.8}
+    },
+    "users": {
+        "current_location": {
+            "New York, NY": 0.3, "Los Angeles, CA": 0.15, "Miami, FL": 0.1, "Chicago, IL": 0.05,
+            "Baltimore, MD": 0.05, "Toronto, Canada": 0.07, "Jerusalem, Israel": 0.1,
+            "Tel Aviv, Israel": 0.08, "London, UK": 0.06, "Melbourne, Australia": 0.04
+        },
+        "education_level": {
+            "High School or Equivalent": 0.1, "Associates Degree": 0.08, "Bachelors Degree": 0.47,
+            "Masters": 0.27, "PHD": 0.05, "Other": 0.03
+        }
+    }
+}
+
+# Multi-valued fields: (values with weights, how many values with weights, ordered)
+MULTI_VALUED_FIELDS = {
+    "religious_profile": {
+        "cultural_background": ({
+            "Ashkenazi": 0.35, "Ashkenazi - Mix": 0.1, "Sephardic - Persian": 0.12,
+            "Sephardic - Syrian, Lebanese, Egyptian": 0.1,
+            "Sephardic - Moroccan, Algerian, Tunisian (French)": 0.07,
+            "Sephardic - Moroccan, Algerian, Tunisian (Israeli)": 0.06,
+            "Sephardic - Bukharin": 0.05, "Sephardic - Israeli Mix": 0.1, "Other": 0.05
+        }, {1: 0.85, 2: 0.15}, False),
+        "languages": ({
+            "English": 0.55, "Hebrew": 0.25, "French": 0.05, "Persian": 0.05, "Russian": 0.04,
+            "Spanish": 0.04, "Arabic": 0.01, "Other": 0.01
+        }, {1: 0.35, 2: 0.45, 3: 0.2}, False)
+    },
+    "lifestyle_preferences": {
+        "relationship_traits": ({
+            "Personal space": 0.1, "Mutual consideration/respect": 0.25, "Simplicity": 0.08,
+            "Peacefulness": 0.1, "Accepting imperfections": 0.12, "Trying new things": 0.1,
+            "Routine": 0.05, "Communication": 0.2
+        }, {2: 1.0}, False),
+        "ranked_priorities": ({
+            "Family": 0.35, "Partner Satisfaction": 0.2, "Self-Satisfaction": 0.1, "Career": 0.12,
+            "Religion": 0.15, "Friends": 0.08
+        }, {6: 1.0}, True),
+        "ranked_activities": ({
+            "Relaxing Activities": 0.15, "Cultural Activities": 0.12, "Social Activities": 0.18,
+            "Outdoor Activities": 0.15, "Creative Activities": 0.1, "Educational Activities": 0.1,
+            "Physical Activities": 0.12, "Volunteering Activities": 0.08
+        }, {3: 1.0}, True)
+    }
+}
+
+FIRST_NAMES = {
+    "Male": ["David", "Jacob", "Samuel", "Benjamin", "Aaron", "Isaac", "Eli", "Jonah", "Ari", "Moshe"],
+    "Female": ["Sarah", "Rebecca", "Rachel", "Leah", "Hannah", "Esther", "Abigail", "Miriam", "Ruth", "Naomi"]
+}
+LAST_NAMES = ["Cohen", "Levy", "Goldberg", "Friedman", "Katz", "Schwartz", "Abrams", "Klein", "Shapiro", "Kaplan"]
+
+# Tables in insert order and the CSV columns written for each
+TABLE_COLUMNS = {
+    "shidduch_ladies": ["id", "name", "email", "organization"],
+    "users": [
+        "id", "name", "email", "gender", "dob", "current_location", "height", "education_level",
+        "height_inches", "dob_ordinal", "profile_version"
+    ],
+    "religious_profile": [
+        "user_id", "cultural_background", "languages", "shabbat_observance", "kosher_observance",
+        "jewish_learning", "synagogue_attendance", "childrens_education", "shomer_negiah",
+        "prayer_habits", "religious_growth", "shabbat_rank", "kosher_rank", "learning_rank",
+        "attendance_rank", "prayer_rank"
+    ],
+    "background_preferences": [
+        "user_id", "convert_status", "marital_status", "children", "aliyah", "partner_background",
+        "min_partner_height", "max_partner_age", "min_partner_height_inches"
+    ],
+    "lifestyle_preferences": [
+        "user_id", "ranked_activities", "living_environment", "conflict_style", "life_focus",
+        "activity_level", "alcohol", "smoking", "relationship_traits", "ranked_priorities"
+    ],
+    "applicants": ["user_id", "shidduch_lady_id"]
+}
+
+# Tables whose ids are written explicitly, so their PostgreSQL sequences must be moved past them
+SEQUENCE_TABLES = ("shidduch_ladies", "users")
+
+def setval_statement(table):
+    return f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}));"
+
+def weighted(rng, distribution, size):
+    """Draw `size` values from a {value: weight} distribution"""
+    values = list(distribution)
+    weights = np.array(list(distribution.values()), dtype=np.float64)
+    picks = rng.choice(len(values), size=size, p=weights / weights.sum())
+    return [values[i] for i in picks.tolist()]
+
+def weighted_sets(rng, distribution, counts, ordered, size):
+    """Draw `size` lists of distinct values; ordered lists follow the weights as a ranking"""
+    values = np.array(list(distribution), dtype=object)
+    weights = np.array(list(distribution.values()), dtype=np.float64)
+    lengths = np.array(weighted(rng, counts, size))
+    # Gumbel top-k: sorting weight-perturbed keys samples without replacement
+    keys = np.log(weights) - np.log(-np.log(rng.random((size, len(values)))))
+    order = np.argsort(-keys, axis=1)
+    picks = [values[row[:length]].tolist() for row, length in zip(order, lengths.tolist())]
+    return picks if ordered else [sorted(pick) for pick in picks]
+
+def with_missing(rng, values, rate=MISSING_RATE):
+    missing = rng.random(len(values)) < rate
+    return [None if gone else value for value, gone in zip(values, missing.tolist())]
+
+def format_height(inches):
+    return f"{inches // 12}'{inches % 12}\""
+
+def generate_chunk(seed, chunk, first_id, size, matchmaker_ids, as_of):
+    """Rows of every table for users first_id .. first_id + size - 1, as {table: [row, ...]}"""
+    rng = np.random.default_rng([seed, chunk])
+    ids = list(range(first_id, first_id + size))
+    genders = weighted(rng, {"Male": 0.5, "Female": 0.5}, size)
+    male = np.array([g == "Male" for g in genders])
+
+    # Ages 21-45, most in their twenties
+    ages = np.minimum(21 + rng.gamma(2.0, 3.0, size), 45.99)
+    dobs = [as_of - timedelta(days=int(days)) for days in (ages * 365.25).tolist()]
+    dobs = with_missing(rng, dobs)
+    ages = ages.astype(int)
+
+    # Heights by gender, in inches
+    heights = np.where(male, rng.normal(69.5, 2.8, size), rng.normal(64.5, 2.6, size))
+    heights = np.clip(np.rint(heights), 56, 80).astype(int)
+    height_strings = with_missing(rng, [format_height(h) for h in heights.tolist()])
+
+    first_names = [FIRST_NAMES[g][i] for g, i in zip(genders, rng.integers(0, 10, size).tolist())]
+    last_names = [LAST_NAMES[i] for i in rng.integers(0, len(LAST_NAMES), size).tolist()]
+    users = {
+        "id": ids,
+        "name": [f"{first} {last}" for first, last in zip(first_names, last_names)],
+        "email": [f"{TEST_EMAIL_PREFIX}synthetic{user_id}@example.com" for user_id in ids],
+        "gender": genders,
+        "dob": dobs,
+        "height": height_strings,
+        "height_inches": [h if s is not None else None for h, s in zip(heights.tolist(), height_strings)],
+        "dob_ordinal": [d.toordinal() if d else None for d in dobs],
+        "profile_version": [1] * size
+    }
+    for field, distribution in CATEGORICAL_FIELDS["users"].items():
+        users[field] = weighted(rng, distribution, size)
+
+    # Observance fields scatter around one latent level per user
+    religious = {"user_id": ids}
+    level = np.array(weighted(rng, OBSERVANCE_LEVELS, size))
+    for field, (rank_column, ranking) in RANKED_FIELDS.items():
+        by_rank = {rank: value for value, rank in ranking.items()}
+        ranks = np.clip(level + np.array(weighted(rng, OBSERVANCE_NOISE, size)), 0, max(by_rank))
+        ranks = with_missing(rng, ranks.tolist())
+        religious[field] = [by_rank[r] if r is not None else None for r in ranks]
+        religious[rank_column] = ranks
+
+    background = {"user_id": ids}
+    # Partner preferences: men mostly want someone their age or younger, women often set a minimum height
+    has_max_age = rng.random(size) < 0.65
+    max_age = ages + np.where(male, rng.integers(0, 4, size), rng.integers(3, 11, size))
+    background["max_partner_age"] = [int(a) if keep else None for a, keep in zip(max_age, has_max_age)]
+    has_min_height = rng.random(size) < np.where(male, 0.15, 0.55)
+    min_height = np.where(male, rng.integers(58, 63, size), heights + rng.integers(0, 5, size))
+    background["min_partner_height_inches"] = [int(h) if keep else None
+                                               for h, keep in zip(min_height, has_min_height)]
+    background["min_partner_height"] = [format_height(h) if h is not None else None
+                                        for h in background["min_partner_height_inches"]]
+
+    lifestyle = {"user_id": ids}
+    for table, columns in (("religious_profile", religious), ("background_preferences", background),
+                           ("lifestyle_preferences", lifestyle)):
+        for field, distribution in CATEGORICAL_FIELDS[table].items():
+            columns[field] = with_missing(rng, weighted(rng, distribution, size))
+        for field, (distribution, counts, ordered) in MULTI_VALUED_FIELDS.get(table, {}).items():
+            columns[field] = with_missing(rng, weighted_sets(rng, distribution, counts, ordered, size))
+
+    applicants = {
+        "user_id": ids,
+        "shidduch_lady_id": [matchmaker_ids[i] for i in rng.integers(0, len(matchmaker_ids), size).tolist()]
+    }
+
+    tables = {"users": users, "religious_profile": religious, "background_preferences": background,
+              "lifestyle_preferences": lifestyle, "applicants": applicants}
+    return {
+        table: [dict(zip(TABLE_COLUMNS[table], row))
+                for row in zip(*(columns[name] for name in TABLE_COLUMNS[table]))]
+        for table, columns in tables.items()
+    }
+
+def generate_population(users, seed=42, first_user_id=1, matchmaker_ids=(1,), as_of=None):
+    """Yield {table: rows} for `users` synthetic users, CHUNK_SIZE users at a time"""
+    if not 0 < users <= MAX_USERS:
+        raise ValueError(f"users must be between 1 and {MAX_USERS:,}")
+    as_of = as_of or date.today()
+    for chunk, start in enumerate(range(0, users, CHUNK_SIZE)):
+        yield generate_chunk(seed, chunk, first_user_id + start, min(CHUNK_SIZE, users - start),
+                             list(matchmaker_ids), as_of)
+
+def matchmaker_rows(count, first_id):
+    return [
+        {"id": first_id + i, "name": f"Synthetic Matchmaker {i + 1}",
+         "email": f"{TEST_EMAIL_PREFIX}synthetic_matchmaker{first_id + i}@example.com",
+         "organization": "SPARC Matchmaking"}
+        for i in range(count)
+    ]
+
+# Database output
+
+def load_population(users, seed=42, matchmakers=10, batch_size=CHUNK_SIZE):
+    """Bulk insert a synthetic population into the app database, returns the user count"""
+    from app import db
+    from app.models.user import User
+    from app.models.religion import ReligiousProfile
+    from app.models.background import BackgroundPreferences
+    from app.models.lifestyle import LifestylePreferences
+    from app.models.matchmaker import Matchmaker, Applicant
+    from app.services.match_cache import bump_population_epoch
+
+    models = {
+        "shidduch_ladies": Matchmaker, "users": User, "religious_profile": ReligiousProfile,
+        "background_preferences": BackgroundPreferences, "lifestyle_preferences": LifestylePreferences,
+        "applicants": Applicant
+    }
+
+    def insert(table, rows):
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(models[table].__table__.insert(), rows[start:start + batch_size])
+
+    first_matchmaker = (db.session.query(db.func.max(Matchmaker.id)).scalar() or 0) + 1
+    first_user = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    mm_rows = matchmaker_rows(matchmakers, first_matchmaker)
+    insert("shidduch_ladies", mm_rows)
+
+    total = 0
+    for tables in generate_population(users, seed, first_user, [row["id"] for row in mm_rows]):
+        for table in TABLE_COLUMNS:
+            if table in tables:
+                insert(table, tables[table])
+        db.session.commit()
+        total += len(tables["users"])
+        print(f"Inserted {total:,} users...")
+
+    # Ids were assigned explicitly, so move the PostgreSQL sequences past them
+    if db.engine.dialect.name == "postgresql":
+        for table in SEQUENCE_TABLES:
+            db.session.execute(db.text(setval_statement(table)))
+        db.session.commit()
+
+    # Bulk inserts bypass the ORM events that invalidate cached match lists
+    bump_population_epoch()
+    return total
+
+# File output
+
+def csv_value(value):
+    """CSV cell in PostgreSQL COPY format (arrays as {...} literals, NULL as empty)"""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "{" + ",".join('"' + v.replace("\\", "\\\\").replace('"', '\\"') + '"' for v in value) + "}"
+    return value
+
+def write_population(users, output, seed=42, matchmakers=10):
+    """Write a synthetic population to one CSV file per table, returns the file paths"""
+    os.makedirs(output, exist_ok=True)
+    paths = {table: os.path.join(output, f"{table}.csv") for table in TABLE_COLUMNS}
+    files = {table: open(path, "w", newline="") for table, path in paths.items()}
+    try:
+        writers = {table: csv.writer(f) for table, f in files.items()}
+        for table, writer in writers.items():
+            writer.writerow(TABLE_COLUMNS[table])
+
+        def write(table, rows):
+            writers[table].writerows([csv_value(row[c]) for c in TABLE_COLUMNS[table]] for row in rows)
+
+        mm_rows = matchmaker_rows(matchmakers, 1)
+        write("shidduch_ladies", mm_rows)
+        for tables in generate_population(users, seed, 1, [row["id"] for row in mm_rows]):
+            for table, rows in tables.items():
+                write(table, rows)
+    finally:
+        for f in files.values():
+            f.close()
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic population for matching benchmarks")
+    parser.add_argument("--users", type=int, default=100_000, help=f"users to generate (max {MAX_USERS:,})")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--matchmakers", type=int, default=10, help="matchmakers the users are spread over")
+    parser.add_argument("--batch-size", type=int, default=CHUNK_SIZE, help="rows per insert statement")
+    parser.add_argument("--output", help="write CSV files for COPY to this directory instead of the database")
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.output:
+        paths = write_population(args.users, args.output, args.seed, args.matchmakers)
+        print(f"✅ Wrote {args.users:,} users to {args.output} in {time.time() - start:.1f}s")
+        print("Load with psql (in this order):")
+        for table, path in paths.items():
+            columns = ", ".join(TABLE_COLUMNS[table])
+            print(f"   \\copy {table} ({columns}) FROM '{path}' WITH (FORMAT csv, HEADER)")
+        print("Then move the id sequences past the loaded rows:")
+        for table in SEQUENCE_TABLES:
+            print(f"   {setval_statement(table)}")
+        return
+
+    from app import create_app
+    app = create_app(os.getenv("FLASK_ENV", "default"))
+    with app.app_context():
+        total = load_population(args.users, args.seed, args.matchmakers, args.batch_size)
+        print(f"✅ Inserted {total:,} users in {time.time() - start:.1f}s")
+        print("Run rebuild_match_scores.py if MATCH_SCORE_STORE is enabled.")
+
+if __name__ == "__main__":
+    main()
@@ -35,6 +35,8 @@ from app.models.religion import ReligiousProfile
 from app.models.background import BackgroundPreferences
 from app.models.lifestyle import LifestylePreferences
 from app.models.matchmaker import Matchmaker, Applicant
+from app.services.profile_features import update_derived_fields
+from app.services.incremental import add_new_users
 
 # Excel column mapping to database fields
 COLUMN_MAPPING = {
@@ -272,6 +274,7 @@ def create_user_from_row(row_data, row_num):
     
     # Create user
     user = User(**user_data)
+    update_derived_fields(user=user)
     db.session.add(user)
     db.session.flush()  # Get user ID
     
@@ -285,6 +288,7 @@ def create_user_from_row(row_data, row_num):
     
     if len(religious_data) > 1:  # More than just user_id
         religious_profile = ReligiousProfile(**religious_data)
+        update_derived_fields(religious_profile=religious_profile)
         db.session.add(religious_profile)
     
     # Create background preferences
@@ -306,6 +310,7 @@ def create_user_from_row(row_data, row_num):
     
     if len(background_data) > 1:  # More than just user_id
         background_preferences = BackgroundPreferences(**background_data)
+        update_derived_fields(background=background_preferences)
         db.session.add(background_preferences)
     
     # Create lifestyle preferences
@@ -337,6 +342,7 @@ def import_from_excel(file_path, matchmaker_email=None, dry_run=False):
         
         success_count = 0
         error_count = 0
+        imported_ids = []
         
         for index, row in df.iterrows():
             row_num = index + 2  # Excel row number (accounting for header)
@@ -359,6 +365,7 @@ def import_from_excel(file_path, matchmaker_email=None, dry_run=False):
                     
                     if not dry_run:
                         db.session.commit()
+                        imported_ids.append(user.id)
                     
                     print(f"Row {row_num} - Successfully imported: {user.name} ({user.email})")
                     success_count += 1
@@ -375,6 +382,8 @@ def import_from_excel(file_path, matchmaker_email=None, dry_run=False):
             print(f"\nDRY RUN COMPLETE - No data was actually saved to database")
             db.session.rollback()
         else:
+            # Score the new applicants once and fold them into existing match lists
+            add_new_users(imported_ids)
             print(f"\nImport complete!")
         
         print(f"Successfully processed: {success_count}")
@@ -0,0 +1,174 @@
+"""Add derived numeric scoring columns and backfill them
+
+Revision ID: c4d8e1f27a90
+Revises: 7b21e94c0a5f
+Create Date: 2026-10-17 11:26:05.910374
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e1f27a90'
+down_revision = '7b21e94c0a5f'
+branch_labels = None
+depends_on = None
+
+
+# Rows updated per executemany batch in the backfill
+BACKFILL_BATCH_SIZE = 1000
+
+# The backfill is frozen as of this revision rather than importing the app,
+# so later changes to the match engine cannot change what this migration does.
+
+# Religious profile field -> (derived rank column, ranking system)
+RANK_COLUMNS = {
+    "shabbat_observance": ("shabbat_rank", {
+        "Shomer Shabbat - Fully Observant": 4,
+        "Traditional - Lightly Observant. Celebrates/Observes every week, but flexible with electricity": 3,
+        "Traditional - Celebrates/Observes weekly, but drives and cooks": 2,
+        "Spiritual - Occasionally has Friday/Shabbat Dinner night dinner": 1,
+        "Do not observe or celebrate": 0
+    }),
+    "kosher_observance": ("kosher_rank", {
+        "Strictly Kosher": 4,
+        "Kosher Home: eat out Vegan/Sushi": 3,
+        "Kosher Home: eat out Dairy": 2,
+        "Kosher Home: eat out everything": 1,
+        "Don't Keep Kosher": 0
+    }),
+    "jewish_learning": ("learning_rank", {
+        "Daily": 4,
+        "Multiple times a week": 3,
+        "Weekly": 2,
+        "Occasionally": 1,
+        "Rarely/Never": 0
+    }),
+    "synagogue_attendance": ("attendance_rank", {
+        "Daily": 4,
+        "Weekly": 3,
+        "Occasionally": 2,
+        "Major holidays only": 1,
+        "Rarely/Never": 0
+    }),
+    "prayer_habits": ("prayer_rank", {
+        "Daven with a minyan consistently": 4,
+        "Davens 3x a day individually": 3,
+        "Davens Daily": 2,
+        "Weekly": 1,
+        "Not often": 0
+    })
+}
+
+
+def parse_height_to_inches(height_str):
+    """Height string like 5'8" to inches, 65 when it cannot be parsed"""
+    try:
+        parts = height_str.replace('"', '').split("'")
+        feet = int(parts[0])
+        inches = int(parts[1]) if len(parts) > 1 else 0
+        return (feet * 12) + inches
+    except Exception:
+        return 65
+
+
+def height_inches(height):
+    if height is None:
+        return None
+    return parse_height_to_inches(height)
+
+
+def min_height_inches(min_height):
+    if not min_height:
+        return None
+    return parse_height_to_inches(min_height)
+
+
+def rank_value(value, ranking):
+    if value is None:
+        return None
+    return ranking.get(value)
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('height_inches', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('dob_ordinal', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_users_gender_height_inches', ['gender', 'height_inches'], unique=False)
+
+    with op.batch_alter_table('religious_profile', schema=None) as batch_op:
+        for column, _ in RANK_COLUMNS.values():
+            batch_op.add_column(sa.Column(column, sa.SmallInteger(), nullable=True))
+
+    with op.batch_alter_table('background_preferences', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('min_partner_height_inches', sa.Integer(), nullable=True))
+
+    backfill()
+
+
+def update_rows(bind, table, values, rows):
+    """UPDATE table rows by id, one executemany per BACKFILL_BATCH_SIZE rows
+
+    `rows` yields dicts with "row_id" and one "new_<column>" per column in `values`.
+    """
+    stmt = table.update().where(table.c.id == sa.bindparam('row_id')).values(
+        **{column: sa.bindparam(f'new_{column}') for column in values}
+    )
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BACKFILL_BATCH_SIZE:
+            bind.execute(stmt, batch)
+            batch = []
+    if batch:
+        bind.execute(stmt, batch)
+
+
+def backfill():
+    """Compute derived columns for existing rows"""
+    bind = op.get_bind()
+
+    users = sa.table('users', sa.column('id'), sa.column('height'), sa.column('dob', sa.Date),
+                     sa.column('height_inches'), sa.column('dob_ordinal'))
+    rows = bind.execute(sa.select(users.c.id, users.c.height, users.c.dob)).all()
+    update_rows(bind, users, ['height_inches', 'dob_ordinal'], (
+        {'row_id': user_id, 'new_height_inches': height_inches(height),
+         'new_dob_ordinal': dob.toordinal() if dob else None}
+        for user_id, height, dob in rows
+    ))
+
+    rank_columns = [column for column, _ in RANK_COLUMNS.values()]
+    religion = sa.table('religious_profile', sa.column('id'),
+                        *[sa.column(field) for field in RANK_COLUMNS],
+                        *[sa.column(column) for column in rank_columns])
+    rows = bind.execute(sa.select(religion.c.id, *[religion.c[field] for field in RANK_COLUMNS])).all()
+    update_rows(bind, religion, rank_columns, (
+        dict({'row_id': row.id}, **{
+            f'new_{column}': rank_value(row._mapping[field], ranking)
+            for field, (column, ranking) in RANK_COLUMNS.items()
+        })
+        for row in rows
+    ))
+
+    background = sa.table('background_preferences', sa.column('id'),
+                          sa.column('min_partner_height'), sa.column('min_partner_height_inches'))
+    rows = bind.execute(sa.select(background.c.id, background.c.min_partner_height)).all()
+    update_rows(bind, background, ['min_partner_height_inches'], (
+        {'row_id': bg_id, 'new_min_partner_height_inches': min_height_inches(min_height)}
+        for bg_id, min_height in rows
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('background_preferences', schema=None) as batch_op:
+        batch_op.drop_column('min_partner_height_inches')
+
+    with op.batch_alter_table('religious_profile', schema=None) as batch_op:
+        for column, _ in RANK_COLUMNS.values():
+            batch_op.drop_column(column)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_gender_height_inches')
+        batch_op.drop_column('dob_ordinal')
+        batch_op.drop_column('height_inches')
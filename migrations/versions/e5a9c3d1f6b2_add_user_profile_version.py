@@ -0,0 +1,26 @@
+"""Add users.profile_version for score cache keys
+
+Revision ID: e5a9c3d1f6b2
+Revises: c4d8e1f27a90
+Create Date: 2026-10-17 14:02:41.218530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3d1f6b2'
+down_revision = 'c4d8e1f27a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('profile_version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('profile_version')
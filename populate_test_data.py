@@ -24,6 +24,7 @@ from app.models.religion import ReligiousProfile
 from app.models.background import BackgroundPreferences
 from app.models.lifestyle import LifestylePreferences
 from app.models.matchmaker import Matchmaker, Applicant
+from app.services.profile_features import update_derived_fields
 
 # Test data constants
 TEST_EMAIL_PREFIX = "test_"
@@ -151,6 +152,7 @@ def create_test_users(matchmakers):
             education_level=random.choice(education_levels),
             schools=", ".join(random.sample(schools, random.randint(1, 3)))
         )
+        update_derived_fields(user=user)
         db.session.add(user)
         db.session.flush()  # To get the user ID
         
@@ -193,6 +195,7 @@ def create_test_users(matchmakers):
             education_level=random.choice(education_levels),
             schools=", ".join(random.sample(schools, random.randint(1, 3)))
         )
+        update_derived_fields(user=user)
         db.session.add(user)
         db.session.flush()  # To get the user ID
         
@@ -250,6 +253,7 @@ def create_religious_profile(user_id, is_male):
         prayer_habits=selected_prayer,
         religious_growth=selected_growth
     )
+    update_derived_fields(religious_profile=profile)
     
     db.session.add(profile)
 
@@ -270,6 +274,7 @@ def create_background_preferences(user_id, is_male):
         max_partner_age=max_age,
         photo_url=f"https://example.com/photos/test_user_{user_id}.jpg"
     )
+    update_derived_fields(background=background)
     
     db.session.add(background)
 
@@ -0,0 +1,45 @@
+"""
+Rebuild the materialized match_scores table from current profiles.
+
+Run a full rebuild once after creating the table (and whenever profiles
+were changed outside the app); afterwards the app keeps it up to date per
+user. Stored scores use ages as of the day they were computed, so also
+schedule the birthday refresh daily, e.g. from cron:
+
+    15 0 * * * cd /srv/sparc && python rebuild_match_scores.py --birthdays
+
+Usage:
+    python rebuild_match_scores.py [--birthdays]
+"""
+
+import argparse
+import sys
+import os
+import time
+
+# Add the application root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app import create_app
+from app.services.score_store import rebuild_match_scores, refresh_aged_scores
+
+def main():
+    """Rebuild all stored match scores, or only those affected by birthdays"""
+    parser = argparse.ArgumentParser(description="Rebuild the match_scores table")
+    parser.add_argument("--birthdays", action="store_true",
+                        help="only rebuild lists affected by birthdays since the last refresh")
+    args = parser.parse_args()
+
+    app = create_app(os.getenv("FLASK_ENV", "default"))
+    with app.app_context():
+        start = time.time()
+        if args.birthdays:
+            print("Refreshing match scores affected by birthdays...")
+            total = refresh_aged_scores()
+        else:
+            print("Rebuilding match scores...")
+            total = rebuild_match_scores()
+        print(f"✅ Stored {total:,} scores in {time.time() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
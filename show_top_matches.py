@@ -3,21 +3,26 @@ Show the top 10 matches in the SPARC database.
 This script displays the highest compatibility matches with detailed breakdowns.
 
 Usage:
-    python show_top_matches.py
+    python show_top_matches.py [--workers N]
+
+--workers N scores the population on N processes (0 = all CPUs); the
+default comes from the MATCH_WORKERS setting.
 
 Make sure you have users in the database first (either test data or real data).
 """
 
 import sys
 import os
+import argparse
 from tabulate import tabulate
 
 # Add the application root directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-from app import db, app
+from app import create_app
 from app.models.user import User
 from app.services.match_engine import get_all_top_matches
+from app.services.profile_loader import load_users
 
 def calculate_age(dob):
     """Helper function to calculate age from date of birth"""
@@ -28,6 +33,11 @@ def calculate_age(dob):
     today = datetime.today()
     return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
 
+def load_match_users(matches):
+    """Both users of every match, loaded in one query"""
+    user_ids = {m["user_a_id"] for m in matches} | {m["user_b_id"] for m in matches}
+    return {u.id: u for u in load_users(user_ids)}
+
 def show_database_stats():
     """Show basic database statistics"""
     total_users = User.query.count()
@@ -43,7 +53,7 @@ def show_database_stats():
     print(f"Potential Match Combinations: {male_users * female_users:,}")
     print()
 
-def show_top_matches(limit=10):
+def show_top_matches(limit=10, workers=None):
     """Show the top matches in the database with detailed information"""
     
     print("🏆" * 20)
@@ -53,7 +63,7 @@ def show_top_matches(limit=10):
     
     # Get all top matches (no minimum score)
     print("🔍 Analyzing all possible matches...")
-    matches = get_all_top_matches(limit_per_match=15, min_score=0)
+    matches = get_all_top_matches(limit_per_match=15, min_score=0, workers=workers)
     
     if not matches:
         print("❌ No matches found in database.")
@@ -75,9 +85,10 @@ def show_top_matches(limit=10):
     print("-" * 100)
     
     table_data = []
+    users = load_match_users(top_matches)
     for i, match in enumerate(top_matches, 1):
-        user_a = User.query.get(match["user_a_id"])
-        user_b = User.query.get(match["user_b_id"])
+        user_a = users[match["user_a_id"]]
+        user_b = users[match["user_b_id"]]
         
         # Get additional details
         age_a = calculate_age(user_a.dob) if user_a.dob else "N/A"
@@ -138,9 +149,10 @@ def show_detailed_breakdown(top_matches):
     print("🔍" * 20)
     print()
     
+    users = load_match_users(top_matches)
     for i, match in enumerate(top_matches, 1):
-        user_a = User.query.get(match["user_a_id"])
-        user_b = User.query.get(match["user_b_id"])
+        user_a = users[match["user_a_id"]]
+        user_b = users[match["user_b_id"]]
         
         print(f"#{i} MATCH: {user_a.name} ❤️ {user_b.name}")
         print(f"Overall Compatibility: {match['score']:.1f}%")
@@ -202,10 +214,16 @@ def show_detailed_breakdown(top_matches):
 
 def main():
     """Main function to run the top matches display"""
+    parser = argparse.ArgumentParser(description="Show the top matches in the SPARC database")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes used for scoring (0 = all CPUs)")
+    args = parser.parse_args()
+
+    app = create_app(os.getenv("FLASK_ENV", "default"))
     with app.app_context():
         print()
         show_database_stats()
-        show_top_matches(limit=10)
+        show_top_matches(limit=10, workers=args.workers)
         
         print("✨ Analysis complete! ✨")
         print()
@@ -0,0 +1,64 @@
+"""
+Shared fixtures: an app on in-memory SQLite filled with a seeded synthetic population.
+"""
+
+import os
+import sys
+
+import jwt
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app, db
+from generate_population import load_population
+
+POPULATION_SIZE = 300
+POPULATION_SEED = 7
+MATCHMAKERS = 3
+
+@pytest.fixture
+def app():
+    """Testing app with empty tables and cold caches"""
+    from app.services.score_cache import pair_cache, tensor_cache
+    from app.services.pagination import result_sets
+    from app.services.population import clear_population_pool
+
+    app = create_app("testing")
+    app.config["SQLALCHEMY_ECHO"] = False
+    app.config["SECRET_KEY"] = "test-secret-key-long-enough-for-hs256"
+    with app.app_context():
+        db.create_all()
+        pair_cache.clear()
+        tensor_cache.clear()
+        result_sets.clear()
+        clear_population_pool()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+@pytest.fixture
+def population(app):
+    """POPULATION_SIZE seeded users spread over MATCHMAKERS matchmakers"""
+    load_population(POPULATION_SIZE, POPULATION_SEED, matchmakers=MATCHMAKERS)
+    return POPULATION_SIZE
+
+@pytest.fixture
+def admin(app, population):
+    """The first matchmaker, made the configured admin"""
+    from app.models.matchmaker import Matchmaker
+
+    matchmaker = db.session.get(Matchmaker, 1)
+    matchmaker.email = app.config["ADMIN_EMAIL"]
+    db.session.commit()
+    return matchmaker
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def auth_headers(app, admin):
+    token = jwt.encode({"id": admin.id}, app.config["SECRET_KEY"], algorithm="HS256")
+    return {"Authorization": f"Bearer {token}"}
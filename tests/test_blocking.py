@@ -0,0 +1,80 @@
+"""
+min_score queries through the blocking index return exactly what a full scan returns.
+"""
+
+import numpy as np
+import pytest
+
+from app.services.blocking import MAX_VISITED_FRACTION, BlockingIndex
+from app.services.match_vectors import ProfilePool, iter_row_scores, top_matches_by_row
+from app.services.profile_loader import load_users
+from app.services.ranking import top_k
+
+# Observance-heavy weights, under which the index prunes at lower thresholds
+OBSERVANCE_WEIGHTS = {"shabbat_observance": 40, "kosher_observance": 40}
+
+def full_scan(pool, rows, candidates, limit, min_score, **options):
+    results = {}
+    for block_rows, block in pool.score_blocks(rows, candidates, reciprocal=options.get("reciprocal", False),
+                                               weights=options.get("weights")):
+        for row, row_scores in zip(block_rows.tolist(), block):
+            if options.get("hard_preferences"):
+                row_scores = np.where(pool.dealbreaker_mask(row, candidates), row_scores, 0)
+            results[row] = top_k(iter_row_scores(row_scores, candidates, limit, min_score), limit)
+    return results
+
+@pytest.fixture
+def pool_rows(population):
+    users = load_users(scoring_only=True)
+    pool = ProfilePool(users)
+    men = np.array([row for row, u in enumerate(users) if u.gender == "Male"])
+    women = np.array([row for row, u in enumerate(users) if u.gender == "Female"])
+    return pool, men, women
+
+@pytest.mark.parametrize("min_score", [40, 70, 80, 88, 92, 95])
+@pytest.mark.parametrize("options", [
+    {},
+    {"reciprocal": True},
+    {"weights": OBSERVANCE_WEIGHTS},
+    {"hard_preferences": True},
+])
+def test_blocking_equals_full_scan(pool_rows, min_score, options):
+    pool, men, women = pool_rows
+    for rows, candidates in ((men, women), (women, men)):
+        assert top_matches_by_row(pool, rows, candidates, 10, min_score, **options) \
+            == full_scan(pool, rows, candidates, 10, min_score, **options)
+
+# Thresholds near the best matches' scores, where buckets fall away
+PRUNING_THRESHOLDS = [(92, None), (80, OBSERVANCE_WEIGHTS), (88, OBSERVANCE_WEIGHTS)]
+
+@pytest.mark.parametrize("min_score, weights", PRUNING_THRESHOLDS)
+def test_skipped_buckets_cannot_reach_min_score(pool_rows, min_score, weights):
+    pool, men, women = pool_rows
+    skipped = 0
+    for rows, candidates in BlockingIndex(pool, women).groups(men, min_score, weights):
+        others = np.setdiff1d(women, candidates)
+        skipped += len(rows) * len(others)
+        if len(others):
+            assert pool.weighted_scores(rows[:, None], others[None, :], weights).max() < min_score
+    # The index must actually prune at this threshold
+    assert skipped > 0
+
+@pytest.mark.parametrize("min_score, weights", PRUNING_THRESHOLDS)
+def test_pruned_rankings_score_fewer_pairs(pool_rows, monkeypatch, min_score, weights):
+    pool, men, women = pool_rows
+    scored = []
+    score_blocks = ProfilePool.score_blocks
+    def counting_score_blocks(self, rows, candidates, *args, **kwargs):
+        scored.append(len(rows) * len(candidates))
+        return score_blocks(self, rows, candidates, *args, **kwargs)
+    monkeypatch.setattr(ProfilePool, "score_blocks", counting_score_blocks)
+
+    top_matches_by_row(pool, men, women, 5, min_score, weights=weights)
+    assert sum(scored) <= MAX_VISITED_FRACTION * len(men) * len(women)
+
+@pytest.mark.parametrize("min_score", [40, 50, 70])
+def test_unprunable_thresholds_scan_once(pool_rows, min_score):
+    pool, men, women = pool_rows
+    groups = BlockingIndex(pool, women).groups(men, min_score)
+    assert len(groups) == 1
+    assert groups[0][0].tolist() == men.tolist() and groups[0][1].tolist() == women.tolist()
@@ -0,0 +1,31 @@
+"""
+Full-population rankings apply hard preferences like get_matches_for_user.
+"""
+
+from app.services.match_engine import get_all_top_matches, get_matches_for_user
+from app.services.match_vectors import ProfilePool, candidate_columns, dealbreaker_mask, top_matches_by_row
+from app.services.profile_loader import load_users
+
+def test_top_matches_by_row_applies_dealbreakers(population):
+    users = load_users(scoring_only=True)
+    pool = ProfilePool(users)
+    men = [row for row, u in enumerate(users) if u.gender == "Male"]
+    women = [row for row, u in enumerate(users) if u.gender == "Female"]
+
+    top = top_matches_by_row(pool, men, women, 5, hard_preferences=True)
+    for row in men:
+        expected = [(m["user_id"], m["score"])
+                    for m in get_matches_for_user(users[row].id, limit=5, include_details=False)]
+        assert [(users[c].id, score) for c, score in top[row]] == expected
+
+def test_all_top_matches_skip_dealbreakers(population):
+    users = {u.id: u for u in load_users(scoring_only=True)}
+    matches = get_all_top_matches(limit_per_match=5, min_score=0, include_details=False)
+    for match in matches:
+        dobs, heights = candidate_columns([users[match["user_b_id"]]])
+        assert dealbreaker_mask(users[match["user_a_id"]], dobs, heights).all()
+
+    unfiltered = get_all_top_matches(limit_per_match=5, min_score=0, include_details=False,
+                                     hard_preferences=False)
+    assert {(m["user_a_id"], m["user_b_id"]) for m in unfiltered} \
+        != {(m["user_a_id"], m["user_b_id"]) for m in matches}
@@ -0,0 +1,27 @@
+"""
+Compatibility details for profiles with missing fields.
+"""
+
+from app.models.religion import ReligiousProfile
+from app.services.match_engine import get_compatibility_details, get_matches_for_user
+from app.services.profile_loader import load_users
+
+def test_details_with_missing_observance(population):
+    missing = ReligiousProfile.query.filter(ReligiousProfile.shabbat_observance.is_(None)).first()
+    assert missing is not None
+    users = {u.id: u for u in load_users(scoring_only=True)}
+    user = users[missing.user_id]
+    other = next(u for u in users.values() if u.gender != user.gender)
+
+    details = get_compatibility_details(user, other)
+    assert details["religious_compatibility"]["details"]["shabbat"].startswith("Not specified vs ")
+    assert get_compatibility_details(other, user)["religious_compatibility"]["details"]["shabbat"] \
+        .endswith(" vs Not specified")
+
+def test_matches_with_details_for_user_missing_kosher(population):
+    missing = ReligiousProfile.query.filter(ReligiousProfile.kosher_observance.is_(None)).first()
+
+    matches = get_matches_for_user(missing.user_id, limit=10)
+    assert matches
+    assert all("Not specified" in m["compatibility"]["religious_compatibility"]["details"]["kosher"]
+               for m in matches)
@@ -0,0 +1,86 @@
+"""
+Merging new users into cached lists and the score store gives what a fresh computation gives.
+"""
+
+import pytest
+
+from app import db
+from app.models.background import BackgroundPreferences
+from app.models.lifestyle import LifestylePreferences
+from app.models.matchmaker import Applicant
+from app.models.religion import ReligiousProfile
+from app.models.user import User
+from app.services import match_cache
+from app.services.incremental import add_new_users
+from app.services.match_engine import find_matches_for_user, get_matches_for_user
+from app.services.score_store import get_stored_matches_for_user, pending_users, rebuild_match_scores
+from generate_population import TABLE_COLUMNS, generate_population
+
+from conftest import POPULATION_SIZE
+
+NEW_USERS = 40
+
+# Options of the cached lists warmed before the new users arrive
+LIST_OPTIONS = [
+    {"limit": 10, "include_details": False},
+    {"limit": 5, "include_details": True},
+    {"limit": 10, "include_details": False, "hard_preferences": False},
+    {"limit": 10, "include_details": False, "reciprocal": True},
+    {"limit": 10, "include_details": False, "weights": {"aliyah": 20}},
+]
+
+@pytest.fixture
+def memory_cache(app, population):
+    app.config["MATCH_CACHE_BACKEND"] = "memory"
+    match_cache.init_match_cache(app)
+    yield match_cache.match_cache
+    app.config["MATCH_CACHE_BACKEND"] = "none"
+    match_cache.init_match_cache(app)
+    match_cache.pending_new_users.clear()
+
+def insert_new_users(count, seed=99):
+    """Bulk insert synthetic users after the population, like the importers; returns their ids"""
+    models = {
+        "users": User, "religious_profile": ReligiousProfile, "background_preferences": BackgroundPreferences,
+        "lifestyle_preferences": LifestylePreferences, "applicants": Applicant
+    }
+    user_ids = []
+    for tables in generate_population(count, seed, POPULATION_SIZE + 1, [1]):
+        for table in TABLE_COLUMNS:
+            if table in models and tables.get(table):
+                db.session.execute(models[table].__table__.insert(), tables[table])
+        user_ids += [row["id"] for row in tables["users"]]
+    db.session.commit()
+    return user_ids
+
+def test_merged_lists_equal_fresh_lists(memory_cache):
+    owners = [u.id for u in User.query.order_by(User.id).limit(40)]
+    for user_id in owners:
+        for options in LIST_OPTIONS:
+            get_matches_for_user(user_id, **options)
+
+    new_ids = insert_new_users(NEW_USERS)
+    add_new_users(new_ids)
+
+    merged_in = 0
+    for user_id in owners:
+        for options in LIST_OPTIONS:
+            key = match_cache.matches_cache_key(user_id, **dict(
+                {"hard_preferences": True, "reciprocal": False, "weights": None}, **options))
+            cached = memory_cache.get(key)
+            assert cached is not None
+            fresh = find_matches_for_user(user_id, **options)
+            assert cached == fresh
+            merged_in += any(match["user_id"] in new_ids for match in fresh)
+    assert merged_in
+
+def test_new_users_reach_the_score_store(app, population):
+    app.config["MATCH_SCORE_STORE"] = True
+    pending_users.clear()
+    rebuild_match_scores()
+
+    new_ids = insert_new_users(NEW_USERS)
+    add_new_users(new_ids)
+    for user_id in list(range(1, 101)) + new_ids:
+        assert get_stored_matches_for_user(user_id, limit=20, include_details=False) \
+            == find_matches_for_user(user_id, limit=20, include_details=False)
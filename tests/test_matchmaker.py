@@ -0,0 +1,36 @@
+"""
+Batch-scoring a matchmaker's applicants gives each the list get_matches_for_user computes.
+"""
+
+import pytest
+
+from app.models.matchmaker import Applicant
+from app.services.match_engine import get_matches_for_user, get_matchmaker_matches
+
+def per_applicant(matchmaker_id, limit, **options):
+    """{applicant id: [(match id, score), ...]} from one get_matches_for_user call per applicant"""
+    return {
+        applicant.user_id: [(m["user_id"], m["score"])
+                            for m in get_matches_for_user(applicant.user_id, limit=limit,
+                                                          include_details=False, **options)]
+        for applicant in Applicant.query.filter_by(shidduch_lady_id=matchmaker_id)
+    }
+
+def batched(matchmaker_id, limit, **options):
+    lists = {}
+    for record in get_matchmaker_matches(matchmaker_id, limit=limit, include_details=False, **options):
+        lists.setdefault(record["applicant_id"], []).append((record["match_id"], record["score"]))
+    # Records are sorted by score across applicants; ties keep candidate order within one
+    return {applicant_id: sorted(matches, key=lambda m: -m[1]) for applicant_id, matches in lists.items()}
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"hard_preferences": False},
+    {"reciprocal": True},
+    {"weights": {"aliyah": 20, "smoking": 0}},
+])
+def test_batched_matchmaker_equals_per_applicant(population, options):
+    expected = {user_id: matches for user_id, matches in per_applicant(2, 15, **options).items()
+                if matches}
+    assert expected
+    assert batched(2, 15, **options) == expected
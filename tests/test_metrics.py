@@ -0,0 +1,62 @@
+"""
+/metrics access control, engine instrumentation and multiprocess export.
+"""
+
+import os
+import subprocess
+import sys
+import textwrap
+
+from app.services.metrics import sample_value
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def test_metrics_disabled_by_default(client):
+    assert client.get("/metrics").status_code == 404
+
+def test_metrics_token(app, client):
+    app.config["METRICS_ENABLED"] = True
+    app.config["METRICS_TOKEN"] = "scrape-token"
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+    assert response.status_code == 200
+    assert b"sparc_request_duration_seconds" in response.data
+
+def test_pairings_are_instrumented(client, auth_headers, population):
+    labels = {"stage": "scoring"}
+    before = sample_value("sparc_match_engine_stage_seconds_count", labels) or 0
+    response = client.get("/api/matches/matches/pairings?min_score=40", headers=auth_headers)
+    assert response.status_code == 200
+    assert sample_value("sparc_match_engine_stage_seconds_count", labels) == before + 1
+    assert sample_value("sparc_profile_pool_size", {"operation": "pairings"}) == population
+    assert sample_value("sparc_request_duration_seconds_count", {
+        "endpoint": "matches.get_pairings", "method": "GET", "status": "200"
+    }) >= 1
+
+# Each process serves one request; the last one exports what all of them recorded
+WORKER = textwrap.dedent("""
+    import sys
+    sys.path.insert(0, {root!r})
+    from app import create_app
+    app = create_app("testing")
+    app.config["METRICS_ENABLED"] = True
+    client = app.test_client()
+    client.get("/")
+    if {export}:
+        sys.stdout.write(client.get("/metrics").get_data(as_text=True))
+""")
+
+def run_worker(root, directory, export):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(directory))
+    result = subprocess.run([sys.executable, "-c", WORKER.format(root=root, export=export)],
+                            env=env, capture_output=True, text=True, check=True)
+    return result.stdout
+
+def test_multiprocess_export_sums_workers(tmp_path):
+    run_worker(ROOT, tmp_path, False)
+    run_worker(ROOT, tmp_path, False)
+    exported = run_worker(ROOT, tmp_path, True)
+    count = next(line for line in exported.splitlines()
+                 if line.startswith("sparc_request_duration_seconds_count") and 'endpoint="index"' in line)
+    assert float(count.split()[-1]) == 3.0
@@ -0,0 +1,45 @@
+"""
+Keyset pages joined together are the full match list, in (score desc, pair id) order.
+"""
+
+import pytest
+
+from app.models.matchmaker import Applicant
+from app.services.pagination import PAIR_ID_FIELDS, record_key, result_sets
+
+def all_pages(client, url, headers, page_size, recompute=False):
+    records = []
+    cursor = None
+    while True:
+        page_url = f"{url}&page_size={page_size}" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(page_url, headers=headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        key = "pairings" if "pairings" in body else "matches"
+        assert len(body[key]) <= page_size
+        records.extend(body[key])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return records
+        if recompute:
+            # Cursors are keys, not offsets, so a recomputed list continues where the last page ended
+            result_sets.clear()
+
+@pytest.mark.parametrize("recompute", [False, True])
+@pytest.mark.parametrize("url, kind", [
+    ("/api/matches/user/{user_id}/matches?limit=60&details=0", "user"),
+    ("/api/matches/matches/all?min_score=40&details=0", "pair"),
+    ("/api/matches/matchmaker/matches?limit=20&details=0", "applicant"),
+])
+def test_joined_pages_equal_full_list(client, auth_headers, admin, url, kind, recompute):
+    user_id = Applicant.query.filter_by(shidduch_lady_id=admin.id).first().user_id
+    url = url.format(user_id=user_id)
+    full = client.get(url, headers=auth_headers).get_json()["matches"]
+    full.sort(key=lambda record: record_key(record, PAIR_ID_FIELDS[kind]))
+    assert len(full) > 10
+    # About six pages, the last one short
+    assert all_pages(client, url, auth_headers, len(full) // 5 - 1, recompute) == full
+
+def test_invalid_cursor(client, auth_headers):
+    response = client.get("/api/matches/matches/all?cursor=not-a-cursor", headers=auth_headers)
+    assert response.status_code == 400
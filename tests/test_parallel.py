@@ -0,0 +1,30 @@
+"""
+Sharding the all-pairs run over processes gives the single-process result.
+"""
+
+from app.services.match_engine import get_all_top_matches
+from app.services.match_vectors import ProfilePool
+from app.services.parallel_matching import parallel_top_matches_by_row, resolve_workers
+from app.services.profile_loader import load_users
+
+def test_workers_match_single_process(population):
+    users = load_users(scoring_only=True)
+    pool = ProfilePool(users)
+    men = [row for row, u in enumerate(users) if u.gender == "Male"]
+    women = [row for row, u in enumerate(users) if u.gender == "Female"]
+    jobs = [(men, women), (women, men)]
+    for options in ({"min_score": 0}, {"min_score": 60, "hard_preferences": True},
+                    {"reciprocal": True, "weights": {"aliyah": 20}}):
+        assert parallel_top_matches_by_row(pool, jobs, 5, workers=2, **options) \
+            == parallel_top_matches_by_row(pool, jobs, 5, workers=1, **options)
+
+def test_all_top_matches_with_workers(population):
+    assert get_all_top_matches(min_score=40, include_details=False, workers=2) \
+        == get_all_top_matches(min_score=40, include_details=False, workers=1)
+
+def test_requests_score_in_process(app):
+    app.config["MATCH_WORKERS"] = 4
+    assert resolve_workers() == 4
+    with app.test_request_context("/api/matches/matches/all"):
+        assert resolve_workers() == 1
+    assert resolve_workers(2) == 2
@@ -0,0 +1,93 @@
+"""
+The shared population pool stays equal to a fresh encoding as users are edited and added.
+"""
+
+from datetime import date
+
+import numpy as np
+
+from app import db
+from app.models.user import User
+from app.services.match_engine import candidate_gender, dealbreaker_criteria, find_matches_for_user
+from app.services.match_vectors import ProfilePool, top_matches_for_user
+from app.services.population import population_pool
+from app.services.profile_features import update_derived_fields
+from app.services.profile_loader import load_users
+from app.services.query_stats import query_log
+
+from test_incremental import insert_new_users
+
+def sql_filtered_matches(user_id, limit):
+    """Top matches over the SQL-filtered candidate list, as computed before the shared pool"""
+    user = load_users([user_id], scoring_only=True)[0]
+    candidates = [u for u in load_users(gender=candidate_gender(user.gender), scoring_only=True,
+                                        criteria=dealbreaker_criteria(user)) if u.id != user_id]
+    return [(match.id, score) for match, score in top_matches_for_user(user, candidates, limit)]
+
+def edit_profiles():
+    man = User.query.filter_by(gender="Male").order_by(User.id).first()
+    woman = User.query.filter_by(gender="Female").order_by(User.id).first()
+    man.dob = date(1980, 5, 1)
+    man.height = "6'4\""
+    update_derived_fields(user=man)
+    man.religious_profile.shabbat_observance = "Do not observe or celebrate"
+    update_derived_fields(religious_profile=man.religious_profile)
+    woman.background.max_partner_age = 30
+    woman.lifestyle.smoking = "Heavy smoker"
+    db.session.commit()
+    return man.id, woman.id
+
+def test_unchanged_pool_is_reused_after_one_query(population):
+    pool = population_pool()
+    with query_log() as log:
+        assert population_pool() is pool
+    assert log.count == 1
+
+def test_updated_pool_equals_fresh_encoding(population, monkeypatch):
+    old = population_pool()
+    updates = []
+    updated = ProfilePool.updated
+    monkeypatch.setattr(ProfilePool, "updated",
+                        lambda pool, users: updates.append(len(users)) or updated(pool, users))
+
+    edited = edit_profiles()
+    new_ids = insert_new_users(40)
+    pool = population_pool()
+    assert updates == [len(edited) + len(new_ids)]
+    assert len(old) == population and len(pool) == population + len(new_ids)
+
+    fresh = ProfilePool(load_users(scoring_only=True))
+    assert pool.ids.tolist() == fresh.ids.tolist()
+    rows = np.arange(len(fresh))
+    assert np.array_equal(pool.score_matrix(rows, rows), fresh.score_matrix(rows, rows))
+    for row in rows:
+        assert np.array_equal(pool.dealbreaker_mask(row, rows), fresh.dealbreaker_mask(row, rows))
+
+def test_matches_follow_edits(population):
+    user_ids = [u.id for u in User.query.order_by(User.id).limit(30)]
+    for user_id in user_ids:
+        find_matches_for_user(user_id, limit=15, include_details=False)
+
+    edited = edit_profiles()
+    new_ids = insert_new_users(20)
+    for user_id in user_ids + list(edited) + new_ids[:5]:
+        matches = find_matches_for_user(user_id, limit=15, include_details=False)
+        assert [(m["user_id"], m["score"]) for m in matches] == sql_filtered_matches(user_id, 15)
+
+def test_aged_pool_equals_fresh_encoding(population):
+    pool = population_pool()
+    aged = pool.aged()
+    fresh = ProfilePool(load_users(scoring_only=True))
+    assert np.array_equal(aged.age, fresh.age)
+    assert np.array_equal(aged.dealbreakers["dob_cutoff"], fresh.dealbreakers["dob_cutoff"],
+                          equal_nan=True)
+
+def test_new_day_reages_without_reloading(population):
+    pool = population_pool()
+    # Pretend the pool was encoded yesterday
+    pool.key = (pool.key[0] - 1,) + pool.key[1:]
+    with query_log() as log:
+        aged = population_pool()
+    assert log.count == 1
+    assert aged is not pool and aged.key[0] == date.today().toordinal()
+    assert population_pool() is aged
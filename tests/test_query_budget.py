@@ -0,0 +1,48 @@
+"""
+Match endpoints run a constant number of SQL statements, however many
+applicants, candidates or matches a response covers (no N+1 loading).
+"""
+
+import pytest
+
+from app.models.matchmaker import Applicant
+from app.services.query_stats import query_budget
+
+@pytest.fixture
+def applicant_ids(admin):
+    return [a.user_id for a in Applicant.query.filter_by(shidduch_lady_id=admin.id)
+            .order_by(Applicant.user_id).limit(2)]
+
+@pytest.mark.parametrize("url, budget", [
+    ("/api/matches/user/{a}/matches?limit=50", 12),
+    ("/api/matches/user/{a}/matches?limit=50&reciprocal=1", 12),
+    ("/api/matches/matchmaker/matches?limit=50", 16),
+    ("/api/matches/matchmaker/matches?limit=50&stream=1", 16),
+    ("/api/matches/matches/all?min_score=40", 8),
+    ("/api/matches/matches/pairings", 8),
+    ("/api/matches/matches/compatibility/{a}/{b}", 8),
+])
+def test_endpoint_query_budget(client, auth_headers, applicant_ids, url, budget):
+    a, b = applicant_ids
+    with query_budget(budget):
+        response = client.get(url.format(a=a, b=b), headers=auth_headers)
+        response.get_data()
+    assert response.status_code == 200
+
+def test_query_count_header_matches_budget(client, auth_headers, applicant_ids):
+    with query_budget(12) as log:
+        response = client.get(f"/api/matches/user/{applicant_ids[0]}/matches",
+                              headers=auth_headers)
+    assert response.status_code == 200
+    assert int(response.headers["X-Query-Count"]) == log.count
+
+def test_query_budget_reports_n_plus_one(population):
+    from app import db
+    from app.models.user import User
+
+    db.session.expunge_all()
+    users = User.query.limit(20).all()
+    with pytest.raises(AssertionError, match="N\\+1"):
+        with query_budget(1000):
+            for user in users:
+                user.religious_profile
@@ -0,0 +1,110 @@
+"""
+Match endpoints end to end through the Flask test client.
+"""
+
+import json
+
+import jwt
+import pytest
+
+from app.models.matchmaker import Applicant
+from app.services.match_engine import (
+    get_all_top_matches,
+    get_matches_for_user,
+    get_matchmaker_matches
+)
+
+def canonical(records):
+    return sorted(json.dumps(record, sort_keys=True) for record in records)
+
+def applicant_of(matchmaker_id):
+    return Applicant.query.filter_by(shidduch_lady_id=matchmaker_id).order_by(Applicant.id).first()
+
+def test_token_is_required(client, population):
+    assert client.get("/api/matches/matches/all").status_code == 401
+    response = client.get("/api/matches/matches/all", headers={"Authorization": "Bearer nonsense"})
+    assert response.status_code == 401
+
+def test_user_matches(client, auth_headers, admin):
+    user_id = applicant_of(admin.id).user_id
+    response = client.get(f"/api/matches/user/{user_id}/matches?limit=5", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()["matches"] == get_matches_for_user(user_id, limit=5)
+
+def test_user_matches_of_another_matchmaker(client, auth_headers, admin):
+    user_id = applicant_of(admin.id + 1).user_id
+    response = client.get(f"/api/matches/user/{user_id}/matches", headers=auth_headers)
+    assert response.status_code == 404
+
+def test_all_matches(client, auth_headers):
+    response = client.get("/api/matches/matches/all?min_score=60", headers=auth_headers)
+    assert response.status_code == 200
+    assert canonical(response.get_json()["matches"]) == canonical(get_all_top_matches(min_score=60))
+
+def test_all_matches_needs_admin(app, client, admin):
+    token = jwt.encode({"id": admin.id + 1}, app.config["SECRET_KEY"], algorithm="HS256")
+    response = client.get("/api/matches/matches/all", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
+
+@pytest.mark.parametrize("method", ["assignment", "stable"])
+def test_pairings(client, auth_headers, method):
+    response = client.get(f"/api/matches/matches/pairings?method={method}&min_score=40",
+                          headers=auth_headers)
+    assert response.status_code == 200
+    pairings = response.get_json()["pairings"]
+    assert pairings
+    # One introduction per person
+    people = [p["user_a_id"] for p in pairings] + [p["user_b_id"] for p in pairings]
+    assert len(people) == len(set(people))
+
+def test_pairings_rejects_unknown_method(client, auth_headers):
+    response = client.get("/api/matches/matches/pairings?method=lottery", headers=auth_headers)
+    assert response.status_code == 400
+
+def test_matchmaker_matches(client, auth_headers, admin):
+    response = client.get("/api/matches/matchmaker/matches?limit=10", headers=auth_headers)
+    assert response.status_code == 200
+    assert canonical(response.get_json()["matches"]) == \
+        canonical(get_matchmaker_matches(admin.id, limit=10))
+
+def test_compatibility(client, auth_headers, admin):
+    user_id = applicant_of(admin.id).user_id
+    match_id = get_matches_for_user(user_id, limit=1, include_details=False)[0]["user_id"]
+    response = client.get(f"/api/matches/matches/compatibility/{user_id}/{match_id}",
+                          headers=auth_headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["score"] == body["reciprocal"]["forward"]
+    assert "religious_compatibility" in body["compatibility"]
+
+def test_weights_override(client, auth_headers, admin):
+    user_id = applicant_of(admin.id).user_id
+    url = f"/api/matches/user/{user_id}/matches?details=0&weights=aliyah:50,smoking:0"
+    response = client.get(url, headers=auth_headers)
+    assert response.status_code == 200
+    expected = get_matches_for_user(user_id, include_details=False,
+                                    weights={"aliyah": 50, "smoking": 0})
+    assert response.get_json()["matches"] == expected
+
+@pytest.mark.parametrize("weights", [
+    "aliyah:-1", "nosuchfield:2", "aliyah", "aliyah:nan", "aliyah:inf",
+    '{"aliyah": NaN}', '{"aliyah": Infinity}', '{"aliyah": true}',
+])
+def test_invalid_weights(client, auth_headers, weights):
+    response = client.get(f"/api/matches/matches/all?weights={weights}", headers=auth_headers)
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("url", [
+    "/api/matches/matches/all?min_score=40",
+    "/api/matches/matches/all?min_score=40&reciprocal=1&details=0",
+    "/api/matches/matchmaker/matches?limit=10",
+])
+def test_streamed_records_equal_full_list(client, auth_headers, url):
+    full = client.get(url, headers=auth_headers).get_json()["matches"]
+    response = client.get(url + "&stream=1", headers=auth_headers)
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert canonical(lines) == canonical(full)
+
+    accepted = client.get(url, headers=dict(auth_headers, Accept="application/x-ndjson"))
+    assert accepted.get_data() == response.get_data()
@@ -0,0 +1,125 @@
+"""
+The score store serves the same lists as the live engine, also after profiles change.
+"""
+
+from datetime import date
+
+import pytest
+
+from app import db
+from app.models.match_score import MatchScore
+from app.models.user import User
+from app.services.match_engine import (
+    find_matches_for_user,
+    get_all_top_matches,
+    get_matchmaker_matches
+)
+from app.services.profile_features import update_derived_fields
+from app.services.score_store import (
+    get_stored_matches_for_user,
+    get_stored_matchmaker_matches,
+    get_stored_top_matches,
+    pending_users,
+    rebuild_match_scores
+)
+
+STORED_LIMIT = 20
+
+@pytest.fixture
+def store(app, population):
+    app.config["MATCH_SCORE_STORE"] = True
+    app.config["MATCH_SCORE_STORE_LIMIT"] = STORED_LIMIT
+    pending_users.clear()
+    rebuild_match_scores()
+    yield
+    pending_users.clear()
+
+def live_lists():
+    return {user.id: find_matches_for_user(user.id, limit=STORED_LIMIT, include_details=False)
+            for user in User.query.order_by(User.id)}
+
+def stored_lists():
+    return {user.id: get_stored_matches_for_user(user.id, limit=STORED_LIMIT, include_details=False)
+            for user in User.query.order_by(User.id)}
+
+def canonical(records):
+    return sorted(tuple(sorted(record.items())) for record in records)
+
+def test_store_keeps_top_k_per_user(store):
+    counts = db.session.query(db.func.count()).select_from(MatchScore) \
+        .group_by(MatchScore.user_a_id).all()
+    assert max(count for (count,) in counts) == STORED_LIMIT
+    assert sum(count for (count,) in counts) <= STORED_LIMIT * User.query.count()
+
+def test_stored_lists_equal_live(store):
+    assert stored_lists() == live_lists()
+    assert get_stored_top_matches(limit_per_match=5, min_score=50, include_details=False) \
+        == get_all_top_matches(limit_per_match=5, min_score=50, include_details=False)
+    assert canonical(get_stored_matchmaker_matches(2, limit=10, include_details=False)) \
+        == canonical(get_matchmaker_matches(2, limit=10, include_details=False))
+
+def test_longer_lists_are_computed_live(store):
+    user_id = User.query.first().id
+    assert get_stored_matches_for_user(user_id, limit=STORED_LIMIT + 10, include_details=False) \
+        == find_matches_for_user(user_id, limit=STORED_LIMIT + 10, include_details=False)
+
+def test_edited_profiles_are_recomputed(store, client):
+    man = User.query.filter_by(gender="Male").order_by(User.id).first()
+    woman = User.query.filter_by(gender="Female").order_by(User.id).first()
+    man.dob = date(1980, 5, 1)
+    man.height = "6'4\""
+    update_derived_fields(user=man)
+    man.religious_profile.shabbat_observance = "Do not observe or celebrate"
+    update_derived_fields(religious_profile=man.religious_profile)
+    woman.background.max_partner_age = 30
+    db.session.commit()
+    assert pending_users == {man.id, woman.id}
+
+    # The queue is applied after the next request
+    client.get("/")
+    assert not pending_users
+    assert stored_lists() == live_lists()
+
+def test_profile_saves_reencode_only_the_saved_user(store, client, monkeypatch):
+    from app.services import population
+
+    loaded = []
+    load_users = population.load_users
+    monkeypatch.setattr(population, "load_users",
+                        lambda *args, **kwargs: loaded.append(args) or load_users(*args, **kwargs))
+    man = User.query.filter_by(gender="Male").order_by(User.id).first()
+    man.religious_profile.shabbat_observance = "Do not observe or celebrate"
+    update_derived_fields(religious_profile=man.religious_profile)
+    db.session.commit()
+
+    client.get("/")
+    assert loaded == [([man.id],)]
+    assert stored_lists() == live_lists()
+
+def test_aged_user_ids(store):
+    from app.services.score_store import aged_user_ids
+
+    user = User.query.order_by(User.id).first()
+    user.dob = date(1990, 6, 15)
+    db.session.commit()
+    pending_users.clear()
+    assert user.id in aged_user_ids(date(2026, 6, 14), date(2026, 6, 15))
+    assert user.id not in aged_user_ids(date(2026, 6, 15), date(2026, 6, 20))
+    assert user.id not in aged_user_ids(date(2025, 6, 15), date(2026, 6, 14))
+
+def test_birthday_refresh_updates_aged_lists(store, monkeypatch):
+    from datetime import datetime, timedelta
+    from app.services import score_store
+
+    stale = datetime.utcnow() - timedelta(days=3)
+    db.session.query(MatchScore).update({MatchScore.computed_at: stale})
+    db.session.commit()
+
+    refreshed = []
+    update_user_scores = score_store.update_user_scores
+    monkeypatch.setattr(score_store, "update_user_scores",
+                        lambda ids: refreshed.append(set(ids)) or update_user_scores(ids))
+    score_store.refresh_aged_scores()
+    assert refreshed == [score_store.aged_user_ids(stale.date() - timedelta(days=1))]
+    assert db.session.query(db.func.min(MatchScore.computed_at)).scalar() > stale
+    assert stored_lists() == live_lists()
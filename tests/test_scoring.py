@@ -0,0 +1,97 @@
+"""
+The vectorized engine must score exactly like match_engine.score_match.
+"""
+
+import numpy as np
+import pytest
+
+from app.services.match_engine import score_match, score_match_reciprocal
+from app.services.match_vectors import (
+    ProfilePool,
+    reciprocal_scores_for,
+    score_user_against,
+    weight_vector
+)
+from app.services.score_cache import tensor_cache
+from app.services.profile_loader import load_users
+
+def test_vectorized_scores_equal_score_match(population):
+    users = load_users(scoring_only=True)
+    for user in users[:25]:
+        expected = [score_match(user, other) for other in users]
+        assert score_user_against(user, users).tolist() == expected
+
+def test_score_matrix_equals_score_match(population):
+    users = load_users(scoring_only=True)[:80]
+    pool = ProfilePool(users)
+    rows = np.arange(len(users))
+    matrix = pool.score_matrix(rows, rows)
+    for i, user in enumerate(users):
+        for j, other in enumerate(users):
+            # score_matrix zeroes the diagonal
+            assert matrix[i, j] == (0 if i == j else score_match(user, other))
+
+def test_reciprocal_scores_equal_both_directions(population):
+    users = load_users(scoring_only=True)
+    user = users[0]
+    for other, scores in zip(users[1:60], reciprocal_scores_for(user, users[1:60])):
+        assert scores["forward"] == score_match(user, other)
+        assert scores["reverse"] == score_match(other, user)
+        assert scores == score_match_reciprocal(user, other)
+
+def test_reweighting_reuses_the_component_tensor(population):
+    users = load_users(scoring_only=True)
+    weights = {"aliyah": 40}
+    scores = score_user_against(users[0], users[1:], weights)
+    hits = tensor_cache.hits
+    # A fresh pool over the same users and profile versions finds the cached tensor
+    assert score_user_against(users[0], users[1:], {"aliyah": 40}).tolist() == scores.tolist()
+    reweighted = score_user_against(users[0], users[1:], {"smoking": 10})
+    assert tensor_cache.hits == hits + 2
+
+    tensor_cache.clear()
+    assert score_user_against(users[0], users[1:], {"smoking": 10}).tolist() == reweighted.tolist()
+
+@pytest.mark.parametrize("weights", [{"aliyah": float("nan")}, {"aliyah": float("inf")},
+                                     {"aliyah": True}, {"aliyah": -1}])
+def test_invalid_weights_are_rejected(weights):
+    with pytest.raises(ValueError):
+        weight_vector(weights)
+
+def test_pair_compatibility_scores_each_direction_once(population, monkeypatch):
+    from app.services.match_engine import get_pair_compatibility
+    from app.services.score_cache import pair_cache
+
+    monkeypatch.setattr(pair_cache, "max_size", 1000)
+    users = load_users(scoring_only=True)
+    man = next(u for u in users if u.gender == "Male")
+    woman = next(u for u in users if u.gender == "Female")
+    misses = pair_cache.misses
+    pair = get_pair_compatibility(man.id, woman.id)
+    assert pair["score"] == score_match(man, woman)
+    assert pair["reciprocal"] == score_match_reciprocal(man, woman)
+    assert pair_cache.misses == misses + 2
+
+    get_pair_compatibility(man.id, woman.id)
+    assert pair_cache.misses == misses + 2
+
+def test_pair_scores_are_cached_per_day(population):
+    from datetime import date, timedelta
+    from app.services.score_cache import pair_key, weights_version
+
+    users = load_users(scoring_only=True)
+    man, woman = users[0], users[1]
+    today = date.today()
+    version = weights_version()
+    assert pair_key(man, woman, version) == pair_key(man, woman, version, today)
+    assert pair_key(man, woman, version, today) != \
+        pair_key(man, woman, version, today + timedelta(days=1))
+
+def test_pair_cache_is_opt_in(population):
+    from app.services.score_cache import pair_cache, scores_for
+
+    users = load_users(scoring_only=True)
+    misses = pair_cache.misses
+    scores = scores_for(users[0], users[1:50])
+    assert scores.tolist() == [score_match(users[0], other) for other in users[1:50]]
+    assert pair_cache.misses == misses and len(pair_cache) == 0
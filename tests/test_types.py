@@ -0,0 +1,33 @@
+"""
+StringArray binds lists, tuples and sets, and rejects bare strings.
+"""
+
+import pytest
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import StatementError
+
+from app import db
+from app.models.religion import ReligiousProfile
+from app.models.types import StringArray
+
+@pytest.mark.parametrize("dialect", [sqlite.dialect(), postgresql.dialect()])
+def test_sequences_bind_as_lists(dialect):
+    column = StringArray()
+    assert column.process_bind_param(["English"], dialect) == ["English"]
+    assert column.process_bind_param(("English", "Hebrew"), dialect) == ["English", "Hebrew"]
+    assert column.process_bind_param({"English"}, dialect) == ["English"]
+    assert column.process_bind_param(None, dialect) is None
+
+@pytest.mark.parametrize("dialect", [sqlite.dialect(), postgresql.dialect()])
+@pytest.mark.parametrize("value", ["English", {"English": True}, 3])
+def test_other_values_are_rejected(dialect, value):
+    with pytest.raises(TypeError):
+        StringArray().process_bind_param(value, dialect)
+
+def test_string_is_not_stored_as_letters(population):
+    profile = ReligiousProfile.query.first()
+    profile.languages = "English"
+    with pytest.raises(StatementError) as error:
+        db.session.flush()
+    assert isinstance(error.value.orig, TypeError)
+    db.session.rollback()